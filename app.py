@@ -1,13 +1,35 @@
 import os
 import json
 import threading
+import queue
 import time
 import uuid
 import shutil
 import csv
+import io
+import gzip
+import lzma
+import bz2
+import mimetypes
+import errno
+import fnmatch
+import re
+import hashlib
+import mmap
+import struct
+import sqlite3
+import sys
+import math
+import zlib
+import tempfile
+from array import array
 from datetime import datetime
-from collections import defaultdict
-from flask import Flask, render_template, request, jsonify, send_from_directory, url_for
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice, groupby
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, stream_with_context, url_for
 from flask_socketio import SocketIO, emit
 from werkzeug.utils import secure_filename
 import logging
@@ -31,9 +53,106 @@ if not os.path.exists(INFO_DIR):
 if not os.path.exists(RESULTS_DIR):
     os.makedirs(RESULTS_DIR)
 
-# Estado global da operação
-# Usamos um dicionário para manter o estado e um Lock para acesso thread-safe
-state_lock = threading.Lock()
+# Número de threads usadas na varredura de diretórios (1 = varredura sequencial)
+DEFAULT_COLLECTION_WORKERS = 1
+MAX_COLLECTION_WORKERS = 64
+
+# Modos da coleta incremental: 'revalidate' faz stat dos arquivos de diretórios inalterados;
+# 'trust' reaproveita os registros sem acessá-los (só os mtimes dos diretórios são verificados)
+INCREMENTAL_MODES = ('revalidate', 'trust')
+
+# Hash de conteúdo opcional na coleta (o campo do registro recebe o nome do algoritmo)
+HASH_ALGORITHMS = ('md5', 'sha1', 'blake2b')
+DEFAULT_HASH_WORKERS = 4
+MAX_HASH_WORKERS = 32
+HASH_CHUNK_SIZE = 1024 * 1024 # Leituras grandes: menos chamadas de sistema por arquivo
+HASH_PROGRESS_INTERVAL = 5 # Segundos entre os relatos de vazão
+
+# Cache persistente de hashes (em INFO_DIR); as entradas menos usadas são
+# descartadas quando o limite é ultrapassado
+HASH_CACHE_FILENAME = '.hash_cache.sqlite3'
+HASH_CACHE_MAX_ENTRIES = 5000000
+HASH_CACHE_BATCH_SIZE = 1000
+
+# Número de cópias simultâneas (1 = cópia sequencial)
+DEFAULT_COPY_WORKERS = 1
+MAX_COPY_WORKERS = 32
+
+# Tamanho dos blocos da cópia: entre blocos o progresso é relatado e a pausa/parada verificada
+COPY_CHUNK_SIZE = 32 * 1024 * 1024
+
+# Diário de cópia (RESULTS_DIR): registra os arquivos concluídos e o último
+# offset gravado de arquivos grandes, para retomar uma cópia interrompida
+COPY_JOURNAL_PREFIX = 'copy_journal_'
+# Só arquivos a partir deste tamanho têm offsets registrados (com fsync); os
+# menores são apenas marcados como concluídos e recopiados inteiros na retomada
+COPY_CHECKPOINT_MIN_SIZE = 256 * 1024 * 1024
+COPY_CHECKPOINT_INTERVAL = 256 * 1024 * 1024 # Bytes gravados entre dois offsets registrados
+
+# Cópia delta (estilo rsync) de arquivos marcados como diferentes: só os blocos
+# alterados são lidos da origem; os demais são reaproveitados do destino
+DELTA_MIN_FILE_SIZE = 1024 * 1024 # Arquivos menores são copiados inteiros
+DELTA_MIN_BLOCK_SIZE = 4 * 1024
+DELTA_MAX_BLOCK_SIZE = 128 * 1024
+DELTA_MAX_ROLLING_BYTES = 16 * 1024 * 1024 # Limite de bytes deslizados byte a byte por arquivo
+DELTA_MAX_SKIP_BLOCKS = 64 # Salto máximo (em blocos) sobre trechos sem correspondência
+
+# Agendador da cópia: limites de bytes/s e arquivos/s e concorrência adaptativa
+COPY_ADAPTIVE_INTERVAL = 2.0 # Segundos entre reavaliações da concorrência adaptativa
+COPY_SCHEDULER_POLL_INTERVAL = 0.5
+
+# Verificação da cópia por hash calculado durante a transferência: 'reread' relê
+# o destino (fora do cache de páginas) para conferir; 'trust' confia na gravação
+COPY_VERIFY_MODES = ('none', 'reread', 'trust')
+
+# Arquivos movidos no destino (ver MoveDetector): 'copy' copia da origem como
+# um ausente; 'rename' move o arquivo dentro do destino; 'link' cria um hard link
+COPY_MOVE_MODES = ('copy', 'rename', 'link')
+# Critérios de MoveDetector que garantem o conteúdo; os demais pares têm o
+# conteúdo conferido por hash antes de serem movidos ou vinculados
+MOVE_CONFIRMED_MATCHES = ('hash', 'content')
+MOVE_CONFIRM_HASH_ALGORITHM = 'blake2b' # Usado quando a cópia não tem verificação por hash
+
+# Verificação de conteúdo na comparação para arquivos de mesmo tamanho e mtime
+# diferente: 'quick' compara só a impressão digital (blocos do início, meio e
+# fim) e apenas marca os pares coincidentes, que continuam listados; 'full'
+# confirma com o hash completo e deixa de listar os idênticos
+VERIFY_MODES = ('none', 'quick', 'full')
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+
+# Comparação direta de pastas: lotes de arquivos trocados entre as varreduras e o merge-join
+LIVE_SCAN_BATCH_SIZE = 500
+LIVE_SCAN_QUEUE_BATCHES = 64
+
+# Máximo de arquivos exclusivos do destino indexados para detectar movimentações
+MOVE_DETECTION_MAX_CANDIDATES = 1000000
+
+# Análise de duplicados: arquivos vazios não liberam espaço; os candidatos são
+# lidos em lotes de DEDUP_BATCH_FILES arquivos no pool de hash
+DEDUP_MIN_SIZE = 1
+DEDUP_BATCH_FILES = 2000
+DEDUP_INSERT_BATCH_SIZE = 10000
+DEDUP_DEFAULT_HASH_ALGORITHM = 'blake2b'
+
+# Compressão de snapshots e relatórios gravados em INFO_DIR/RESULTS_DIR (ver open_storage_file)
+COMPRESSION_CODECS = ('none', 'gzip', 'lzma', 'bz2')
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'lzma': '.xz', 'bz2': '.bz2'}
+COMPRESSION_LEVELS = {'gzip': (1, 9), 'lzma': (0, 9), 'bz2': (1, 9)} # Faixa de níveis aceita por codec
+DEFAULT_COMPRESSION = 'none'
+DEFAULT_COMPRESSION_LEVEL = 6
+COMPRESSED_TRAILER_MAX_SCAN = 16 * 1024 * 1024 # Bytes finais examinados em busca do trailer comprimido
+
+# Filtros de caminho da coleta e da comparação (ver PathFilter)
+FILTER_REGEX_PREFIX = 're:'
+FILTER_DIRECTORY_CACHE_SIZE = 65536 # Diretórios com decisão memorizada ao filtrar registros de snapshots
+
+# Estado das operações
+# Cada operação (coleta, comparação, cópia, conversão) roda como uma tarefa
+# (Job) com estado, eventos de pausa/parada e identificador próprios; o
+# JobManager limita quantas rodam ao mesmo tempo e enfileira as demais.
+# Um único RLock protege o estado de todas as tarefas
+# (RLock: os handlers de pausa/retomada emitem o status enquanto seguram o lock)
+state_lock = threading.RLock()
 initial_operation_state = {
     'running': False,
     'paused': False,
@@ -42,430 +161,4169 @@ initial_operation_state = {
     'files_processed': 0,
     'total_files_estimated': 0,
     'current_directory': 'N/A',
-    'all_collected_jsons': [],
-    'all_comparison_jsons': [],
-    'all_copy_reports': [] # Nova lista para relatórios de cópia
+    'bytes_copied': 0, # Progresso dentro dos arquivos durante a cópia
+    'total_bytes': 0,
+    'copy_limits': None # Limites do agendador durante a cópia (ver CopyScheduler.describe)
+}
+
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+MAX_CONCURRENT_JOBS_LIMIT = 16
+JOB_HISTORY_LIMIT = 50 # Tarefas encerradas mantidas na lista
+JOB_STATUS_LABELS = {
+    'queued': 'Na fila',
+    'running': 'Em execução',
+    'finished': 'Concluída',
+    'stopped': 'Interrompida',
+    'failed': 'Falhou'
 }
-operation_state = initial_operation_state.copy()
 
-# Variáveis de controle para pausar/parar
-stop_event = threading.Event()
-pause_event = threading.Event()
+# Tarefa associada à thread atual (ver current_job e job_bound)
+_job_context = threading.local()
 
 # --- Funções Auxiliares de Gerenciamento de Estado e Log ---
 
+def current_job():
+    """Retorna a tarefa (Job) em execução na thread atual, ou None."""
+    return getattr(_job_context, 'job', None)
+
+@contextmanager
+def job_context(job):
+    """Associa job à thread atual durante o bloco (mensagens e status passam a ser da tarefa)."""
+    previous = current_job()
+    _job_context.job = job
+    try:
+        yield job
+    finally:
+        _job_context.job = previous
+
+def job_bound(func):
+    """
+    Envolve func para que, executada em outra thread (pools de hash, cópia e
+    varredura), ela enxergue a mesma tarefa da thread que a criou.
+    """
+    job = current_job()
+
+    def run_in_job(*args, **kwargs):
+        with job_context(job):
+            return func(*args, **kwargs)
+    return run_in_job
+
+def job_state():
+    """Dicionário de estado da tarefa atual (ver initial_operation_state). Requer uma tarefa ativa."""
+    return current_job().state
+
 def log_and_emit_message(level, message, force_emit=False):
-    """Loga a mensagem e a emite via SocketIO."""
-    getattr(logger, level)(message) # Usa o nível de log correspondente
-    socketio.emit('log_message', {'level': level, 'data': message}, namespace='/')
+    """Loga a mensagem e a emite via SocketIO, marcada com o ID da tarefa atual."""
+    job = current_job()
+    getattr(logger, level, logger.info)(f"[{job.id}] {message}" if job else message) # Usa o nível de log correspondente ('success' não existe no logging)
+    socketio.emit('log_message', {'level': level, 'data': message, 'job_id': job.id if job else None}, namespace='/')
     if force_emit:
         socketio.sleep(0.01) # Pequeno sleep para garantir que a mensagem seja enviada
 
-def update_and_emit_status(message=None, force_emit=False):
-    """Atualiza o status e emite para o frontend."""
+def get_report_lists():
+    """Listas de relatórios disponíveis, enviadas junto com cada atualização de status."""
+    return {
+        'all_collected_jsons': get_available_info_jsons(),
+        'all_comparison_jsons': get_available_comparison_jsons(),
+        'all_copy_reports': get_available_copy_reports(),
+        'all_dedup_reports': get_available_dedup_reports()
+    }
+
+def update_and_emit_status(message=None, force_emit=False, job=None):
+    """Atualiza o status da tarefa (por padrão, a atual) e o emite para o frontend."""
+    job = job or current_job()
     with state_lock:
-        if message:
-            operation_state['status_message'] = message
-        # Sempre garantimos que as listas de JSONs estejam atualizadas no estado
-        operation_state['all_collected_jsons'] = get_available_info_jsons()
-        operation_state['all_comparison_jsons'] = get_available_comparison_jsons()
-        operation_state['all_copy_reports'] = get_available_copy_reports()
-
-        current_state = operation_state.copy()
-    
+        if job is not None and message:
+            job.state['status_message'] = message
+        current_state = job.describe(with_state=True) if job is not None else dict(initial_operation_state, job_id=None)
+    # Sempre garantimos que as listas de JSONs estejam atualizadas
+    current_state.update(get_report_lists())
+
     socketio.emit('status_update', current_state, namespace='/')
     if force_emit:
         socketio.sleep(0.01) # Pequeno sleep para garantir que a atualização seja enviada
 
-def check_operation_control():
-    """Verifica se a operação foi pausada ou parada."""
-    while pause_event.is_set():
-        if stop_event.is_set():
-            return False # Se parar durante a pausa, interrompe
-        socketio.sleep(0.1) # Espera enquanto estiver pausado
-    return not stop_event.is_set() # Retorna True se não houver pedido de parada
+def mark_job_failed():
+    """Marca a tarefa atual como falha; ela termina com o status 'failed' em vez de 'finished'."""
+    job = current_job()
+    if job is not None:
+        job.failed = True
+
+def emit_job_event(event, data):
+    """
+    Emite um evento de conclusão (coleta, comparação, ...) marcado com o ID da
+    tarefa atual. Um evento com status 'error' marca a tarefa como falha.
+    """
+    job = current_job()
+    if data.get('status') == 'error':
+        mark_job_failed()
+    socketio.emit(event, dict(data, job_id=job.id if job else None), namespace='/')
+
+def stop_requested():
+    """Indica se a parada da tarefa atual foi pedida."""
+    job = current_job()
+    return job is not None and job.stop_event.is_set()
+
+def check_operation_control():
+    """Verifica se a tarefa atual foi pausada ou parada."""
+    job = current_job()
+    if job is None:
+        return True
+    while job.pause_event.is_set():
+        if job.stop_event.is_set():
+            return False # Se parar durante a pausa, interrompe
+        socketio.sleep(0.1) # Espera enquanto estiver pausado
+    return not job.stop_event.is_set() # Retorna True se não houver pedido de parada
+
+def emit_jobs_update():
+    """Emite a lista de tarefas (na fila, em execução e encerradas recentemente)."""
+    socketio.emit('jobs_update', {'jobs': job_manager.list_jobs(), 'max_concurrent_jobs': job_manager.max_concurrent}, namespace='/')
+
+class Job:
+    """
+    Uma operação submetida ao JobManager: função alvo, argumentos, estado de
+    progresso e eventos de pausa/parada próprios. status é 'queued',
+    'running', 'finished', 'stopped' ou 'failed'. key, quando informado,
+    identifica o recurso que a tarefa grava (ex.: o diário de uma cópia);
+    duas tarefas ativas com a mesma key não são aceitas.
+    """
+
+    def __init__(self, kind, description, target, args=(), kwargs=None, key=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.description = description
+        self.key = key
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.status = 'queued'
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.state = dict(initial_operation_state, status_message='Na fila...')
+        self.stop_event = threading.Event()
+        self.pause_event = threading.Event()
+        self.copy_scheduler = None # Agendador da cópia, para ajustar os limites durante a execução
+        self.failed = False # Marcado pela tarefa (ver mark_job_failed), que trata os próprios erros
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def describe(self, with_state=False):
+        """Resumo da tarefa; com with_state, inclui o estado de progresso. Requer state_lock."""
+        summary = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'description': self.description,
+            'job_status': self.status,
+            'job_status_label': JOB_STATUS_LABELS[self.status],
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if with_state:
+            summary.update(self.state)
+        else:
+            for key in ('running', 'paused', 'status_message', 'files_processed', 'total_files_estimated'):
+                summary[key] = self.state[key]
+        return summary
+
+class JobConflictError(Exception):
+    """Já existe uma tarefa ativa sobre o mesmo recurso (mesma key)."""
+
+class JobManager:
+    """
+    Executa as tarefas em threads próprias, no máximo max_concurrent ao mesmo
+    tempo; as excedentes aguardam em fila (FIFO). Mantém as tarefas encerradas
+    mais recentes (JOB_HISTORY_LIMIT) para consulta.
+    """
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT_JOBS):
+        self.max_concurrent = max_concurrent
+        self.jobs = {} # job_id -> Job, em ordem de submissão
+        self._queue = deque()
+        self._running_count = 0
+
+    def submit(self, kind, description, target, args=(), kwargs=None, key=None):
+        """Cria e enfileira uma tarefa. Levanta JobConflictError se a key já estiver em uso."""
+        with state_lock:
+            if key is not None and any(job.key == key and job.active for job in self.jobs.values()):
+                raise JobConflictError(key)
+            job = Job(kind, description, target, args, kwargs, key)
+            self.jobs[job.id] = job
+            self._queue.append(job)
+            self._prune_history()
+            self._dispatch()
+        update_and_emit_status(job=job)
+        emit_jobs_update()
+        return job
+
+    def _dispatch(self):
+        """Inicia tarefas da fila enquanto houver vaga. Requer state_lock."""
+        while self._queue and self._running_count < self.max_concurrent:
+            job = self._queue.popleft()
+            self._running_count += 1
+            job.status = 'running'
+            job.started_at = datetime.now().isoformat()
+            job.state['running'] = True
+            job.state['status_message'] = 'Iniciando...'
+            threading.Thread(target=self._run, args=(job,), name=f"job-{job.id}", daemon=True).start()
+
+    def _run(self, job):
+        with job_context(job):
+            try:
+                job.target(*job.args, **job.kwargs)
+            except Exception as e:
+                job.failed = True
+                log_and_emit_message('error', f"Erro inesperado na tarefa: {e}", force_emit=True)
+            finally:
+                with state_lock:
+                    job.status = 'stopped' if job.stop_event.is_set() else 'failed' if job.failed else 'finished'
+                    job.finished_at = datetime.now().isoformat()
+                    job.state['running'] = False
+                    job.state['paused'] = False
+                    job.state['copy_limits'] = None
+                    job.copy_scheduler = None
+                    self._running_count -= 1
+                    self._dispatch()
+                update_and_emit_status(force_emit=True)
+                socketio.emit('operation_ended', {'job_id': job.id})
+                emit_jobs_update()
+
+    def _prune_history(self):
+        """Descarta as tarefas encerradas mais antigas além de JOB_HISTORY_LIMIT. Requer state_lock."""
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - JOB_HISTORY_LIMIT)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with state_lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with state_lock:
+            return [job.describe() for job in self.jobs.values()]
+
+    def latest_job(self):
+        """A tarefa em execução mais recente ou, se não houver, a última submetida."""
+        with state_lock:
+            jobs = list(self.jobs.values())
+        running = [job for job in jobs if job.status == 'running']
+        return (running or jobs or [None])[-1]
+
+    def set_max_concurrent(self, max_concurrent):
+        with state_lock:
+            self.max_concurrent = max(1, min(max_concurrent, MAX_CONCURRENT_JOBS_LIMIT))
+            self._dispatch()
+        emit_jobs_update()
+
+    def pause(self, job):
+        with state_lock:
+            if job.status != 'running' or job.state['paused']:
+                return False
+            job.pause_event.set()
+            job.state['paused'] = True
+        return True
+
+    def resume(self, job):
+        with state_lock:
+            if job.status != 'running' or not job.state['paused']:
+                return False
+            job.pause_event.clear()
+            job.state['paused'] = False
+        return True
+
+    def stop(self, job):
+        """Pede a parada de uma tarefa em execução ou cancela uma tarefa na fila."""
+        with state_lock:
+            if job.status == 'queued':
+                self._queue.remove(job)
+                job.status = 'stopped'
+                job.finished_at = datetime.now().isoformat()
+                job.state['status_message'] = 'Cancelada antes de iniciar.'
+                return True
+            if job.status != 'running':
+                return False
+            job.stop_event.set()
+            job.pause_event.clear() # Limpa a pausa se estiver pausado
+            job.state['running'] = False
+            job.state['paused'] = False
+        return True
+
+job_manager = JobManager()
+
+# --- Compressão de Snapshots e Relatórios ---
+# Snapshots JSON/NDJSON, relatórios e seus CSVs podem ser gravados comprimidos
+# com gzip, lzma ou bz2. O codec é indicado pelo sufixo do arquivo (ex.:
+# collected_info_..._<id>.ndjson.gz) e os leitores descomprimem em streaming
+# por open_storage_file. Snapshots binários (.snap) nunca são comprimidos:
+# eles são mapeados em memória.
+
+compression_settings = {'codec': DEFAULT_COMPRESSION, 'level': DEFAULT_COMPRESSION_LEVEL} # Protegido por state_lock
+
+_COMPRESSION_MAGIC = {'gzip': b'\x1f\x8b\x08', 'lzma': b'\xfd7zXZ\x00', 'bz2': b'BZh'}
+_DECOMPRESSION_ERRORS = (OSError, EOFError, ValueError, zlib.error, lzma.LZMAError)
+
+def get_compression_settings():
+    """Codec e nível usados nos próximos snapshots e relatórios gravados."""
+    with state_lock:
+        return dict(compression_settings)
+
+def set_compression_settings(codec, level):
+    """Altera o codec e o nível (ajustado à faixa do codec). Levanta ValueError se o codec for inválido."""
+    if codec not in COMPRESSION_CODECS:
+        raise ValueError(f"Codec de compressão inválido: {codec}")
+    if codec in COMPRESSION_LEVELS:
+        lowest, highest = COMPRESSION_LEVELS[codec]
+        level = max(lowest, min(int(level), highest))
+    with state_lock:
+        compression_settings.update(codec=codec, level=level)
+    return get_compression_settings()
+
+def split_compression_suffix(filename):
+    """Retorna (nome sem o sufixo de compressão, codec), com codec None se o arquivo não for comprimido."""
+    for codec, suffix in COMPRESSION_SUFFIXES.items():
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)], codec
+    return filename, None
+
+def compressed_filename(filename, settings):
+    """Acrescenta ao nome o sufixo do codec configurado em settings (ver get_compression_settings)."""
+    return filename + COMPRESSION_SUFFIXES.get(settings['codec'], '')
+
+def _storage_codec(filepath):
+    """Codec de um arquivo pelo sufixo, ignorando o '.tmp' dos arquivos em gravação."""
+    if filepath.endswith('.tmp'):
+        filepath = filepath[:-len('.tmp')]
+    return split_compression_suffix(filepath)[1]
+
+def _open_codec_stream(fileobj, mode, codec, level=None):
+    """Envolve um arquivo binário aberto em um (des)compressor do codec; mode é 'rb' ou 'wb'."""
+    if level is None:
+        level = get_compression_settings()['level']
+    writing = mode == 'wb'
+    if codec == 'gzip':
+        return gzip.GzipFile(filename='', fileobj=fileobj, mode=mode, **({'compresslevel': level} if writing else {}))
+    if codec == 'lzma':
+        return lzma.LZMAFile(fileobj, mode, **({'preset': level} if writing else {}))
+    return bz2.BZ2File(fileobj, mode, **({'compresslevel': level} if writing else {}))
+
+def open_storage_file(filepath, mode='r', newline=None):
+    """
+    Abre um snapshot ou relatório como open(), comprimindo/descomprimindo em
+    streaming conforme o sufixo do nome. Modos de texto usam UTF-8.
+    """
+    codec = _storage_codec(filepath)
+    kwargs = {} if 'b' in mode else {'encoding': 'utf-8', 'newline': newline}
+    if codec is None:
+        return open(filepath, mode, **kwargs)
+    if 'b' not in mode:
+        mode += 't'
+    if mode.startswith('w'):
+        kwargs['preset' if codec == 'lzma' else 'compresslevel'] = get_compression_settings()['level']
+    opener = {'gzip': gzip.open, 'lzma': lzma.open, 'bz2': bz2.open}[codec]
+    return opener(filepath, mode, **kwargs)
+
+# --- Catálogo de Relatórios ---
+# Cada diretório de relatórios mantém um índice (CATALOG_FILENAME) com o resumo
+# de cada relatório, gravado no momento em que o relatório é salvo. Assim, listar
+# os relatórios não exige abrir os arquivos completos (que podem ter vários GB).
+
+CATALOG_FILENAME = '.report_catalog.json'
+catalog_lock = threading.Lock()
+_catalog_cache = {} # diretório -> {'dir_mtime_ns': ..., 'entries': {...}}
+
+def summarize_collection_report(data):
+    """Extrai o resumo de um relatório de coleta."""
+    return {
+        'collection_type': data.get('collection_type', 'unknown'),
+        'timestamp': data.get('timestamp', 'N/A'),
+        'directory_path': data.get('base_directory', 'N/A'),
+        'inaccessible_count': data.get('inaccessible_files_count', 0),
+        'filters': data.get('filters')
+    }
+
+def summarize_comparison_report(data):
+    """Extrai o resumo de um relatório de comparação."""
+    not_copied_count = data.get('not_copied_files_count')
+    if not_copied_count is None:
+        not_copied_count = len(data.get('not_copied_files_details', []))
+    return {
+        'timestamp': data.get('timestamp', 'N/A'),
+        'dir_origem': data.get('dir_origem', 'N/A'),
+        'dir_destino': data.get('dir_destino', 'N/A'),
+        'not_copied_count': not_copied_count
+    }
+
+def summarize_copy_report(data):
+    """Extrai o resumo de um relatório de cópia."""
+    return {
+        'timestamp': data.get('timestamp', 'N/A'),
+        'source_base_directory': data.get('source_base_directory', 'N/A'),
+        'destination_base_directory': data.get('destination_base_directory', 'N/A'),
+        'total_files_attempted': data.get('total_files_attempted', 0),
+        'files_copied_successfully': data.get('files_copied_successfully', 0),
+        'files_failed_to_copy': data.get('files_failed_to_copy', 0)
+    }
+
+def summarize_dedup_report(data):
+    """Extrai o resumo de um relatório de duplicados."""
+    return {
+        'timestamp': data.get('timestamp', 'N/A'),
+        'snapshot_filename': data.get('snapshot_filename', 'N/A'),
+        'base_directory': data.get('base_directory', 'N/A'),
+        'duplicate_groups_count': data.get('duplicate_groups_count', 0),
+        'duplicate_files_count': data.get('duplicate_files_count', 0),
+        'reclaimable_bytes': data.get('reclaimable_bytes', 0)
+    }
+
+# Prefixo do nome do arquivo -> função que gera o resumo
+REPORT_SUMMARIZERS = {
+    'collected_info_': summarize_collection_report,
+    'comparison_result_': summarize_comparison_report,
+    'copy_report_': summarize_copy_report,
+    'dedup_report_': summarize_dedup_report
+}
+
+def get_report_summarizer(filename):
+    """Retorna a função de resumo adequada ao nome do arquivo, ou None se não for um relatório."""
+    if not split_compression_suffix(filename)[0].endswith(('.json', '.ndjson', '.snap')):
+        return None
+    for prefix, summarize in REPORT_SUMMARIZERS.items():
+        if filename.startswith(prefix):
+            return summarize
+    return None
+
+def read_report_summary(filepath, summarize):
+    """Lê um relatório completo para gerar seu resumo (usado apenas para relatórios fora do catálogo)."""
+    if get_snapshot_format(filepath) != 'json':
+        return summarize(read_snapshot_metadata(filepath))
+    with open_storage_file(filepath) as f:
+        return summarize(json.load(f))
+
+def load_report_catalog(directory):
+    """Carrega as entradas do catálogo persistente de um diretório."""
+    catalog_path = os.path.join(directory, CATALOG_FILENAME)
+    try:
+        with open(catalog_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('entries', {})
+    except FileNotFoundError:
+        return {}
+    except (json.JSONDecodeError, IOError, AttributeError) as e:
+        logger.warning(f"Catálogo de relatórios inválido em {directory}, será reconstruído: {e}")
+        return {}
+
+def save_report_catalog(directory, entries):
+    """Grava o catálogo de forma atômica (arquivo temporário + os.replace)."""
+    catalog_path = os.path.join(directory, CATALOG_FILENAME)
+    temp_path = f"{catalog_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'entries': entries}, f, ensure_ascii=False)
+        os.replace(temp_path, catalog_path)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o catálogo de relatórios em {directory}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _get_catalog_entries(directory):
+    """Retorna as entradas do catálogo em memória, carregando do disco se necessário. Requer catalog_lock."""
+    cached = _catalog_cache.get(directory)
+    if cached is None:
+        cached = {'dir_mtime_ns': None, 'entries': load_report_catalog(directory)}
+        _catalog_cache[directory] = cached
+    return cached['entries']
+
+def catalog_report(directory, filename, report_data):
+    """Registra no catálogo o resumo de um relatório recém-salvo."""
+    summarize = get_report_summarizer(filename)
+    if summarize is None:
+        return
+    with catalog_lock:
+        try:
+            stat_info = os.stat(os.path.join(directory, filename))
+        except OSError:
+            return
+        entries = _get_catalog_entries(directory)
+        entries[filename] = {
+            'mtime_ns': stat_info.st_mtime_ns,
+            'size': stat_info.st_size,
+            'summary': summarize(report_data)
+        }
+        save_report_catalog(directory, entries)
+
+def list_catalog_reports(directory, prefix):
+    """
+    Retorna [(nome_do_arquivo, resumo)] dos relatórios com o prefixo dado.
+    Enquanto o mtime do diretório não muda, a lista vem da memória; quando muda,
+    o diretório é relistado e só relatórios desconhecidos ao catálogo são lidos.
+    """
+    with catalog_lock:
+        try:
+            dir_mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return []
+
+        entries = _get_catalog_entries(directory)
+        cached = _catalog_cache[directory]
+        if cached['dir_mtime_ns'] != dir_mtime_ns:
+            changed = False
+            present = set()
+            with os.scandir(directory) as it:
+                for entry in it:
+                    summarize = get_report_summarizer(entry.name)
+                    if summarize is None:
+                        continue
+                    present.add(entry.name)
+                    try:
+                        stat_info = entry.stat()
+                    except OSError:
+                        continue
+                    known = entries.get(entry.name)
+                    if known and known.get('mtime_ns') == stat_info.st_mtime_ns and known.get('size') == stat_info.st_size:
+                        continue
+                    try:
+                        summary = read_report_summary(entry.path, summarize)
+                    except (json.JSONDecodeError, *_DECOMPRESSION_ERRORS) as e:
+                        # Inclui arquivos comprimidos truncados (EOFError), ex.: gravados por fora do app
+                        logger.warning(f"Não foi possível ler ou decodificar o relatório: {entry.name} - {e}")
+                        continue
+                    entries[entry.name] = {'mtime_ns': stat_info.st_mtime_ns, 'size': stat_info.st_size, 'summary': summary}
+                    changed = True
+
+            for filename in list(entries):
+                if filename not in present:
+                    del entries[filename]
+                    changed = True
+
+            if changed:
+                save_report_catalog(directory, entries)
+            # O próprio catálogo altera o mtime do diretório ao ser gravado
+            cached['dir_mtime_ns'] = os.stat(directory).st_mtime_ns
+
+        return [(filename, entry['summary']) for filename, entry in entries.items() if filename.startswith(prefix)]
+
+def format_report_timestamp(timestamp_raw):
+    """Formata um timestamp ISO para exibição, mantendo o valor original se for inválido."""
+    try:
+        return datetime.fromisoformat(timestamp_raw).strftime("%d/%m/%Y %H:%M:%S")
+    except (TypeError, ValueError):
+        return timestamp_raw
+
+# --- Funções para Obter JSONs Disponíveis ---
+
+def _sorted_by_timestamp(reports):
+    """Ordena do mais recente para o mais antigo pelo timestamp ISO e o formata para exibição."""
+    reports.sort(key=lambda x: str(x['timestamp']), reverse=True)
+    for report in reports:
+        report['timestamp'] = format_report_timestamp(report['timestamp'])
+    return reports
+
+def get_available_info_jsons():
+    """Retorna uma lista de dicionários com informações dos JSONs de coleta disponíveis."""
+    return _sorted_by_timestamp([
+        dict(summary, filename=filename)
+        for filename, summary in list_catalog_reports(INFO_DIR, 'collected_info_')
+    ])
+
+def get_available_comparison_jsons():
+    """Retorna uma lista de dicionários com informações dos JSONs de comparação disponíveis."""
+    return _sorted_by_timestamp([
+        dict(summary, filename=filename)
+        for filename, summary in list_catalog_reports(RESULTS_DIR, 'comparison_result_')
+    ])
+
+def get_available_copy_reports():
+    """Retorna uma lista de dicionários com informações dos JSONs de relatório de cópia disponíveis."""
+    return _sorted_by_timestamp([
+        dict(summary, filename=filename)
+        for filename, summary in list_catalog_reports(RESULTS_DIR, 'copy_report_')
+    ])
+
+def get_available_dedup_reports():
+    """Retorna uma lista de dicionários com informações dos relatórios de duplicados disponíveis."""
+    return _sorted_by_timestamp([
+        dict(summary, filename=filename)
+        for filename, summary in list_catalog_reports(RESULTS_DIR, 'dedup_report_')
+    ])
+
+# --- Índice de Relatórios ---
+# As páginas de relatório carregam as linhas sob demanda (ver /api/reports). Na
+# primeira consulta, as listas do relatório são copiadas para um banco SQLite
+# em REPORT_INDEX_DIR, com índices por status, caminho e tamanho; o índice é
+# refeito se o JSON do relatório mudar.
+
+REPORT_INDEX_DIR = os.path.join(RESULTS_DIR, '.report_index')
+REPORT_INDEX_VERSION = 1
+REPORT_INDEX_BATCH_SIZE = 10000
+REPORT_PAGE_SIZE = 100
+REPORT_MAX_PAGE_SIZE = 1000
+REPORT_SORT_COLUMNS = ('path', 'size', 'status')
+
+# Prefixo do nome do arquivo -> listas de linhas do relatório (a primeira é a padrão da API)
+REPORT_ROW_LISTS = {
+    'comparison_result_': ('not_copied_files_details',),
+    'copy_report_': ('successful_copies', 'failed_copies'),
+    'dedup_report_': ('duplicate_groups',)
+}
+
+report_index_locks = defaultdict(threading.Lock) # relatório -> lock da construção do índice
+
+def get_report_row_lists(filename):
+    """Listas de linhas paginadas do relatório, ou None se o tipo de relatório não tiver listas."""
+    for prefix, lists in REPORT_ROW_LISTS.items():
+        if filename.startswith(prefix) and split_compression_suffix(filename)[0].endswith('.json'):
+            return lists
+    return None
+
+def iter_report_rows(filepath, list_keys):
+    """
+    Gera (lista, linha) para cada linha das listas list_keys de um relatório
+    JSON; o valor de retorno do gerador é o restante do relatório (com as
+    listas vazias). Relatórios gravados em streaming (uma linha por registro,
+    ver ComparisonResultWriter e write_report_json) são lidos linha a linha,
+    sem carregar o documento; os demais são carregados inteiros.
+    """
+    header_lines = []
+    current_list = None
+    rows_read = 0
+    with open_storage_file(filepath) as f:
+        for line in f:
+            stripped = line.strip()
+            if current_list is None:
+                header_lines.append(line)
+                for key in list_keys:
+                    if stripped.startswith(f'"{key}": [') and stripped.rstrip(',') != f'"{key}": []':
+                        current_list = key
+                continue
+            if stripped.startswith(']'):
+                header_lines.append(line)
+                current_list = None
+                continue
+            try:
+                row = json.loads(stripped.rstrip(','))
+            except json.JSONDecodeError:
+                row = None
+            if not isinstance(row, dict):
+                if rows_read:
+                    raise ValueError(f"Linha inesperada no relatório: {stripped[:80]}")
+                break # O primeiro registro ocupa várias linhas: documento indentado
+            yield current_list, row
+            rows_read += 1
+        else:
+            return json.loads(''.join(header_lines))
+
+    # Formato indentado (relatórios de cópia antigos): carrega o documento inteiro
+    with open_storage_file(filepath) as f:
+        data = json.load(f)
+    for key in list_keys:
+        for row in data.get(key) or []:
+            yield key, row
+        data[key] = []
+    return data
+
+def read_report_rows(filepath, list_keys, on_row):
+    """Chama on_row(lista, linha) para cada linha de iter_report_rows e retorna o restante do relatório."""
+    rows = iter_report_rows(filepath, list_keys)
+    while True:
+        try:
+            list_key, row = next(rows)
+        except StopIteration as stop:
+            return stop.value
+        on_row(list_key, row)
+
+def write_report_json(f, data, list_keys):
+    """
+    Grava um relatório JSON com uma linha por registro nas listas list_keys,
+    no mesmo formato de ComparisonResultWriter, para que iter_report_rows o
+    leia em streaming.
+    """
+    f.write('{')
+    for position, (key, value) in enumerate(data.items()):
+        f.write(',\n' if position else '\n')
+        if key in list_keys and value:
+            f.write(f'    {json.dumps(key)}: [')
+            for index, row in enumerate(value):
+                f.write(f"{',' if index else ''}\n        {json.dumps(row, ensure_ascii=False)}")
+            f.write('\n    ]')
+        else:
+            f.write(f'    {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}')
+    f.write('\n}\n')
+
+def normalize_report_path_prefix(path_prefix):
+    """Prefixo de caminho digitado pelo usuário com os separadores do sistema, como nos relatórios."""
+    return path_prefix.replace('/', os.sep).replace('\\', os.sep)
+
+def _report_row_fields(row):
+    """(status, caminho, tamanho) usados para filtrar e ordenar uma linha de relatório."""
+    status = row.get('status') or row.get('match')
+    path = row.get('relative_path') or next(iter(row.get('files') or []), None)
+    size = row.get('size_origem') if row.get('size_origem') is not None else row.get('size')
+    return status, path, size
+
+def build_report_index(json_filepath, index_path, list_keys, source):
+    """Cria o índice SQLite das listas do relatório (arquivo temporário + os.replace)."""
+    os.makedirs(REPORT_INDEX_DIR, exist_ok=True)
+    temp_path = f"{index_path}.{uuid.uuid4().hex}.tmp"
+    conn = sqlite3.connect(temp_path)
+    try:
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        conn.execute('CREATE TABLE rows (id INTEGER PRIMARY KEY, list TEXT NOT NULL, status TEXT, path TEXT, size INTEGER, data TEXT NOT NULL)')
+        batch = []
+
+        def on_row(list_key, row):
+            batch.append((list_key, *_report_row_fields(row), json.dumps(row, ensure_ascii=False)))
+            if len(batch) >= REPORT_INDEX_BATCH_SIZE:
+                conn.executemany('INSERT INTO rows (list, status, path, size, data) VALUES (?, ?, ?, ?, ?)', batch)
+                batch.clear()
+
+        summary = read_report_rows(json_filepath, list_keys, on_row)
+        conn.executemany('INSERT INTO rows (list, status, path, size, data) VALUES (?, ?, ?, ?, ?)', batch)
+        for column in REPORT_SORT_COLUMNS:
+            conn.execute(f'CREATE INDEX rows_{column} ON rows (list, {column})')
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', [('source', source), ('summary', json.dumps(summary, ensure_ascii=False))])
+        conn.commit()
+    except BaseException:
+        conn.close()
+        os.remove(temp_path)
+        raise
+    conn.close()
+    os.replace(temp_path, index_path)
+
+def _connect_report_index(index_path, source):
+    """Abre um índice existente se ele corresponder à versão atual do relatório; senão retorna None."""
+    if not os.path.exists(index_path):
+        return None
+    conn = None
+    try:
+        conn = sqlite3.connect(index_path)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+    except sqlite3.Error:
+        row = None
+    if row is None or row[0] != source:
+        if conn is not None:
+            conn.close()
+        return None
+    return conn
+
+def open_report_index(json_filename):
+    """
+    Retorna uma conexão ao índice do relatório, construindo-o na primeira
+    consulta ou se o relatório mudou. Levanta FileNotFoundError se o relatório
+    não existir e ValueError se o tipo de relatório não tiver linhas paginadas.
+    """
+    json_filename = secure_filename(json_filename)
+    list_keys = get_report_row_lists(json_filename)
+    if list_keys is None:
+        raise ValueError(f"Relatório sem listas paginadas: {json_filename}")
+    json_filepath = os.path.join(RESULTS_DIR, json_filename)
+    stat_info = os.stat(json_filepath)
+    source = f"{REPORT_INDEX_VERSION}:{stat_info.st_mtime_ns}:{stat_info.st_size}"
+    index_path = os.path.join(REPORT_INDEX_DIR, f"{json_filename}.sqlite3")
+    with report_index_locks[json_filename]: # Duas páginas abertas ao mesmo tempo constroem o índice uma vez
+        conn = _connect_report_index(index_path, source)
+        if conn is None:
+            started = time.perf_counter()
+            build_report_index(json_filepath, index_path, list_keys, source)
+            logger.info(f"Índice do relatório {json_filename} construído em {time.perf_counter() - started:.2f}s.")
+            conn = _connect_report_index(index_path, source)
+    return conn
+
+def describe_report_index(conn, list_keys):
+    """Resumo do relatório (sem as listas) e, por lista, o total de linhas e a contagem por status."""
+    summary = json.loads(conn.execute("SELECT value FROM meta WHERE key = 'summary'").fetchone()[0])
+    lists = {}
+    for key in list_keys:
+        statuses = dict(conn.execute('SELECT status, COUNT(*) FROM rows WHERE list = ? GROUP BY status', (key,)).fetchall())
+        lists[key] = {'total': sum(statuses.values()), 'statuses': statuses}
+    return summary, lists
+
+def query_report_rows(conn, list_key, status=None, path_prefix=None, min_size=None, max_size=None,
+                      sort=None, descending=False, page=1, page_size=REPORT_PAGE_SIZE):
+    """
+    Retorna uma página de linhas de uma lista do relatório, filtrada por
+    status, prefixo do caminho e faixa de tamanho e ordenada por uma coluna
+    de REPORT_SORT_COLUMNS (sem sort, na ordem do relatório).
+    """
+    conditions = ['list = ?']
+    params = [list_key]
+    if status:
+        conditions.append('status = ?')
+        params.append(status)
+    if path_prefix:
+        path_prefix = normalize_report_path_prefix(path_prefix)
+        conditions.append('path >= ? AND path < ?') # Faixa: usa o índice, ao contrário de LIKE
+        params += [path_prefix, path_prefix + '\U0010ffff']
+    if min_size is not None:
+        conditions.append('size >= ?')
+        params.append(min_size)
+    if max_size is not None:
+        conditions.append('size <= ?')
+        params.append(max_size)
+    where = ' AND '.join(conditions)
+    order = f"{sort} {'DESC' if descending else 'ASC'}, id" if sort else 'id'
+
+    total = conn.execute(f'SELECT COUNT(*) FROM rows WHERE {where}', params).fetchone()[0]
+    rows = conn.execute(f'SELECT data FROM rows WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?',
+                        params + [page_size, (page - 1) * page_size]).fetchall()
+    return {
+        'list': list_key,
+        'rows': [json.loads(data) for (data,) in rows],
+        'total': total,
+        'page': page,
+        'page_size': page_size,
+        'pages': max(1, math.ceil(total / page_size))
+    }
+
+# --- Exportação de Relatórios ---
+# CSV ou NDJSON gerado sob demanda a partir do JSON do relatório, lido em
+# streaming por iter_report_rows e enviado em blocos (resposta chunked): o
+# download começa de imediato e a memória do servidor não cresce com o relatório.
+
+REPORT_EXPORT_FORMATS = ('csv', 'ndjson')
+REPORT_EXPORT_CHUNK_SIZE = 64 * 1024
+COPY_REPORT_CSV_HEADER = ["Caminho Relativo", "Caminho Origem", "Caminho Destino", "Status", "Mensagem de Erro", "Timestamp"]
+
+def comparison_csv_row(record):
+    """Linha do CSV de arquivos não copiados (ver ComparisonResultWriter.CSV_HEADER)."""
+    return [
+        record.get('relative_path', 'N/A'),
+        record.get('status', 'N/A'),
+        record.get('size_origem', 'N/A'),
+        record.get('mtime_origem', 'N/A'),
+        record.get('size_destino', 'N/A'),
+        record.get('mtime_destino', 'N/A'),
+        record.get('moved_from', '')
+    ]
+
+def copy_csv_row(entry):
+    """Linha do CSV de cópias (ver COPY_REPORT_CSV_HEADER)."""
+    return [
+        entry.get('relative_path', 'N/A'),
+        entry.get('source_path', 'N/A'),
+        entry.get('destination_path', 'N/A'),
+        entry.get('status', 'N/A'),
+        entry.get('error_message', 'N/A'),
+        entry.get('timestamp', 'N/A')
+    ]
+
+def report_csv_layout(list_key):
+    """(cabeçalho, função (número, linha) -> linhas do CSV) da exportação de uma lista de relatório."""
+    if list_key == 'not_copied_files_details':
+        return ComparisonResultWriter.CSV_HEADER, lambda number, row: [comparison_csv_row(row)]
+    if list_key == 'duplicate_groups':
+        return DuplicateReportWriter.CSV_HEADER, lambda number, group: [
+            [number, group.get('size'), group.get('hash'), path] for path in group.get('files') or []
+        ]
+    return COPY_REPORT_CSV_HEADER, lambda number, row: [copy_csv_row(row)]
+
+def report_row_matches(row, status=None, path_prefix=None, min_size=None, max_size=None):
+    """Aplica a uma linha os mesmos filtros de query_report_rows."""
+    row_status, path, size = _report_row_fields(row)
+    if status and row_status != status:
+        return False
+    if path_prefix and not (path or '').startswith(normalize_report_path_prefix(path_prefix)):
+        return False
+    if min_size is not None and (size is None or size < min_size):
+        return False
+    if max_size is not None and (size is None or size > max_size):
+        return False
+    return True
+
+def iter_report_export(json_filepath, list_keys, list_key, export_format, **filters):
+    """Gera o conteúdo exportado (CSV ou NDJSON) das linhas filtradas de list_key, em blocos de texto."""
+    buffer = io.StringIO()
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        header, to_csv_rows = report_csv_layout(list_key)
+        writer.writerow(header)
+        yield buffer.getvalue() # O cabeçalho sai de imediato, mesmo com filtros que descartam muitas linhas
+        buffer.seek(0)
+        buffer.truncate()
+    exported = 0
+    # Todas as listas do relatório são lidas (e as demais, descartadas) para que
+    # nenhuma seja acumulada como parte do cabeçalho
+    for row_list, row in iter_report_rows(json_filepath, list_keys):
+        if row_list != list_key or not report_row_matches(row, **filters):
+            continue
+        exported += 1
+        if export_format == 'csv':
+            writer.writerows(to_csv_rows(exported, row))
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False) + '\n')
+        if buffer.tell() >= REPORT_EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+# --- Snapshots de Coleta ---
+# Formato 'ndjson': uma linha de cabeçalho, uma linha por arquivo (gravada durante
+# a varredura) e uma linha final (trailer) com as contagens e os arquivos inacessíveis.
+# Formato 'json': o documento único original, com todos os arquivos na chave 'files'.
+# Formato 'snap': binário compacto, ordenado por caminho e mapeado em memória (ver BinarySnapshot).
+
+SNAPSHOT_FORMATS = ('ndjson', 'json', 'snap')
+DEFAULT_SNAPSHOT_FORMAT = 'ndjson'
+NDJSON_SNAPSHOT_VERSION = 1
+
+def get_snapshot_format(filepath):
+    """Retorna o formato do snapshot de coleta ('ndjson', 'snap' ou 'json') a partir da extensão."""
+    filepath = split_compression_suffix(filepath)[0]
+    if filepath.endswith('.ndjson'):
+        return 'ndjson'
+    if filepath.endswith('.snap'):
+        return 'snap'
+    return 'json'
+
+def _open_ndjson_segment(raw, codec):
+    """
+    Inicia um trecho de texto do snapshot NDJSON sobre o arquivo binário raw.
+    Em arquivos comprimidos, cada trecho é um fluxo comprimido independente
+    (gzip, xz e bz2 aceitam fluxos concatenados), para que as linhas de
+    diretório e o trailer possam ser lidos sem descomprimir os arquivos.
+    """
+    return io.TextIOWrapper(raw if codec is None else _open_codec_stream(raw, 'wb', codec), encoding='utf-8')
+
+def _close_ndjson_segment(segment, raw, codec):
+    """Encerra o trecho sem fechar raw e retorna a posição (em raw) em que o próximo trecho começa."""
+    stream = segment.detach()
+    if codec is not None:
+        stream.close() # Finaliza o fluxo comprimido; raw continua aberto
+    return raw.tell()
+
+def write_ndjson_snapshot(filepath, header, records, inaccessible_files, directories=None, trailer_extra=None,
+                          directory_digests=None):
+    """
+    Grava um snapshot NDJSON consumindo records (iterável de (caminho, info))
+    em streaming. O arquivo é escrito com nome temporário e renomeado ao final,
+    para que um snapshot incompleto nunca apareça nas listagens.
+    directories (mtime de cada diretório), directory_digests (resumo de cada
+    diretório) e trailer_extra podem ser preenchidos durante a iteração de
+    records: só são gravados depois dela, nas linhas de diretório (cuja posição
+    fica no trailer) e no trailer.
+    Retorna os metadados do snapshot (cabeçalho + trailer).
+    """
+    temp_path = f"{filepath}.tmp"
+    codec = _storage_codec(filepath)
+    total_files = 0
+    try:
+        with open(temp_path, 'wb') as raw:
+            f = _open_ndjson_segment(raw, codec)
+            header = dict(header, type='header', version=NDJSON_SNAPSHOT_VERSION)
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+            for path, info in records:
+                f.write(json.dumps({'path': path, **info}, ensure_ascii=False) + '\n')
+                total_files += 1
+            directories_offset = _close_ndjson_segment(f, raw, codec)
+            f = _open_ndjson_segment(raw, codec)
+            directories = directories or {}
+            directory_digests = directory_digests or {}
+            for relative_dir, mtime in directories.items():
+                line = {'dir': relative_dir, 'mtime': mtime}
+                if relative_dir in directory_digests:
+                    line['digest'] = directory_digests[relative_dir]
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+            for relative_dir, digest in directory_digests.items():
+                if relative_dir not in directories:
+                    f.write(json.dumps({'dir': relative_dir, 'mtime': None, 'digest': digest}, ensure_ascii=False) + '\n')
+            _close_ndjson_segment(f, raw, codec)
+            trailer = {
+                'type': 'trailer',
+                'total_files_scanned': total_files,
+                'directories_offset': directories_offset,
+                'inaccessible_files_count': len(inaccessible_files),
+                'inaccessible_files_details': inaccessible_files,
+                'interrupted': stop_requested(),
+                **(trailer_extra or {})
+            }
+            if codec is not None:
+                trailer['compression'] = codec # directories_offset é a posição no arquivo comprimido
+            f = _open_ndjson_segment(raw, codec)
+            f.write(json.dumps(trailer, ensure_ascii=False) + '\n')
+            _close_ndjson_segment(f, raw, codec)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return merge_snapshot_metadata(header, trailer)
+
+def merge_snapshot_metadata(header, trailer):
+    """Combina cabeçalho e trailer NDJSON em um dicionário no formato das chaves do JSON legado."""
+    metadata = {k: v for k, v in header.items() if k != 'type'}
+    if trailer:
+        metadata.update({k: v for k, v in trailer.items() if k != 'type'})
+    return metadata
+
+def _read_last_line(filepath, block_size=65536):
+    """Lê a última linha não vazia de um arquivo lendo blocos a partir do fim."""
+    codec = _storage_codec(filepath)
+    if codec is not None:
+        return _read_compressed_last_line(filepath, codec, block_size)
+    with open(filepath, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+            stripped = data.rstrip(b'\n')
+            newline_index = stripped.rfind(b'\n')
+            if newline_index != -1:
+                return stripped[newline_index + 1:].decode('utf-8')
+        return data.rstrip(b'\n').decode('utf-8')
+
+def _read_compressed_last_line(filepath, codec, block_size):
+    """
+    Lê a última linha de um arquivo comprimido. O trailer dos snapshots NDJSON
+    é gravado como um fluxo comprimido próprio (ver _open_ndjson_segment): o
+    início desse fluxo é procurado a partir do fim e só ele é descomprimido.
+    Sem esse fluxo (ex.: arquivo comprimido por outra ferramenta), o arquivo é
+    descomprimido inteiro.
+    """
+    magic = _COMPRESSION_MAGIC[codec]
+    decompress = {'gzip': gzip.decompress, 'lzma': lzma.decompress, 'bz2': bz2.decompress}[codec]
+    with open(filepath, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+        tail_size = min(block_size, file_size)
+        while True:
+            f.seek(file_size - tail_size)
+            tail = f.read(tail_size)
+            position = tail.rfind(magic)
+            while position != -1:
+                candidate, position = position, tail.rfind(magic, 0, position)
+                try:
+                    text = decompress(tail[candidate:]).rstrip(b'\n')
+                except _DECOMPRESSION_ERRORS:
+                    continue # Os bytes mágicos apareceram dentro de dados comprimidos
+                if text:
+                    return text[text.rfind(b'\n') + 1:].decode('utf-8')
+            if tail_size >= min(file_size, COMPRESSED_TRAILER_MAX_SCAN):
+                break
+            tail_size = min(tail_size * 4, file_size, COMPRESSED_TRAILER_MAX_SCAN)
+
+    last_line = ''
+    with open_storage_file(filepath) as f:
+        for line in f:
+            if line.strip():
+                last_line = line
+    return last_line.rstrip('\n')
+
+def read_snapshot_metadata(filepath):
+    """
+    Retorna os metadados de um snapshot de coleta (tudo exceto a lista de arquivos).
+    No formato NDJSON apenas o cabeçalho e o trailer são lidos.
+    """
+    snapshot_format = get_snapshot_format(filepath)
+    if snapshot_format == 'snap':
+        with BinarySnapshot(filepath) as snapshot:
+            return dict(snapshot.metadata)
+    if snapshot_format == 'json':
+        with open_storage_file(filepath) as f:
+            data = json.load(f)
+        data.pop('files', None)
+        return data
+
+    with open_storage_file(filepath) as f:
+        header = json.loads(f.readline())
+    if header.get('type') != 'header':
+        raise ValueError(f"Snapshot NDJSON sem cabeçalho: {filepath}")
+    trailer = json.loads(_read_last_line(filepath))
+    if trailer.get('type') != 'trailer':
+        trailer = None # Snapshot truncado: sem contagens finais
+    return merge_snapshot_metadata(header, trailer)
+
+def open_snapshot(filepath):
+    """
+    Abre um snapshot de coleta e retorna (metadados, iterador de (caminho, info)).
+    O JSON legado é carregado uma única vez; NDJSON e binário são lidos de forma preguiçosa.
+    """
+    if get_snapshot_format(filepath) == 'json':
+        with open_storage_file(filepath) as f:
+            data = json.load(f)
+        files = data.pop('files', {})
+        return data, iter_skippable(files.items())
+    return read_snapshot_metadata(filepath), iter_snapshot_files(filepath)
+
+def iter_skippable(items):
+    """Gera os itens de items; send(n) pula os n itens seguintes e retorna o próximo."""
+    iterator = iter(items)
+    for item in iterator:
+        skip = yield item
+        if skip:
+            deque(islice(iterator, skip), maxlen=0)
+
+def iter_snapshot_files(filepath):
+    """
+    Gera (caminho_relativo, info) para cada arquivo do snapshot, lendo NDJSON/binário
+    de forma preguiçosa. send(n) pula os n arquivos seguintes e retorna o próximo,
+    sem decodificá-los (usado para pular subárvores idênticas na comparação).
+    """
+    snapshot_format = get_snapshot_format(filepath)
+    if snapshot_format == 'json':
+        with open_storage_file(filepath) as f:
+            data = json.load(f)
+        yield from iter_skippable(data.get('files', {}).items())
+        return
+    if snapshot_format == 'snap':
+        with BinarySnapshot(filepath) as snapshot:
+            yield from snapshot.items()
+        return
+
+    with open_storage_file(filepath) as f:
+        for line in f:
+            record = json.loads(line)
+            path = record.pop('path', None)
+            if path is not None:
+                skip = yield path, record
+                if skip:
+                    # As linhas de arquivo vêm antes das de diretório: basta não decodificá-las
+                    deque(islice(f, skip), maxlen=0)
+
+def _iter_ndjson_directory_lines(filepath):
+    """Gera as linhas de diretório de um snapshot NDJSON, indo direto a elas se o trailer registrar a posição."""
+    metadata = read_snapshot_metadata(filepath)
+    offset = metadata.get('directories_offset') or 0
+    codec = _storage_codec(filepath)
+    with open(filepath, 'rb') as raw:
+        if codec is not None and metadata.get('compression') == codec:
+            # As linhas de diretório começam um fluxo comprimido próprio nessa posição
+            raw.seek(offset)
+            f = _open_codec_stream(raw, 'rb', codec)
+        elif codec is not None:
+            f = _open_codec_stream(raw, 'rb', codec)
+            f.seek(offset) # Posição no conteúdo descomprimido (arquivo comprimido por outra ferramenta)
+        else:
+            f = raw
+            f.seek(offset)
+        for line in f:
+            if line.startswith(b'{"dir"'):
+                yield json.loads(line)
+
+def iter_snapshot_directories(filepath):
+    """Gera (diretorio_relativo, mtime) dos diretórios registrados no snapshot (vazio em snapshots antigos)."""
+    if get_snapshot_format(filepath) != 'ndjson':
+        yield from (read_snapshot_metadata(filepath).get('directories') or {}).items()
+        return
+
+    for record in _iter_ndjson_directory_lines(filepath):
+        if record['mtime'] is not None:
+            yield record['dir'], record['mtime']
+
+def load_directory_digests(filepath, metadata):
+    """Retorna {diretório: resumo} gravado no snapshot (ver iter_with_directory_digests); vazio em snapshots antigos."""
+    if get_snapshot_format(filepath) != 'ndjson':
+        return metadata.get('directory_digests') or {}
+    return {record['dir']: record['digest'] for record in _iter_ndjson_directory_lines(filepath) if 'digest' in record}
+
+DIGEST_MODULUS = 1 << 128
+
+def iter_with_directory_digests(records, hash_algorithm, digests):
+    """
+    Repassa records (pares (caminho, info)) e, ao final, preenche digests com
+    o resumo de cada diretório: a soma (módulo 2^128) de um hash por arquivo da
+    subárvore — caminho relativo, tamanho, mtime e, se houver, o hash do
+    conteúdo — e a quantidade de arquivos. A soma não depende da ordem dos
+    registros, então vale também para a varredura paralela. Dois snapshots com
+    o mesmo resumo para um diretório têm os mesmos arquivos nessa subárvore.
+    """
+    sums = defaultdict(int)
+    counts = defaultdict(int)
+    for path, info in records:
+        entry = f"{path}\0{info.get('size')}\0{info.get('mtime')!r}\0{info.get(hash_algorithm) or '' if hash_algorithm else ''}"
+        value = int.from_bytes(hashlib.blake2b(entry.encode('utf-8', 'surrogatepass'), digest_size=16).digest(), 'little')
+        directory = os.path.dirname(path)
+        while True:
+            sums[directory] = (sums[directory] + value) % DIGEST_MODULUS
+            counts[directory] += 1
+            if not directory:
+                break
+            directory = os.path.dirname(directory)
+        yield path, info
+    for directory, total in sums.items():
+        digests[directory] = f"{counts[directory]}:{total:032x}"
+
+def find_identical_subtrees(digests_origem, digests_destino):
+    """
+    Retorna {diretório: nº de arquivos} das subárvores de resumo igual nos dois
+    snapshots, apenas as mais altas (descendentes de uma subárvore idêntica não
+    são listados).
+    """
+    identical = {directory for directory, digest in digests_origem.items() if digests_destino.get(directory) == digest}
+    subtrees = {}
+    for directory in identical:
+        parent = directory
+        while parent:
+            parent = os.path.dirname(parent)
+            if parent in identical:
+                break
+        else:
+            subtrees[directory] = int(digests_origem[directory].split(':', 1)[0])
+    return subtrees
+
+def build_snapshot_index(filepath, files):
+    """
+    Monta o mapeamento caminho -> info usado nas consultas por caminho: um
+    BinarySnapshot (nada é carregado em memória) para snapshots binários, ou um
+    dicionário construído a partir de files para os demais formatos.
+    O chamador deve fechá-lo com close_snapshot_index.
+    """
+    if get_snapshot_format(filepath) == 'snap':
+        return BinarySnapshot(filepath)
+    return dict(files)
+
+def close_snapshot_index(index):
+    """Libera o mapeamento retornado por build_snapshot_index."""
+    if isinstance(index, BinarySnapshot):
+        index.close()
+
+# --- Snapshot Binário ---
+# Layout (little-endian):
+#   cabeçalho  : _SNAP_HEADER (magic, versão, largura do hash, nº de arquivos e offsets das seções)
+#   metadados  : JSON (UTF-8) com as mesmas chaves do cabeçalho/trailer NDJSON
+#   offsets    : uint64 por arquivo, posição do caminho na tabela de caminhos
+#   caminhos   : uint32 (tamanho) + caminho UTF-8, ordenados pela chave canônica
+#   colunas    : size (uint64), mtime (float64), flags (uint8) e hash (largura fixa)
+# Na tabela, o separador de diretórios é gravado como '\0', de modo que a ordem
+# dos bytes coincide com a ordem da travessia por componentes (snapshot_path_key).
+
+SNAPSHOT_MAGIC = b'CPYSNAP\x00'
+SNAPSHOT_BINARY_VERSION = 1
+_SNAP_HEADER = struct.Struct('<8sIIQQQQQQ')
+_SNAP_FLAG_HAS_HASH = 0x01
+
+def snapshot_path_key(path):
+    """Chave canônica de ordenação de caminhos: compara componente a componente."""
+    return path.replace(os.sep, '\0')
+
+class BinarySnapshot:
+    """Leitor somente leitura de um snapshot binário mapeado em memória, com busca binária por caminho."""
+
+    def __init__(self, filepath):
+        self._file = open(filepath, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            (magic, version, self.hash_width, self.count, metadata_offset, metadata_length,
+             self._offsets_offset, self._paths_offset, columns_offset) = _SNAP_HEADER.unpack_from(self._mm, 0)
+        except (ValueError, struct.error, OSError):
+            self._file.close()
+            raise ValueError(f"Arquivo não é um snapshot binário válido: {filepath}")
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_BINARY_VERSION:
+            self.close()
+            raise ValueError(f"Snapshot binário com assinatura ou versão desconhecida: {filepath}")
+
+        self.metadata = json.loads(self._mm[metadata_offset:metadata_offset + metadata_length].decode('utf-8'))
+        self._hash_field = self.metadata.get('hash_field', 'md5')
+        self._sizes_offset = columns_offset
+        self._mtimes_offset = self._sizes_offset + 8 * self.count
+        self._flags_offset = self._mtimes_offset + 8 * self.count
+        self._hashes_offset = self._flags_offset + self.count
+
+    def close(self):
+        if getattr(self, '_mm', None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _key_at(self, index):
+        path_offset = self._paths_offset + struct.unpack_from('<Q', self._mm, self._offsets_offset + 8 * index)[0]
+        length = struct.unpack_from('<I', self._mm, path_offset)[0]
+        return self._mm[path_offset + 4:path_offset + 4 + length]
+
+    def _path_at(self, index):
+        return self._key_at(index).decode('utf-8').replace('\0', os.sep)
+
+    def _info_at(self, index):
+        info = {
+            'size': struct.unpack_from('<Q', self._mm, self._sizes_offset + 8 * index)[0],
+            'mtime': struct.unpack_from('<d', self._mm, self._mtimes_offset + 8 * index)[0],
+            'md5': None
+        }
+        if self.hash_width and self._mm[self._flags_offset + index] & _SNAP_FLAG_HAS_HASH:
+            start = self._hashes_offset + self.hash_width * index
+            info[self._hash_field] = self._mm[start:start + self.hash_width].hex()
+        return info
+
+    def find(self, path):
+        """Busca binária pelo caminho; retorna o índice ou -1."""
+        target = snapshot_path_key(path).encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._key_at(low) == target:
+            return low
+        return -1
+
+    def get(self, path, default=None):
+        index = self.find(path)
+        return self._info_at(index) if index >= 0 else default
+
+    def __contains__(self, path):
+        return self.find(path) >= 0
+
+    def __getitem__(self, path):
+        index = self.find(path)
+        if index < 0:
+            raise KeyError(path)
+        return self._info_at(index)
+
+    def items(self):
+        """Gera (caminho, info) na ordem canônica; send(n) pula os n arquivos seguintes."""
+        index = 0
+        while index < self.count:
+            skip = yield self._path_at(index), self._info_at(index)
+            index += 1 + (skip or 0)
+
+def write_binary_snapshot(filepath, metadata, records):
+    """
+    Grava um snapshot binário a partir de records (iterável de (caminho, info)).
+    Os registros são ordenados em memória pela chave canônica antes da gravação.
+    Retorna os metadados gravados.
+    """
+    hash_field = metadata.get('hash_algorithm') or metadata.get('hash_field', 'md5')
+    rows = sorted(((snapshot_path_key(path).encode('utf-8'), info) for path, info in records), key=lambda row: row[0])
+    count = len(rows)
+
+    hash_width = 0
+    for _, info in rows:
+        if info.get(hash_field):
+            hash_width = len(bytes.fromhex(info[hash_field]))
+            break
+
+    metadata = dict(metadata, hash_field=hash_field, total_files_scanned=count, sorted=True)
+    metadata_bytes = json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+
+    path_offsets = array('Q')
+    sizes = array('Q')
+    mtimes = array('d')
+    flags = bytearray(count)
+    hashes = bytearray(hash_width * count)
+    paths_length = 0
+    for index, (key, info) in enumerate(rows):
+        path_offsets.append(paths_length)
+        paths_length += 4 + len(key)
+        sizes.append(info.get('size') or 0)
+        mtimes.append(info.get('mtime') or 0.0)
+        if hash_width and info.get(hash_field):
+            digest = bytes.fromhex(info[hash_field])
+            if len(digest) == hash_width:
+                flags[index] = _SNAP_FLAG_HAS_HASH
+                hashes[hash_width * index:hash_width * (index + 1)] = digest
+    if sys.byteorder != 'little':
+        for column in (path_offsets, sizes, mtimes):
+            column.byteswap()
+
+    metadata_offset = _SNAP_HEADER.size
+    offsets_offset = metadata_offset + len(metadata_bytes)
+    paths_offset = offsets_offset + 8 * count
+    columns_offset = paths_offset + paths_length
+
+    temp_path = f"{filepath}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(_SNAP_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_BINARY_VERSION, hash_width, count,
+                                      metadata_offset, len(metadata_bytes), offsets_offset, paths_offset, columns_offset))
+            f.write(metadata_bytes)
+            path_offsets.tofile(f)
+            for key, _ in rows:
+                f.write(struct.pack('<I', len(key)))
+                f.write(key)
+            sizes.tofile(f)
+            mtimes.tofile(f)
+            f.write(flags)
+            f.write(hashes)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return metadata
+
+def convert_snapshot_to_binary(source_path, destination_path):
+    """Converte um snapshot de coleta JSON/NDJSON existente para o formato binário."""
+    metadata, files = open_snapshot(source_path)
+    metadata.pop('type', None)
+    metadata['converted_from'] = os.path.basename(source_path)
+    if get_snapshot_format(source_path) == 'ndjson':
+        metadata['directory_digests'] = load_directory_digests(source_path, metadata)
+    metadata.pop('directories_offset', None)
+    return write_binary_snapshot(destination_path, metadata, files)
+
+# --- Filtros de Caminho (Incluir/Excluir) ---
+
+def normalize_filter_rules(rules):
+    """
+    Lista de regras a partir de uma lista ou de um texto com uma regra por
+    linha, sem espaços nas pontas, linhas vazias ou repetições. Levanta
+    ValueError para outros tipos.
+    """
+    if isinstance(rules, str):
+        rules = rules.splitlines()
+    elif rules is not None and not isinstance(rules, (list, tuple)):
+        raise ValueError(f"Regras de inclusão/exclusão devem ser um texto ou uma lista, não {type(rules).__name__}.")
+    normalized = []
+    for rule in rules or ():
+        if not isinstance(rule, str):
+            raise ValueError(f"Regra de inclusão/exclusão inválida: {rule!r}.")
+        rule = rule.strip()
+        if rule and rule not in normalized:
+            normalized.append(rule)
+    return normalized
+
+class PathFilter:
+    """
+    Regras de inclusão e exclusão de caminhos, compiladas uma única vez.
+    Regras glob sem '/' valem para o nome do arquivo ou diretório em qualquer
+    nível (ex.: '.git', 'node_modules', '*.tmp'); com '/' valem para o caminho
+    relativo inteiro (ex.: 'build/*.o'). Uma '/' final restringe a regra a
+    diretórios (ex.: 'cache/'). Regras com o prefixo 're:' são expressões
+    regulares buscadas no caminho relativo, sempre com '/' como separador.
+    Diretórios excluídos são podados da varredura. As regras de inclusão valem
+    apenas para arquivos: se houver alguma, o arquivo precisa casar com uma
+    delas (uma regra de diretório, como 'docs/', inclui os arquivos abaixo dele).
+    Levanta ValueError se uma expressão regular for inválida.
+    """
+
+    def __init__(self, include=(), exclude=()):
+        self.include = normalize_filter_rules(include)
+        self.exclude = normalize_filter_rules(exclude)
+        self._exclude_files = self._compile(self.exclude, directories=False)
+        self._exclude_directories = self._compile(self.exclude, directories=True)
+        self._include_files = self._compile(self.include, directories=False, include=True) if self.include else None
+        self._directory_excluded = lru_cache(maxsize=FILTER_DIRECTORY_CACHE_SIZE)(self._compute_directory_excluded)
+
+    @staticmethod
+    def _compile(rules, directories, include=False):
+        """Compila as regras em (regex de nomes, regex de caminhos, [regex de 're:']); globs viram uma alternância."""
+        flags = re.IGNORECASE if os.name == 'nt' else 0 # Como o fnmatch, sem distinção de caixa no Windows
+        name_patterns, path_patterns, regexes = [], [], []
+        for rule in rules:
+            if rule.startswith(FILTER_REGEX_PREFIX):
+                try:
+                    regexes.append(re.compile(rule[len(FILTER_REGEX_PREFIX):]))
+                except re.error as e:
+                    raise ValueError(f"Expressão regular inválida em '{rule}': {e}")
+                continue
+            if rule.endswith('/'):
+                rule = rule.rstrip('/')
+                if include:
+                    # Arquivos em qualquer nível abaixo de um diretório com esse nome (ou caminho)
+                    path_patterns.append(('' if '/' in rule else '(?:.*/)?') + fnmatch.translate(f"{rule}/*"))
+                    continue
+                if not directories:
+                    continue
+            (path_patterns if '/' in rule else name_patterns).append(fnmatch.translate(rule))
+        return (
+            re.compile('|'.join(name_patterns), flags) if name_patterns else None,
+            re.compile('|'.join(path_patterns), flags) if path_patterns else None,
+            regexes
+        )
+
+    @staticmethod
+    def _matches(compiled, relative_path, name):
+        name_regex, path_regex, regexes = compiled
+        if os.sep != '/':
+            relative_path = relative_path.replace(os.sep, '/')
+        return bool(
+            (name_regex is not None and name_regex.match(name)) or
+            (path_regex is not None and path_regex.match(relative_path)) or
+            any(regex.search(relative_path) for regex in regexes)
+        )
+
+    def __bool__(self):
+        return bool(self.include or self.exclude)
+
+    def describe(self):
+        """Regras aplicadas, no formato gravado nos snapshots e relatórios (None sem regras)."""
+        return {'include': self.include, 'exclude': self.exclude} if self else None
+
+    def excludes_directory(self, relative_path, name):
+        """Indica se o diretório deve ser podado da varredura."""
+        return self._matches(self._exclude_directories, relative_path, name)
+
+    def accepts_file(self, relative_path, name):
+        """Indica se um arquivo de um diretório não excluído entra no resultado."""
+        if self._matches(self._exclude_files, relative_path, name):
+            return False
+        return self._include_files is None or self._matches(self._include_files, relative_path, name)
+
+    def _compute_directory_excluded(self, relative_dir):
+        if not relative_dir:
+            return False
+        parent, name = os.path.split(relative_dir)
+        return self._directory_excluded(parent) or self.excludes_directory(relative_dir, name)
+
+    def accepts_path(self, relative_path):
+        """Aplica as regras a um caminho já coletado (registro de snapshot), incluindo os diretórios acima dele."""
+        parent, name = os.path.split(relative_path)
+        return not self._directory_excluded(parent) and self.accepts_file(relative_path, name)
+
+def parse_path_filter(data):
+    """PathFilter das chaves 'include' e 'exclude' de uma requisição, ou None sem regras. Levanta ValueError."""
+    path_filter = PathFilter(data.get('include'), data.get('exclude'))
+    return path_filter if path_filter else None
+
+def effective_filter_rules(*rule_sets):
+    """
+    Efeito combinado de conjuntos de regras aplicados em sequência (ex.: os da
+    coleta e os da comparação), em forma comparável: as exclusões se somam e
+    cada conjunto de inclusões é uma condição a mais.
+    """
+    excludes = set()
+    include_groups = set()
+    for rules in rule_sets:
+        if not rules:
+            continue
+        excludes.update(rules.get('exclude') or ())
+        if rules.get('include'):
+            include_groups.add(frozenset(rules['include']))
+    return frozenset(excludes), frozenset(include_groups)
+
+def iter_filtered_files(files, path_filter):
+    """Gera os (caminho, info) de files aceitos por path_filter."""
+    for path, info in files:
+        if path_filter.accepts_path(path):
+            yield path, info
+
+# --- Funções de Operação (Coleta, Comparação, Cópia) ---
+
+def file_info_from_stat(stat_info):
+    """Monta o registro de um arquivo no snapshot a partir do seu stat."""
+    return {
+        'size': stat_info.st_size,
+        'mtime': stat_info.st_mtime, # Data da última modificação
+        'md5': None # Preenchido apenas se a coleta calcular hashes (ver iter_hashed_file_info)
+    }
+
+def record_inaccessible_file(inaccessible_files, relative_path, file_path, error):
+    """Registra um arquivo que não pôde ser lido durante a varredura."""
+    if isinstance(error, FileNotFoundError):
+        inaccessible_files.append({'path': relative_path, 'reason': 'Arquivo não encontrado durante a varredura.'})
+        log_and_emit_message('warning', f"Arquivo não encontrado durante varredura: {file_path}", force_emit=True)
+    elif isinstance(error, PermissionError):
+        inaccessible_files.append({'path': relative_path, 'reason': 'Permissão negada.'})
+        log_and_emit_message('error', f"Permissão negada ao acessar: {file_path}", force_emit=True)
+    else:
+        inaccessible_files.append({'path': relative_path, 'reason': f'Erro inesperado: {str(error)}'})
+        log_and_emit_message('error', f"Erro ao acessar {file_path}: {error}", force_emit=True)
+
+def reuse_baseline_directory(relative_dir, dir_path, inaccessible_files, baseline):
+    """
+    Reaproveita um diretório cujo mtime não mudou desde o snapshot base: a lista
+    de nomes é a mesma, então o diretório não é relistado. No modo 'revalidate'
+    cada arquivo recebe um stat e mantém o registro anterior (inclusive hashes)
+    se tamanho e mtime não mudaram; no modo 'trust' os registros são copiados
+    sem nenhum acesso aos arquivos. Retorna (arquivos, subdiretorios).
+    """
+    files = []
+    subdirs = []
+    for name, info in baseline['files_by_dir'].get(relative_dir, ()):
+        relative_path = os.path.join(relative_dir, name) if relative_dir else name
+        if baseline['mode'] == 'trust':
+            files.append((relative_path, info))
+            continue
+        file_path = os.path.join(dir_path, name)
+        try:
+            stat_info = os.stat(file_path)
+        except Exception as e:
+            record_inaccessible_file(inaccessible_files, relative_path, file_path, e)
+            continue
+        if stat_info.st_size == info.get('size') and stat_info.st_mtime == info.get('mtime'):
+            files.append((relative_path, info))
+        else:
+            files.append((relative_path, file_info_from_stat(stat_info)))
+
+    # Subdiretórios precisam ter o próprio mtime verificado: mudanças neles não alteram o pai
+    for child_relative_dir in baseline['children'].get(relative_dir, ()):
+        child_path = os.path.join(dir_path, os.path.basename(child_relative_dir))
+        try:
+            child_mtime = os.stat(child_path, follow_symlinks=False).st_mtime
+        except OSError as e:
+            inaccessible_files.append({'path': child_relative_dir, 'reason': f'Não foi possível acessar o diretório: {e.strerror or e}'})
+            continue
+        subdirs.append((child_relative_dir, child_path, child_mtime))
+    return files, subdirs
+
+def scan_single_directory(relative_dir, dir_path, dir_mtime, inaccessible_files, directories=None, baseline=None,
+                          path_filter=None):
+    """
+    Lista um único diretório com os.scandir e faz o stat de seus arquivos,
+    reaproveitando os dados do DirEntry. Retorna (arquivos, subdiretorios),
+    onde arquivos é uma lista de (caminho_relativo, info) e subdiretorios uma
+    lista de (caminho_relativo, caminho_absoluto, mtime).
+    Se directories for um dicionário, registra nele o mtime do diretório depois
+    de processar todas as entradas (não se a operação for parada no meio); com
+    um snapshot base (baseline), diretórios com o mesmo mtime são reaproveitados.
+    Com path_filter, arquivos e subdiretórios excluídos são descartados antes
+    de qualquer stat (o snapshot base já foi coletado com as mesmas regras).
+    """
+    if baseline and dir_mtime is not None and baseline['dir_mtimes'].get(relative_dir) == dir_mtime:
+        if directories is not None:
+            directories[relative_dir] = dir_mtime
+        return reuse_baseline_directory(relative_dir, dir_path, inaccessible_files, baseline)
+
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(dir_path) as it:
+            entries = list(it)
+    except OSError as e:
+        # os.walk ignorava esses diretórios silenciosamente; aqui eles ficam registrados
+        inaccessible_files.append({'path': relative_dir or '.', 'reason': f'Não foi possível listar o diretório: {e.strerror or e}'})
+        log_and_emit_message('warning', f"Não foi possível listar o diretório {dir_path}: {e}", force_emit=True)
+        return files, subdirs
+
+    interrupted = False
+    for entry in entries:
+        if not check_operation_control():
+            interrupted = True
+            break
+
+        relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+        try:
+            is_dir = entry.is_dir() # Segue links, como o os.walk
+        except OSError:
+            is_dir = False
+
+        if is_dir:
+            # Links simbólicos para diretórios não são percorridos (equivalente a followlinks=False)
+            if path_filter is not None and path_filter.excludes_directory(relative_path, entry.name):
+                continue
+            if not entry.is_symlink():
+                subdir_mtime = None
+                if directories is not None:
+                    try:
+                        subdir_mtime = entry.stat(follow_symlinks=False).st_mtime
+                    except OSError:
+                        pass
+                subdirs.append((relative_path, entry.path, subdir_mtime))
+            continue
+        if path_filter is not None and not path_filter.accepts_file(relative_path, entry.name):
+            continue
+
+        try:
+            files.append((relative_path, file_info_from_stat(entry.stat()))) # Stat em cache no DirEntry (gratuito no Windows)
+        except Exception as e:
+            record_inaccessible_file(inaccessible_files, relative_path, entry.path, e)
+
+    # Só um diretório percorrido por inteiro pode ser reaproveitado por uma coleta incremental
+    if directories is not None and not interrupted:
+        directories[relative_dir] = dir_mtime
+    return files, subdirs
+
+def _root_directory_mtime(base_path, directories):
+    """mtime do diretório raiz, necessário apenas quando os mtimes de diretórios são registrados."""
+    if directories is None:
+        return None
+    try:
+        return os.stat(base_path).st_mtime
+    except OSError:
+        return None
+
+def scan_directory_tree(base_path, inaccessible_files, on_directory=None, directories=None, baseline=None, path_filter=None):
+    """
+    Percorre a árvore de diretórios em uma única passada com os.scandir,
+    gerando (caminho_relativo, info) para cada arquivo encontrado.
+    Os arquivos saem na ordem canônica de snapshot_path_key: as entradas de
+    cada diretório são ordenadas por nome e os subdiretórios são expandidos no
+    lugar (busca em profundidade), o que permite comparar snapshots por merge-join.
+    on_directory(diretorio_relativo, arquivos_vistos, diretorios_vistos, diretorios_pendentes)
+    é chamado ao entrar em cada diretório, permitindo estimar o progresso.
+    Diretórios excluídos por path_filter não são listados.
+    """
+    # Pilha de (é_diretório, item); os filhos são empilhados em ordem reversa de nome
+    stack = [(True, ('', base_path, _root_directory_mtime(base_path, directories)))]
+    pending_dirs = 1
+    files_seen = 0
+    dirs_seen = 0
+
+    while stack:
+        if not check_operation_control():
+            return
+
+        is_dir, item = stack.pop()
+        if not is_dir:
+            yield item
+            continue
+
+        relative_dir, dir_path, dir_mtime = item
+        pending_dirs -= 1
+        dirs_seen += 1
+        if on_directory:
+            on_directory(relative_dir, files_seen, dirs_seen, pending_dirs)
+
+        files, subdirs = scan_single_directory(relative_dir, dir_path, dir_mtime, inaccessible_files, directories, baseline,
+                                               path_filter)
+        pending_dirs += len(subdirs)
+        files_seen += len(files)
+
+        prefix_length = len(relative_dir) + 1 if relative_dir else 0
+        children = [(record[0][prefix_length:], False, record) for record in files]
+        children.extend((subdir[0][prefix_length:], True, subdir) for subdir in subdirs)
+        children.sort(key=lambda child: child[0], reverse=True)
+        stack.extend((child_is_dir, child) for _, child_is_dir, child in children)
+
+def scan_directory_tree_parallel(base_path, inaccessible_files, workers, on_directory=None, directories=None, baseline=None,
+                                 path_filter=None):
+    """
+    Variante de scan_directory_tree com um pool de threads: cada worker retira
+    um diretório da fila compartilhada, lista-o e devolve seus subdiretórios
+    à fila, mantendo várias requisições de metadados em andamento (útil em
+    sistemas de arquivos de rede). Os resultados são repassados à thread
+    chamadora, que os gera na mesma forma de scan_directory_tree.
+    """
+    dir_queue = queue.Queue()
+    result_queue = queue.Queue()
+    counters_lock = threading.Lock()
+    counters = {'outstanding': 1, 'dirs_seen': 0}
+
+    dir_queue.put(('', base_path, _root_directory_mtime(base_path, directories)))
+
+    def worker():
+        while True:
+            item = dir_queue.get()
+            if item is None:
+                return
+            relative_dir, dir_path, dir_mtime = item
+            files, subdirs = [], []
+            # check_operation_control bloqueia durante a pausa; após uma parada os
+            # diretórios restantes são apenas drenados para encerrar o pool
+            if check_operation_control():
+                files, subdirs = scan_single_directory(relative_dir, dir_path, dir_mtime, inaccessible_files, directories, baseline,
+                                                       path_filter)
+            with counters_lock:
+                counters['outstanding'] += len(subdirs) - 1
+                counters['dirs_seen'] += 1
+                finished = counters['outstanding'] == 0
+                for subdir in subdirs:
+                    dir_queue.put(subdir)
+            result_queue.put((relative_dir, files, counters['dirs_seen'], dir_queue.qsize()))
+            if finished:
+                for _ in range(workers):
+                    dir_queue.put(None)
+                result_queue.put(None)
+
+    threads = [threading.Thread(target=job_bound(worker), daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    files_seen = 0
+    try:
+        while True:
+            result = result_queue.get()
+            if result is None:
+                break
+            relative_dir, files, dirs_seen, pending_dirs = result
+            if on_directory:
+                on_directory(relative_dir, files_seen, dirs_seen, pending_dirs)
+            files_seen += len(files)
+            yield from files
+    finally:
+        for thread in threads:
+            thread.join()
+
+def estimate_total_files(files_seen, dirs_seen, pending_dirs):
+    """
+    Estima o total de arquivos da árvore a partir da média de arquivos por
+    diretório já visitado, aplicada aos diretórios ainda pendentes.
+    """
+    if dirs_seen == 0:
+        return files_seen
+    return files_seen + int(pending_dirs * (files_seen / dirs_seen))
+
+def load_collection_baseline(filepath, mode='revalidate'):
+    """
+    Carrega um snapshot anterior como base de uma coleta incremental: arquivos
+    agrupados por diretório, mtimes dos diretórios e seus subdiretórios.
+    Diretórios com arquivos inacessíveis no snapshot base não são reaproveitados,
+    mas continuam listados como subdiretórios do pai, para serem percorridos de
+    novo. Levanta ValueError se o snapshot base foi interrompido (diretórios
+    não alcançados não constariam dele).
+    """
+    metadata, files = open_snapshot(filepath)
+    if metadata.get('interrupted'):
+        raise ValueError("o snapshot base é de uma coleta interrompida")
+    files_by_dir = defaultdict(list)
+    for path, info in files:
+        parent, name = os.path.split(path)
+        files_by_dir[parent].append((name, info))
+
+    dir_mtimes = metadata.pop('directories', None)
+    if dir_mtimes is None:
+        dir_mtimes = dict(iter_snapshot_directories(filepath))
+
+    # Os subdiretórios vêm de todos os diretórios registrados, antes de descartar
+    # os não reaproveitáveis: um pai reaproveitado lista os filhos só daqui
+    children = defaultdict(list)
+    for relative_dir in dir_mtimes:
+        if relative_dir:
+            children[os.path.dirname(relative_dir)].append(relative_dir)
+
+    for item in metadata.get('inaccessible_files_details', []):
+        dir_mtimes.pop(os.path.dirname(item.get('path', '')), None)
+        dir_mtimes.pop(item.get('path', ''), None)
+
+    return {
+        'metadata': metadata,
+        'mode': mode,
+        'files_by_dir': files_by_dir,
+        'dir_mtimes': dir_mtimes,
+        'children': children
+    }
+
+def iter_file_info(base_path, inaccessible_files, workers=1, directories=None, baseline=None, scan_summary=None, path_filter=None):
+    """
+    Coleta informações de arquivos em um diretório de forma robusta,
+    tratando erros de acesso e coletando metadados.
+    Gera (caminho_relativo, info) à medida que a árvore é percorrida, sem
+    acumular os resultados; o total de arquivos é uma estimativa refinada
+    durante a varredura. Com workers > 1 os diretórios são percorridos por
+    um pool de threads. Com um snapshot base, diretórios inalterados são
+    reaproveitados e scan_summary recebe as contagens de reaproveitamento.
+    Com path_filter, os diretórios excluídos são podados da varredura.
+    """
+    state = job_state()
+    with state_lock:
+        state['total_files_estimated'] = 0
+        state['files_processed'] = 0
+
+    log_and_emit_message('info', f"Iniciando varredura em '{base_path}'...", force_emit=True)
+
+    if baseline is not None and directories is None:
+        directories = {}
+
+    def on_directory(relative_dir, files_seen, dirs_seen, pending_dirs):
+        with state_lock:
+            state['current_directory'] = relative_dir or '/'
+            state['total_files_estimated'] = max(
+                estimate_total_files(files_seen, dirs_seen, pending_dirs),
+                state['files_processed']
+            )
+        update_and_emit_status()
+
+    if workers > 1:
+        log_and_emit_message('info', f"Varredura paralela com {workers} threads.", force_emit=True)
+        scanner = scan_directory_tree_parallel(base_path, inaccessible_files, workers, on_directory, directories, baseline, path_filter)
+    else:
+        scanner = scan_directory_tree(base_path, inaccessible_files, on_directory, directories, baseline, path_filter)
+
+    for relative_path, info in scanner:
+        yield relative_path, info
+
+        with state_lock:
+            state['files_processed'] += 1
+        update_and_emit_status()
+
+    if not check_operation_control():
+        log_and_emit_message('info', "Interrupção detectada durante a coleta de arquivos.", force_emit=True)
+
+    # Ao final a estimativa passa a ser o total real
+    with state_lock:
+        state['total_files_estimated'] = state['files_processed']
+
+    if baseline is not None and scan_summary is not None:
+        baseline_dirs = baseline['dir_mtimes']
+        reused = sum(1 for relative_dir, mtime in directories.items() if baseline_dirs.get(relative_dir) == mtime)
+        scan_summary['incremental'] = {
+            'mode': baseline['mode'],
+            'directories_reused': reused,
+            'directories_rescanned': len(directories) - reused
+        }
+        log_and_emit_message('info', f"Coleta incremental: {reused} diretórios reaproveitados, {len(directories) - reused} revarridos.", force_emit=True)
+
+    log_and_emit_message('info', f"Varredura em '{base_path}' concluída.", force_emit=True)
+
+def format_throughput(bytes_count, seconds):
+    """Formata a vazão em MB/s."""
+    return f"{bytes_count / seconds / (1024 * 1024):.1f} MB/s" if seconds > 0 else "N/A"
+
+def hash_file(file_path, algorithm, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Calcula o hash do conteúdo de um arquivo lendo-o em blocos grandes, em um
+    buffer reaproveitado. Retorna (hexdigest, bytes_lidos); o hexdigest é None
+    se a operação for parada no meio do arquivo.
+    """
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    bytes_read = 0
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            if not check_operation_control():
+                return None, bytes_read
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+            bytes_read += n
+    return digest.hexdigest(), bytes_read
+
+def _sqlite_int(value):
+    """Ajusta inteiros sem sinal de 64 bits (st_dev/st_ino) à faixa do INTEGER do SQLite."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+class HashCache:
+    """
+    Cache persistente de hashes em SQLite, indexado por (st_dev, st_ino, tamanho,
+    mtime_ns, algoritmo): um arquivo inalterado desde a última coleta tem o hash
+    obtido apenas com um stat. Gravações e atualizações de uso são feitas em lote.
+    Ao fechar, as entradas usadas há mais tempo são descartadas até o limite de
+    max_entries (LRU com a granularidade de uma coleta). Pode ser usado por
+    várias threads.
+    """
+
+    def __init__(self, filepath, max_entries=HASH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._now = int(time.time())
+        self._lock = threading.Lock()
+        self._pending_puts = []
+        self._pending_touches = []
+        self._conn = sqlite3.connect(filepath, check_same_thread=False, timeout=30) # Várias tarefas podem usar o cache ao mesmo tempo
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                algorithm TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (dev, ino, size, mtime_ns, algorithm)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS hashes_last_used ON hashes (last_used)')
+        self._conn.commit()
+
+    @staticmethod
+    def key_from_stat(stat_info, algorithm):
+        return (_sqlite_int(stat_info.st_dev), _sqlite_int(stat_info.st_ino), stat_info.st_size, stat_info.st_mtime_ns, algorithm)
+
+    def get(self, key):
+        """Retorna o hash em cache para a chave, ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT digest FROM hashes WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND algorithm = ?', key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pending_touches.append((self._now,) + key)
+            if len(self._pending_touches) >= HASH_CACHE_BATCH_SIZE:
+                self._flush()
+            return row[0]
+
+    def put(self, key, digest):
+        with self._lock:
+            self._pending_puts.append(key + (digest, self._now))
+            if len(self._pending_puts) >= HASH_CACHE_BATCH_SIZE:
+                self._flush()
+
+    def _flush(self):
+        if self._pending_puts:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO hashes (dev, ino, size, mtime_ns, algorithm, digest, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                self._pending_puts
+            )
+        if self._pending_touches:
+            self._conn.executemany(
+                'UPDATE hashes SET last_used = ? WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND algorithm = ?',
+                self._pending_touches
+            )
+        self._conn.commit()
+        self._pending_puts = []
+        self._pending_touches = []
+
+    def close(self):
+        """Grava as pendências, aplica o limite de entradas e fecha o banco."""
+        with self._lock:
+            self._flush()
+            count = self._conn.execute('SELECT COUNT(*) FROM hashes').fetchone()[0]
+            if count > self.max_entries:
+                self.evicted = self._conn.execute("""
+                    DELETE FROM hashes WHERE (dev, ino, size, mtime_ns, algorithm) IN (
+                        SELECT dev, ino, size, mtime_ns, algorithm FROM hashes ORDER BY last_used LIMIT ?
+                    )
+                """, (count - self.max_entries,)).rowcount
+                self._conn.commit()
+            self._conn.close()
+
+    def stats(self):
+        return {'cache_hits': self.hits, 'cache_misses': self.misses, 'cache_evicted': self.evicted}
+
+def hash_file_cached(file_path, algorithm, hash_cache):
+    """
+    Como hash_file, mas consulta o cache antes de ler o conteúdo. O hash só é
+    gravado no cache se o arquivo não mudou durante a leitura.
+    Retorna (hexdigest, bytes_lidos).
+    """
+    key = HashCache.key_from_stat(os.stat(file_path), algorithm)
+    digest = hash_cache.get(key)
+    if digest is not None:
+        return digest, 0
+    digest, bytes_read = hash_file(file_path, algorithm)
+    if digest is not None and HashCache.key_from_stat(os.stat(file_path), algorithm) == key:
+        hash_cache.put(key, digest)
+    return digest, bytes_read
+
+def iter_hashed_file_info(base_path, records, algorithm, workers, inaccessible_files, scan_summary=None, use_cache=True):
+    """
+    Preenche o hash (campo com o nome do algoritmo) dos registros gerados por
+    iter_file_info, lendo os arquivos em um pool de threads (o hashlib libera o
+    GIL em blocos grandes). Os registros saem na ordem em que entraram, com no
+    máximo workers * 4 arquivos em andamento. Registros que já trazem o hash
+    (reaproveitados de um snapshot base) não são relidos e, com use_cache, o
+    cache persistente (HashCache) é consultado antes de ler cada arquivo. Ao
+    final, scan_summary recebe as estatísticas em 'hashing'.
+    """
+    stats = {'files_hashed': 0, 'files_reused': 0, 'bytes_hashed': 0}
+    started = time.perf_counter()
+    last_report = started
+    window = workers * 4
+    pending = deque()
+
+    log_and_emit_message('info', f"Calculando hashes {algorithm} com {workers} threads.", force_emit=True)
+
+    hash_cache = None
+    if use_cache:
+        try:
+            hash_cache = HashCache(os.path.join(INFO_DIR, HASH_CACHE_FILENAME))
+        except sqlite3.Error as e:
+            log_and_emit_message('warning', f"Cache de hashes indisponível, todos os arquivos serão lidos: {e}", force_emit=True)
+
+    @job_bound # Roda no pool de hash, mas reporta e obedece à pausa/parada da tarefa atual
+    def hash_one(file_path):
+        if hash_cache is None:
+            return hash_file(file_path, algorithm)
+        return hash_file_cached(file_path, algorithm, hash_cache)
+
+    def finish(relative_path, info, future):
+        nonlocal last_report
+        if future is None:
+            return relative_path, info
+        try:
+            digest, bytes_read = future.result()
+        except Exception as e:
+            inaccessible_files.append({'path': relative_path, 'reason': f'Hash não calculado: {e}'})
+            log_and_emit_message('warning', f"Não foi possível calcular o hash de {relative_path}: {e}", force_emit=True)
+            return relative_path, info
+
+        stats['bytes_hashed'] += bytes_read
+        if digest is not None:
+            stats['files_hashed'] += 1
+            info = dict(info, **{algorithm: digest})
+
+        now = time.perf_counter()
+        if now - last_report >= HASH_PROGRESS_INTERVAL:
+            last_report = now
+            log_and_emit_message('info', f"Hashes: {stats['files_hashed']} arquivos, {format_throughput(stats['bytes_hashed'], now - started)}.")
+        return relative_path, info
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hash') as executor:
+            for relative_path, info in records:
+                if info.get(algorithm):
+                    stats['files_reused'] += 1
+                    pending.append((relative_path, info, None))
+                else:
+                    pending.append((relative_path, info, executor.submit(hash_one, os.path.join(base_path, relative_path))))
+                while len(pending) > window:
+                    yield finish(*pending.popleft())
+            while pending:
+                yield finish(*pending.popleft())
+    finally:
+        if hash_cache is not None:
+            try:
+                hash_cache.close()
+            except sqlite3.Error as e:
+                log_and_emit_message('warning', f"Erro ao gravar o cache de hashes: {e}", force_emit=True)
+
+    elapsed = time.perf_counter() - started
+    summary = dict(stats, algorithm=algorithm, workers=workers, seconds=round(elapsed, 3),
+                   bytes_per_second=int(stats['bytes_hashed'] / elapsed) if elapsed > 0 else 0)
+    if hash_cache is not None:
+        summary.update(hash_cache.stats())
+        log_and_emit_message('info', f"Cache de hashes: {hash_cache.hits} acertos, {hash_cache.misses} falhas, "
+                                     f"{hash_cache.evicted} entradas descartadas.", force_emit=True)
+    if scan_summary is not None:
+        scan_summary['hashing'] = summary
+    log_and_emit_message('info', f"Hashes concluídos: {stats['files_hashed']} calculados, {stats['files_reused']} reaproveitados, "
+                                 f"{format_throughput(stats['bytes_hashed'], elapsed)}.", force_emit=True)
+
+def perform_collection_task(directory_path, collection_type, workers=DEFAULT_COLLECTION_WORKERS, snapshot_format=DEFAULT_SNAPSHOT_FORMAT,
+                            baseline_filename=None, incremental_mode='revalidate', hash_algorithm=None, hash_workers=DEFAULT_HASH_WORKERS,
+                            use_hash_cache=True, path_filter=None):
+    """
+    Executa a tarefa de coleta em uma thread separada.
+    Com baseline_filename, a coleta é incremental: diretórios cujo mtime não mudou
+    desde aquele snapshot têm seus registros reaproveitados.
+    Com hash_algorithm, o conteúdo de cada arquivo também é lido e o hash gravado
+    (consultando antes o cache persistente de hashes, se use_hash_cache).
+    Com path_filter, os caminhos excluídos não são percorridos e as regras
+    ficam registradas no snapshot.
+    """
+    try:
+        state = job_state()
+        with state_lock:
+            state['current_stage'] = 'collecting'
+            state['status_message'] = f"Iniciando coleta de {collection_type} em: {directory_path}"
+        
+        update_and_emit_status(force_emit=True)
+        log_and_emit_message('info', f"Coleta de '{collection_type}' iniciada para: {directory_path}", force_emit=True)
+
+        if not os.path.isdir(directory_path):
+            log_and_emit_message('error', f"Diretório '{directory_path}' não é válido ou acessível.", force_emit=True)
+            emit_job_event('collection_complete', {'status': 'error', 'message': 'Diretório inválido.'})
+            return
+
+        baseline = None
+        if baseline_filename:
+            try:
+                baseline = load_collection_baseline(os.path.join(INFO_DIR, secure_filename(baseline_filename)), incremental_mode)
+            except Exception as e:
+                log_and_emit_message('error', f"Erro ao carregar o snapshot base '{baseline_filename}': {e}", force_emit=True)
+                emit_job_event('collection_complete', {'status': 'error', 'message': f'Snapshot base inválido: {e}'})
+                return
+            baseline_directory = baseline['metadata'].get('base_directory')
+            if os.path.abspath(baseline_directory or '') != os.path.abspath(directory_path):
+                log_and_emit_message('error', f"O snapshot base foi coletado em '{baseline_directory}', não em '{directory_path}'.", force_emit=True)
+                emit_job_event('collection_complete', {'status': 'error', 'message': 'O snapshot base pertence a outro diretório.'})
+                return
+            if effective_filter_rules(baseline['metadata'].get('filters')) != effective_filter_rules(path_filter and path_filter.describe()):
+                # Os diretórios reaproveitados trariam os arquivos filtrados pelas regras do snapshot base
+                log_and_emit_message('error', "O snapshot base foi coletado com outras regras de inclusão/exclusão.", force_emit=True)
+                emit_job_event('collection_complete', {'status': 'error', 'message': 'O snapshot base usa outras regras de inclusão/exclusão.'})
+                return
+            if not baseline['dir_mtimes']:
+                log_and_emit_message('warning', "O snapshot base não registra mtimes de diretórios; todos os diretórios serão revarridos.", force_emit=True)
+            log_and_emit_message('info', f"Coleta incremental (modo '{incremental_mode}') a partir de: {baseline_filename}", force_emit=True)
+
+        session_id = str(uuid.uuid4())
+        filename = f"collected_info_{collection_type}_{session_id}.{snapshot_format}"
+        if snapshot_format != 'snap': # O snapshot binário é mapeado em memória: nunca é comprimido
+            filename = compressed_filename(filename, get_compression_settings())
+        filepath = os.path.join(INFO_DIR, filename)
+
+        header = {
+            "session_id": session_id,
+            "collection_type": collection_type,
+            "base_directory": directory_path,
+            "timestamp": datetime.now().isoformat()
+        }
+        # A varredura sequencial gera os arquivos na ordem canônica; a paralela, não
+        header["sorted"] = workers <= 1
+        if baseline_filename:
+            header["baseline_snapshot"] = baseline_filename
+        if hash_algorithm:
+            header["hash_algorithm"] = hash_algorithm
+        if path_filter:
+            header["filters"] = path_filter.describe()
+            log_and_emit_message('info', f"Regras da coleta: incluir {path_filter.include or 'tudo'}, excluir {path_filter.exclude or 'nada'}.", force_emit=True)
+        inaccessible_files = []
+        directories = {} # mtime de cada diretório, para que este snapshot possa servir de base
+        scan_summary = {}
+        records = iter_file_info(directory_path, inaccessible_files, workers, directories, baseline, scan_summary, path_filter)
+        if hash_algorithm:
+            records = iter_hashed_file_info(directory_path, records, hash_algorithm, hash_workers, inaccessible_files, scan_summary, use_hash_cache)
+        directory_digests = {} # Resumo de cada diretório, para a comparação pular subárvores idênticas
+        records = iter_with_directory_digests(records, hash_algorithm, directory_digests)
+
+        try:
+            if snapshot_format == 'ndjson':
+                # Os registros são gravados durante a varredura: a memória não cresce com a árvore
+                report_data = write_ndjson_snapshot(filepath, header, records, inaccessible_files, directories, scan_summary,
+                                                    directory_digests)
+            elif snapshot_format == 'snap':
+                records = list(records)
+                report_data = write_binary_snapshot(filepath, dict(header, **{
+                    "inaccessible_files_count": len(inaccessible_files),
+                    "inaccessible_files_details": inaccessible_files,
+                    "interrupted": stop_requested(),
+                    "directories": directories,
+                    "directory_digests": directory_digests
+                }, **scan_summary), records)
+            else:
+                file_info = dict(records)
+                report_data = dict(header, **{
+                    "total_files_scanned": len(file_info),
+                    "inaccessible_files_count": len(inaccessible_files),
+                    "inaccessible_files_details": inaccessible_files,
+                    "directories": directories,
+                    "directory_digests": directory_digests
+                }, **scan_summary, files=file_info)
+                # Gravado ao lado e renomeado: outras tarefas podem listar INFO_DIR durante a gravação
+                with open_storage_file(f"{filepath}.tmp", 'w') as f:
+                    json.dump(report_data, f, indent=4, ensure_ascii=False)
+                os.replace(f"{filepath}.tmp", filepath)
+            catalog_report(INFO_DIR, filename, report_data)
+            log_and_emit_message('success', f"Coleta concluída! Relatório salvo como: {filename}", force_emit=True)
+            emit_job_event('collection_complete', {
+                'status': 'success',
+                'type': collection_type,
+                'path': directory_path,
+                'filename': filename,
+                'incremental': scan_summary.get('incremental'),
+                'hashing': scan_summary.get('hashing')
+            })
+        except IOError as e:
+            log_and_emit_message('error', f"Erro ao salvar o arquivo de coleta: {e}", force_emit=True)
+            emit_job_event('collection_complete', {'status': 'error', 'message': f'Erro ao salvar arquivo: {e}'})
+
+    except Exception as e:
+        log_and_emit_message('error', f"Erro crítico durante a coleta: {e}", force_emit=True)
+        emit_job_event('collection_complete', {'status': 'error', 'message': f'Erro inesperado: {e}'})
+    finally:
+        update_and_emit_status("Operação de coleta finalizada.", force_emit=True)
+
+def format_mtime(mtime):
+    """Converte um mtime (epoch) para ISO, ou None se ausente."""
+    return datetime.fromtimestamp(mtime).isoformat() if mtime else None
+
+def build_missing_record(path, info_origem):
+    return {
+        'relative_path': path,
+        'status': 'Não encontrado no destino',
+        'size_origem': info_origem.get('size'),
+        'mtime_origem': format_mtime(info_origem.get('mtime'))
+    }
+
+def build_different_record(path, info_origem, info_destino, hash_algorithm=None):
+    record = {
+        'relative_path': path,
+        'status': 'Tamanho ou data de modificação diferente',
+        'size_origem': info_origem.get('size'),
+        'mtime_origem': format_mtime(info_origem.get('mtime')),
+        'size_destino': info_destino.get('size'),
+        'mtime_destino': format_mtime(info_destino.get('mtime'))
+    }
+    if hash_algorithm:
+        record['hash_origem'] = info_origem.get(hash_algorithm)
+        record['hash_destino'] = info_destino.get(hash_algorithm)
+    return record
+
+def build_moved_record(path, info_origem, path_destino, info_destino, match):
+    return {
+        'relative_path': path,
+        'status': 'Movido no destino',
+        'moved_from': path_destino,
+        'match': match,
+        'size_origem': info_origem.get('size'),
+        'mtime_origem': format_mtime(info_origem.get('mtime')),
+        'size_destino': info_destino.get('size'),
+        'mtime_destino': format_mtime(info_destino.get('mtime'))
+    }
+
+def files_differ(info_origem, info_destino, hash_algorithm=None):
+    """
+    Indica se o arquivo da origem difere do arquivo do destino. Quando os dois
+    registros têm hash, o conteúdo decide (um mtime perdido na cópia não conta
+    como diferença, e uma corrupção com mesmo tamanho e mtime é detectada);
+    caso contrário, compara tamanho e mtime.
+    """
+    if hash_algorithm and info_origem.get(hash_algorithm) and info_destino.get(hash_algorithm):
+        return info_origem.get('size') != info_destino.get('size') or \
+               info_origem[hash_algorithm] != info_destino[hash_algorithm]
+    return info_origem.get('size') != info_destino.get('size') or \
+           info_origem.get('mtime') != info_destino.get('mtime')
+
+def file_fingerprint(file_path, size, block_size=FINGERPRINT_BLOCK_SIZE):
+    """
+    Impressão digital barata do conteúdo: blake2b dos blocos do início, do meio
+    e do fim do arquivo. Arquivos de até três blocos são lidos inteiros, e nesse
+    caso a impressão equivale a um hash completo. Retorna (hexdigest, bytes_lidos).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        if size <= 3 * block_size:
+            data = f.read()
+            digest.update(data)
+            return digest.hexdigest(), len(data)
+        bytes_read = 0
+        for offset in (0, (size - block_size) // 2, size - block_size):
+            f.seek(offset)
+            block = f.read(block_size)
+            digest.update(block)
+            bytes_read += len(block)
+    return digest.hexdigest(), bytes_read
+
+class ContentVerifier:
+    """
+    Verificação em camadas do conteúdo de arquivos de mesmo tamanho cujo mtime
+    difere: primeiro a impressão digital (file_fingerprint) dos dois lados; se
+    coincidir, no modo 'full' o hash completo decide. Só arquivos com conteúdo
+    confirmado deixam de ser listados como diferentes; no modo 'quick', a
+    impressão digital igual de um arquivo maior que os blocos amostrados apenas
+    marca o registro (match 'fingerprint'), e cabe à cópia decidir se o pula.
+    Erros de leitura mantêm o arquivo como diferente.
+    """
+
+    def __init__(self, dir_origem, dir_destino, mode):
+        self.dir_origem = dir_origem
+        self.dir_destino = dir_destino
+        self.mode = mode
+        self.counts = defaultdict(int)
+
+    def applies(self, info_origem, info_destino, hash_algorithm=None):
+        """Só verifica pares de mesmo tamanho que não foram comparados por hash."""
+        if info_origem.get('size') != info_destino.get('size'):
+            return False
+        return not (hash_algorithm and info_origem.get(hash_algorithm) and info_destino.get(hash_algorithm))
+
+    def match(self, path, size, path_in_destino=None):
+        """
+        Compara path na origem com path_in_destino (por padrão, o mesmo caminho)
+        no destino. Retorna 'content' se o conteúdo for idêntico, 'fingerprint'
+        se só as amostras coincidirem (modo 'quick') ou None se diferirem.
+        """
+        self.counts['checked'] += 1
+        path_origem = os.path.join(self.dir_origem, path)
+        path_destino = os.path.join(self.dir_destino, path_in_destino or path)
+        try:
+            fingerprint_origem, read_origem = file_fingerprint(path_origem, size)
+            fingerprint_destino, read_destino = file_fingerprint(path_destino, size)
+            self.counts['bytes_read'] += read_origem + read_destino
+            if fingerprint_origem != fingerprint_destino:
+                self.counts['different_by_fingerprint'] += 1
+                return None
+            if size <= 3 * FINGERPRINT_BLOCK_SIZE:
+                # As amostras cobrem o arquivo inteiro
+                self.counts['identical_by_fingerprint'] += 1
+                return 'content'
+            if self.mode == 'quick':
+                self.counts['matched_by_fingerprint'] += 1
+                return 'fingerprint'
+
+            hash_origem, read_origem = hash_file(path_origem, 'blake2b')
+            hash_destino, read_destino = hash_file(path_destino, 'blake2b')
+            self.counts['bytes_read'] += read_origem + read_destino
+        except OSError as e:
+            self.counts['errors'] += 1
+            log_and_emit_message('warning', f"Não foi possível verificar o conteúdo de {path}: {e}", force_emit=True)
+            return None
+        if hash_origem is None or hash_destino is None: # Operação parada durante a leitura
+            return None
+        if hash_origem != hash_destino:
+            self.counts['different_by_hash'] += 1
+            return None
+        self.counts['identical_by_hash'] += 1
+        return 'content'
+
+    def stats(self):
+        return dict(self.counts, mode=self.mode)
+
+def compare_file_pair(path, info_origem, info_destino, hash_algorithm=None, verifier=None):
+    """Retorna o registro de diferença de um arquivo presente nos dois lados, ou None se forem iguais."""
+    if not files_differ(info_origem, info_destino, hash_algorithm):
+        return None
+    match = None
+    if verifier is not None and verifier.applies(info_origem, info_destino, hash_algorithm):
+        match = verifier.match(path, info_origem.get('size'))
+        if match == 'content':
+            return None
+    record = build_different_record(path, info_origem, info_destino, hash_algorithm)
+    if match:
+        record['match'] = match # Só as amostras coincidem: a cópia pode pular o arquivo (skip_fingerprint_matches)
+    return record
+
+def comparison_hash_algorithm(metadata_origem, metadata_destino):
+    """Algoritmo de hash comum aos dois snapshots, ou None se não puderem ser comparados por hash."""
+    algorithm = metadata_origem.get('hash_algorithm')
+    if algorithm and algorithm == metadata_destino.get('hash_algorithm'):
+        return algorithm
+    return None
+
+def snapshot_is_sorted(filepath, metadata):
+    """Indica se os arquivos do snapshot estão na ordem canônica (requisito do merge-join)."""
+    return get_snapshot_format(filepath) == 'snap' or bool(metadata.get('sorted'))
+
+class ComparisonResultWriter:
+    """
+    Grava o relatório de comparação (JSON) e o CSV de não copiados registro a
+    registro, à medida que as diferenças são encontradas, sem acumulá-las em
+    memória. As contagens são gravadas após a lista de detalhes. Os arquivos são
+    escritos com nome temporário e renomeados em close().
+    """
+
+    CSV_HEADER = ["Caminho Relativo", "Status", "Tamanho Origem", "Data Mod. Origem", "Tamanho Destino", "Data Mod. Destino",
+                  "Caminho Atual no Destino"]
+
+    def __init__(self, json_filepath, csv_filepath, header):
+        self.json_filepath = json_filepath
+        self.csv_filepath = csv_filepath
+        self.header = header
+        self.counts = defaultdict(int)
+        self.not_copied_count = 0
+        self._csv_file = None
+        self._csv_writer = None
+        self._json_file = open_storage_file(f"{json_filepath}.tmp", 'w')
+        self._json_file.write('{\n')
+        for key, value in header.items():
+            self._json_file.write(f'    {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},\n')
+        self._json_file.write('    "not_copied_files_details": [')
+
+    def add(self, record):
+        """Acrescenta um arquivo não copiado (ausente ou diferente) ao JSON e ao CSV."""
+        separator = ',\n' if self.not_copied_count else '\n'
+        self._json_file.write(f"{separator}        {json.dumps(record, ensure_ascii=False)}")
+        self.not_copied_count += 1
+        self.counts[record['status']] += 1
+
+        if self._csv_writer is None:
+            self._csv_file = open_storage_file(f"{self.csv_filepath}.tmp", 'w', newline='')
+            self._csv_writer = csv.writer(self._csv_file)
+            self._csv_writer.writerow(self.CSV_HEADER)
+        self._csv_writer.writerow(comparison_csv_row(record))
+
+    def close(self, totals):
+        """
+        Finaliza o JSON com as contagens (totals + contagens por status) e renomeia
+        os arquivos. Retorna (resumo do relatório sem os detalhes, csv_gerado).
+        """
+        missing = self.counts['Não encontrado no destino']
+        different = self.counts['Tamanho ou data de modificação diferente']
+        moved = self.counts['Movido no destino']
+        summary = dict(self.header, **totals, **{
+            "files_missing_in_destino": missing,
+            "files_different": different,
+            "files_moved_in_destino": moved,
+            "not_copied_files_count": self.not_copied_count,
+            "summary_by_type": {
+                "origem_missing_in_destino": missing,
+                "origem_different_in_destino": different,
+                "origem_moved_in_destino": moved
+            }
+        })
+        trailer = {key: value for key, value in summary.items() if key not in self.header}
+        self._json_file.write('\n    ]' if self.not_copied_count else ']')
+        for key, value in trailer.items():
+            self._json_file.write(f',\n    {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}')
+        self._json_file.write('\n}\n')
+        self._json_file.close()
+        os.replace(f"{self.json_filepath}.tmp", self.json_filepath)
+
+        csv_written = self._csv_file is not None
+        if csv_written:
+            self._csv_file.close()
+            os.replace(f"{self.csv_filepath}.tmp", self.csv_filepath)
+        return summary, csv_written
+
+    def abort(self):
+        """Descarta os arquivos temporários após um erro."""
+        for handle, path in ((self._json_file, self.json_filepath), (self._csv_file, self.csv_filepath)):
+            if handle is not None:
+                handle.close()
+                if os.path.exists(f"{path}.tmp"):
+                    os.remove(f"{path}.tmp")
+
+class MoveDetector:
+    """
+    Detecta arquivos movidos ou renomeados: um arquivo ausente no destino cujo
+    conteúdo está no destino em outro caminho (exclusivo do destino). Durante
+    a comparação, os arquivos exclusivos do destino são indexados por tamanho
+    e hash e por tamanho e mtime; os ausentes da origem vão para um arquivo
+    temporário, pois o par só é conhecido depois de percorrer o destino
+    inteiro. Em flush(), cada ausente é casado com um candidato: pelo hash,
+    quando os dois têm; senão pelo mtime, confirmado pelo conteúdo (ou só pela
+    impressão digital, no modo 'quick') se houver verifier (ContentVerifier). Cada arquivo do destino é usado uma única vez,
+    dando preferência ao de mesmo nome. Arquivos vazios não são casados.
+    """
+
+    def __init__(self, hash_algorithm=None, verifier=None, max_candidates=MOVE_DETECTION_MAX_CANDIDATES):
+        self.hash_algorithm = hash_algorithm
+        self.verifier = verifier
+        self.max_candidates = max_candidates
+        self.by_hash = defaultdict(list) # (tamanho, hash) -> [(caminho no destino, info)]
+        self.by_mtime = defaultdict(list) # (tamanho, mtime) -> [(caminho no destino, info)]
+        self.candidates_count = 0
+        self.used = set()
+        self.counts = defaultdict(int)
+        self._spool = None
+
+    def _hash(self, info):
+        return info.get(self.hash_algorithm) if self.hash_algorithm else None
+
+    def add_destination_only(self, path, info):
+        if not info.get('size'):
+            return
+        if self.candidates_count >= self.max_candidates:
+            self.counts['candidates_dropped'] += 1
+            return
+        if self._hash(info):
+            self.by_hash[(info['size'], self._hash(info))].append((path, info))
+        self.by_mtime[(info['size'], info.get('mtime'))].append((path, info))
+        self.candidates_count += 1
+
+    def add_missing(self, path, info_origem, writer):
+        """Registra um arquivo ausente no destino; sem candidato possível, vai direto ao writer."""
+        if not info_origem.get('size'):
+            writer.add(build_missing_record(path, info_origem))
+            return
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._spool.write(json.dumps([path, info_origem], ensure_ascii=False) + '\n')
+
+    def _candidates(self, path, info_origem):
+        """Gera (caminho no destino, info, critério) dos candidatos ainda livres, os de mesmo nome primeiro."""
+        hash_origem = self._hash(info_origem)
+        groups = []
+        if hash_origem:
+            groups.append((self.by_hash.get((info_origem['size'], hash_origem), ()), 'hash'))
+        groups.append((self.by_mtime.get((info_origem['size'], info_origem.get('mtime')), ()), None))
+        name = os.path.basename(path)
+        for same_name in (True, False):
+            for candidates, match in groups:
+                for path_destino, info_destino in candidates:
+                    if path_destino in self.used or (os.path.basename(path_destino) == name) != same_name:
+                        continue
+                    if match is None and hash_origem and self._hash(info_destino):
+                        continue # Os dois têm hash e ele difere (ou o par já foi tentado pelo hash)
+                    yield path_destino, info_destino, match
+
+    def _match(self, path, info_origem):
+        """Retorna (caminho no destino, info, critério) do candidato escolhido, ou None."""
+        for path_destino, info_destino, match in self._candidates(path, info_origem):
+            if match is None:
+                if self.verifier is not None:
+                    match = None if stop_requested() else self.verifier.match(path, info_origem['size'], path_destino)
+                    if match is None:
+                        continue
+                else:
+                    match = 'size_mtime'
+            self.used.add(path_destino)
+            return path_destino, info_destino, match
+        return None
+
+    def flush(self, writer):
+        """Grava no writer os ausentes registrados, como movidos quando houver par no destino."""
+        if self._spool is None:
+            return
+        self._spool.seek(0)
+        for line in self._spool:
+            path, info_origem = json.loads(line)
+            found = self._match(path, info_origem)
+            if found is None:
+                writer.add(build_missing_record(path, info_origem))
+                continue
+            path_destino, info_destino, match = found
+            writer.add(build_moved_record(path, info_origem, path_destino, info_destino, match))
+            self.counts[f'moved_by_{match}'] += 1
+        self.close()
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    def stats(self):
+        return dict(self.counts, destination_only_indexed=self.candidates_count)
+
+def _report_comparison_progress(processed, path):
+    state = job_state()
+    with state_lock:
+        state['files_processed'] = processed
+        state['current_directory'] = os.path.dirname(path) if os.path.dirname(path) else '/'
+    update_and_emit_status()
+
+def find_pruned_subtree(directory, pruned):
+    """Retorna o diretório de pruned que contém directory (ele mesmo ou um ancestral), ou None."""
+    while True:
+        if directory in pruned:
+            return directory
+        if not directory:
+            return None
+        directory = os.path.dirname(directory)
+
+def compare_snapshots_merge_join(files_origem, files_destino, writer, hash_algorithm=None, verifier=None, pruned=None,
+                                 moves=None):
+    """
+    Compara dois iteradores de (caminho, info) ordenados por snapshot_path_key
+    avançando ambos em paralelo (merge-join): memória extra constante, pois
+    nenhum dos lados é carregado. Retorna as contagens de arquivos lidos.
+    pruned ({diretório: nº de arquivos}, ver find_identical_subtrees) lista
+    subárvores idênticas nos dois snapshots: seus arquivos são pulados nos dois
+    iteradores (que devem aceitar send(n), ver iter_snapshot_files) sem comparação.
+    Com moves (MoveDetector), os ausentes e os exclusivos do destino são
+    entregues a ele; cabe a quem chama gravá-los com moves.flush(writer).
+    """
+    totals = {'files_origem_read': 0, 'files_destino_read': 0, 'files_found_in_both': 0,
+              'subtrees_pruned': 0, 'files_pruned': 0}
+    previous_keys = {'origem': None, 'destino': None}
+
+    def advance(iterator, side, skip=0):
+        if skip:
+            try:
+                item = iterator.send(skip)
+            except StopIteration:
+                item = None
+            totals[f'files_{side}_read'] += skip
+        else:
+            item = next(iterator, None)
+        if item is not None:
+            key = snapshot_path_key(item[0])
+            if previous_keys[side] is not None and key < previous_keys[side]:
+                raise ValueError(f"Snapshot de {side} não está ordenado (em '{item[0]}'); use a comparação por consulta.")
+            previous_keys[side] = key
+            totals[f'files_{side}_read'] += 1
+            return item, key
+        return None, None
+
+    pruned = pruned or {}
+    attempted_subtrees = set()
+    last_directory, last_subtree = None, None
+
+    origem, key_origem = advance(files_origem, 'origem')
+    destino, key_destino = advance(files_destino, 'destino')
+    while origem is not None:
+        if not check_operation_control():
+            log_and_emit_message('info', "Interrupção detectada durante a comparação de arquivos.", force_emit=True)
+            return totals
+
+        path, info_origem = origem
+        _report_comparison_progress(totals['files_origem_read'], path)
+
+        if pruned:
+            directory = os.path.dirname(path)
+            if directory != last_directory:
+                last_directory, last_subtree = directory, find_pruned_subtree(directory, pruned)
+            subtree = last_subtree
+            if subtree is not None and subtree not in attempted_subtrees:
+                # Primeiro arquivo (na ordem canônica) de uma subárvore idêntica:
+                # alinha o destino nele e pula o restante da subárvore nos dois lados
+                attempted_subtrees.add(subtree)
+                while destino is not None and key_destino < key_origem:
+                    if moves is not None:
+                        moves.add_destination_only(*destino)
+                    destino, key_destino = advance(files_destino, 'destino')
+                if destino is not None and key_destino == key_origem:
+                    count = pruned[subtree]
+                    origem, key_origem = advance(files_origem, 'origem', count - 1)
+                    destino, key_destino = advance(files_destino, 'destino', count - 1)
+                    prefix = snapshot_path_key(subtree) + '\0' if subtree else ''
+                    for item in (origem, destino):
+                        if item is not None and snapshot_path_key(item[0]).startswith(prefix):
+                            raise ValueError(f"Resumo do diretório '{subtree}' não corresponde aos arquivos do snapshot.")
+                    totals['files_found_in_both'] += count
+                    totals['subtrees_pruned'] += 1
+                    totals['files_pruned'] += count
+                    continue
+
+        if destino is None or key_origem < key_destino:
+            if moves is not None:
+                moves.add_missing(path, info_origem, writer)
+            else:
+                writer.add(build_missing_record(path, info_origem))
+            origem, key_origem = advance(files_origem, 'origem')
+        elif key_origem > key_destino:
+            # Arquivo presente apenas no destino
+            if moves is not None:
+                moves.add_destination_only(*destino)
+            destino, key_destino = advance(files_destino, 'destino')
+        else:
+            record = compare_file_pair(path, info_origem, destino[1], hash_algorithm, verifier)
+            if record is not None:
+                writer.add(record)
+            else:
+                totals['files_found_in_both'] += 1
+            origem, key_origem = advance(files_origem, 'origem')
+            destino, key_destino = advance(files_destino, 'destino')
+
+    # Conta o restante do destino (apenas arquivos exclusivos do destino)
+    while destino is not None:
+        if moves is not None:
+            moves.add_destination_only(*destino)
+        destino, key_destino = advance(files_destino, 'destino')
+    return totals
+
+def compare_snapshots_lookup(files_origem, files_destino, hash_algorithm=None, verifier=None):
+    """
+    Compara consultando cada caminho da origem em um mapeamento do destino
+    (dict ou BinarySnapshot). Usado quando algum snapshot não está ordenado.
+    Gera os registros de não copiados e acumula as contagens em totals.
+    """
+    totals = {'files_origem_read': 0, 'files_destino_read': len(files_destino), 'files_found_in_both': 0}
+
+    def records():
+        for i, (path, info_origem) in enumerate(files_origem):
+            if not check_operation_control():
+                log_and_emit_message('info', "Interrupção detectada durante a comparação de arquivos.", force_emit=True)
+                break
+            totals['files_origem_read'] = i + 1
+            _report_comparison_progress(i + 1, path)
+
+            info_destino = files_destino.get(path)
+            if info_destino is None:
+                yield build_missing_record(path, info_origem)
+                continue
+            record = compare_file_pair(path, info_origem, info_destino, hash_algorithm, verifier)
+            if record is not None:
+                yield record
+            else:
+                totals['files_found_in_both'] += 1
+
+    return totals, records()
+
+def flush_moved_files(moves, writer):
+    """Grava os ausentes retidos pelo MoveDetector (casando os movidos) e registra o resultado."""
+    update_and_emit_status("Procurando arquivos movidos no destino...", force_emit=True)
+    moves.flush(writer)
+    moved = sum(count for key, count in moves.counts.items() if key.startswith('moved_by_'))
+    if moved:
+        log_and_emit_message('info', f"{moved} arquivo(s) ausente(s) encontrado(s) em outro caminho do destino (movidos).", force_emit=True)
+    if moves.counts['candidates_dropped']:
+        log_and_emit_message('warning', f"Muitos arquivos exclusivos do destino: {moves.counts['candidates_dropped']} não foram "
+                                        "considerados na detecção de movidos.", force_emit=True)
+
+def perform_comparison_task(json_origem_filename, json_destino_filename, verify_mode='none', path_filter=None):
+    """
+    Executa a tarefa de comparação em uma thread separada.
+    Com verify_mode 'quick' ou 'full', arquivos de mesmo tamanho e mtime diferente
+    têm o conteúdo verificado nas pastas de origem e destino (ver ContentVerifier).
+    path_filter é aplicado aos registros dos dois snapshots. A comparação é
+    recusada se, somadas a ele, as regras de coleta dos snapshots diferirem
+    (um lado teria arquivos que o outro nunca coletou).
+    """
+    files_destino = None
+    moves = None
+    try:
+        state = job_state()
+        with state_lock:
+            state['current_stage'] = 'comparing'
+        
+        update_and_emit_status(f"Carregando dados para comparação...", force_emit=True)
+        log_and_emit_message('info', f"Iniciando comparação entre '{json_origem_filename}' e '{json_destino_filename}'", force_emit=True)
+
+        path_origem = os.path.join(INFO_DIR, secure_filename(json_origem_filename))
+        path_destino = os.path.join(INFO_DIR, secure_filename(json_destino_filename))
+
+        try:
+            data_origem, files_origem = open_snapshot(path_origem)
+            data_destino, files_destino_iter = open_snapshot(path_destino)
+            comparison_filters = path_filter.describe() if path_filter else None
+            if effective_filter_rules(data_origem.get('filters'), comparison_filters) != \
+                    effective_filter_rules(data_destino.get('filters'), comparison_filters):
+                log_and_emit_message('error', f"Os snapshots foram coletados com regras de inclusão/exclusão incompatíveis "
+                                              f"(origem: {data_origem.get('filters')}, destino: {data_destino.get('filters')}). "
+                                              "Colete novamente com as mesmas regras ou aplique na comparação as regras que faltam.", force_emit=True)
+                emit_job_event('comparison_complete', {'status': 'error', 'message': 'Snapshots coletados com regras de inclusão/exclusão incompatíveis.'})
+                return
+            if path_filter:
+                files_origem = iter_filtered_files(files_origem, path_filter)
+                files_destino_iter = iter_filtered_files(files_destino_iter, path_filter)
+            use_merge_join = snapshot_is_sorted(path_origem, data_origem) and snapshot_is_sorted(path_destino, data_destino)
+            if not use_merge_join:
+                # Sem ordenação garantida, o destino é consultado por caminho
+                # (em memória, ou mapeado se for binário); a origem é lida em streaming
+                files_destino = build_snapshot_index(path_destino, files_destino_iter)
+            log_and_emit_message('info', "Dados de origem e destino carregados com sucesso.", force_emit=True)
+        except Exception as e:
+            log_and_emit_message('error', f"Erro ao carregar arquivos de coleta para comparação: {e}", force_emit=True)
+            mark_job_failed()
+            return
+
+        dir_origem = data_origem.get('base_directory', 'Desconhecido')
+        dir_destino = data_destino.get('base_directory', 'Desconhecido')
+        comparison_engine = 'merge_join' if use_merge_join else 'lookup'
+        log_and_emit_message('info', "Comparação por merge-join de snapshots ordenados (memória constante)." if use_merge_join
+                             else "Snapshots sem ordenação garantida: comparação por consulta ao destino.", force_emit=True)
+        hash_algorithm = comparison_hash_algorithm(data_origem, data_destino)
+        if hash_algorithm:
+            log_and_emit_message('info', f"Os dois snapshots têm hashes {hash_algorithm}: o conteúdo será comparado por hash.", force_emit=True)
+        elif data_origem.get('hash_algorithm') or data_destino.get('hash_algorithm'):
+            log_and_emit_message('warning', "Os snapshots não têm hashes do mesmo algoritmo; comparação por tamanho e data de modificação.", force_emit=True)
+
+        verifier = None
+        if verify_mode != 'none' and not (os.path.isdir(dir_origem) and os.path.isdir(dir_destino)):
+            log_and_emit_message('warning', "As pastas de origem e destino não estão acessíveis; a verificação de conteúdo foi desativada.", force_emit=True)
+        elif verify_mode != 'none':
+            verifier = ContentVerifier(dir_origem, dir_destino, verify_mode)
+            log_and_emit_message('info', f"Verificação de conteúdo ('{verify_mode}') para arquivos de mesmo tamanho e data diferente.", force_emit=True)
+
+        total_files_origem = data_origem.get('total_files_scanned') or 0
+        with state_lock:
+            state['total_files_estimated'] = total_files_origem
+            state['files_processed'] = 0
+        update_and_emit_status("Comparando arquivos...", force_emit=True)
+
+        pruned = {}
+        if path_filter:
+            # Os resumos de diretório contam os arquivos sem o filtro da comparação: não há como pular subárvores
+            log_and_emit_message('info', "Com regras na comparação, subárvores idênticas não são puladas.", force_emit=True)
+        elif use_merge_join:
+            pruned = find_identical_subtrees(load_directory_digests(path_origem, data_origem),
+                                             load_directory_digests(path_destino, data_destino))
+            if pruned:
+                log_and_emit_message('info', f"{len(pruned)} subárvore(s) idêntica(s) nos dois snapshots "
+                                             f"({sum(pruned.values())} arquivo(s)) serão puladas.", force_emit=True)
+
+        moves = None
+        if use_merge_join:
+            moves = MoveDetector(hash_algorithm, verifier)
+        else:
+            log_and_emit_message('info', "A detecção de arquivos movidos requer snapshots ordenados e não será feita.", force_emit=True)
+
+        def run_comparison(writer):
+            if use_merge_join:
+                totals = compare_snapshots_merge_join(files_origem, files_destino_iter, writer, hash_algorithm, verifier, pruned, moves)
+                flush_moved_files(moves, writer)
+            else:
+                totals, records = compare_snapshots_lookup(files_origem, files_destino, hash_algorithm, verifier)
+                for record in records:
+                    writer.add(record)
+            if path_filter:
+                # Os totais dos snapshots incluem os arquivos que a comparação descartou
+                total_origem, total_destino = totals['files_origem_read'], totals['files_destino_read']
+            else:
+                # Snapshot sem trailer (truncado): usa a contagem lida
+                total_origem = total_files_origem or totals['files_origem_read']
+                total_destino = data_destino.get('total_files_scanned') or totals['files_destino_read']
+            return {
+                "total_files_origem": total_origem,
+                "total_files_destino": total_destino,
+                "files_found_in_both": totals['files_found_in_both'],
+                "subtrees_pruned": totals.get('subtrees_pruned', 0),
+                "files_pruned": totals.get('files_pruned', 0),
+                "move_detection": moves.stats() if moves is not None else None,
+                "verification": verifier.stats() if verifier is not None else None
+            }
+
+        write_comparison_report({
+            "json_origem_filename": json_origem_filename,
+            "json_destino_filename": json_destino_filename,
+            "dir_origem": dir_origem,
+            "dir_destino": dir_destino,
+            "comparison_engine": comparison_engine,
+            "hash_algorithm": hash_algorithm,
+            "filters": comparison_filters,
+            "snapshot_filters": {'origem': data_origem.get('filters'), 'destino': data_destino.get('filters')}
+        }, run_comparison)
+
+    except Exception as e:
+        log_and_emit_message('error', f"Erro crítico durante a comparação: {e}", force_emit=True)
+        emit_job_event('comparison_complete', {'status': 'error', 'message': f'Erro inesperado: {e}'})
+    finally:
+        close_snapshot_index(files_destino)
+        if moves is not None:
+            moves.close()
+        update_and_emit_status("Operação de comparação finalizada.", force_emit=True)
+
+def write_comparison_report(header, run_comparison):
+    """
+    Cria o relatório de comparação (JSON e CSV de não copiados) com o cabeçalho
+    dado e executa run_comparison(writer), que grava as diferenças no writer e
+    retorna os totais do relatório. Ao final, cataloga o relatório e emite
+    'comparison_complete'. Usado pela comparação de snapshots e pela direta.
+    """
+    session_id = str(uuid.uuid4())
+    compression = get_compression_settings()
+    json_filename = compressed_filename(f"comparison_result_{session_id}.json", compression)
+    json_filepath = os.path.join(RESULTS_DIR, json_filename)
+    csv_filename = compressed_filename(f"not_copied_comparison_{session_id}.csv", compression)
+    csv_filepath = os.path.join(RESULTS_DIR, csv_filename)
+
+    writer = None
+    try:
+        writer = ComparisonResultWriter(json_filepath, csv_filepath, {
+            "session_id": session_id,
+            "timestamp": datetime.now().isoformat(),
+            **header
+        })
+        comparison_result, csv_written = writer.close(run_comparison(writer))
+        writer = None
+        catalog_report(RESULTS_DIR, json_filename, comparison_result)
+        log_and_emit_message('success', f"Comparação concluída! Relatório JSON salvo como: {json_filename}", force_emit=True)
+
+        if csv_written:
+            log_and_emit_message('info', f"CSV de arquivos não copiados salvo como: {csv_filename}", force_emit=True)
+        else:
+            log_and_emit_message('info', "Todos os arquivos foram encontrados ou são idênticos. Nenhum CSV de não copiados gerado.", force_emit=True)
+
+        emit_job_event('comparison_complete', {
+            'status': 'success',
+            'json_filename': json_filename,
+            'csv_filename': csv_filename if csv_written else None
+        })
+
+    except IOError as e:
+        log_and_emit_message('error', f"Erro ao salvar arquivo de comparação JSON ou CSV: {e}", force_emit=True)
+        emit_job_event('comparison_complete', {'status': 'error', 'message': f'Erro ao salvar arquivo: {e}'})
+    finally:
+        if writer is not None:
+            writer.abort()
+
+def iter_in_background(make_iterator, name):
+    """
+    Consome o iterador criado por make_iterator() em uma thread própria
+    (associada à tarefa atual) e gera seus itens, de modo que a produção
+    avança em paralelo com o consumo. Os itens trafegam em lotes por uma fila
+    limitada (LIVE_SCAN_QUEUE_BATCHES); erros do produtor são relançados aqui.
+    Fechar o gerador encerra o produtor.
+    """
+    batches = queue.Queue(maxsize=LIVE_SCAN_QUEUE_BATCHES)
+    consumer_done = threading.Event()
+    end_of_items = object()
+
+    def put(item):
+        while not consumer_done.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @job_bound
+    def produce():
+        batch = []
+        try:
+            for item in make_iterator():
+                batch.append(item)
+                if len(batch) >= LIVE_SCAN_BATCH_SIZE:
+                    if not put(batch):
+                        return
+                    batch = []
+            if not batch or put(batch):
+                put(end_of_items)
+        except Exception as e:
+            put(e)
+
+    threading.Thread(target=produce, name=name, daemon=True).start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is end_of_items:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield from batch
+    finally:
+        consumer_done.set()
+
+def perform_live_comparison_task(dir_origem, dir_destino, verify_mode='none', path_filter=None):
+    """
+    Compara duas pastas diretamente, sem gravar snapshots: as duas árvores são
+    percorridas ao mesmo tempo (uma thread por lado), na ordem canônica de
+    snapshot_path_key, e comparadas por merge-join à medida que os arquivos
+    aparecem. Gera os mesmos relatórios (comparison_result_*.json e CSV) que
+    perform_comparison_task; verify_mode funciona da mesma forma. path_filter
+    poda as duas varreduras como na coleta.
+    """
+    files_origem = None
+    files_destino = None
+    moves = None
+    try:
+        state = job_state()
+        with state_lock:
+            state['current_stage'] = 'comparing'
+
+        update_and_emit_status("Comparando pastas diretamente...", force_emit=True)
+        log_and_emit_message('info', f"Iniciando comparação direta entre '{dir_origem}' e '{dir_destino}'", force_emit=True)
+
+        for side, directory in (('origem', dir_origem), ('destino', dir_destino)):
+            if not os.path.isdir(directory):
+                log_and_emit_message('error', f"Diretório de {side} '{directory}' não é válido ou acessível.", force_emit=True)
+                emit_job_event('comparison_complete', {'status': 'error', 'message': f'Diretório de {side} inválido.'})
+                return
+
+        verifier = None
+        if verify_mode != 'none':
+            verifier = ContentVerifier(dir_origem, dir_destino, verify_mode)
+            log_and_emit_message('info', f"Verificação de conteúdo ('{verify_mode}') para arquivos de mesmo tamanho e data diferente.", force_emit=True)
+
+        def on_origem_directory(relative_dir, files_seen, dirs_seen, pending_dirs):
+            # O total da origem é estimado durante a varredura, como na coleta
+            with state_lock:
+                state['total_files_estimated'] = max(estimate_total_files(files_seen, dirs_seen, pending_dirs), state['files_processed'])
+
+        inaccessible_origem = []
+        inaccessible_destino = []
+        files_origem = iter_in_background(lambda: scan_directory_tree(dir_origem, inaccessible_origem, on_origem_directory,
+                                                                          path_filter=path_filter), 'live-origem')
+        files_destino = iter_in_background(lambda: scan_directory_tree(dir_destino, inaccessible_destino, path_filter=path_filter),
+                                           'live-destino')
+
+        moves = MoveDetector(verifier=verifier)
+
+        def run_comparison(writer):
+            totals = compare_snapshots_merge_join(files_origem, files_destino, writer, verifier=verifier, moves=moves)
+            flush_moved_files(moves, writer)
+            with state_lock:
+                state['total_files_estimated'] = totals['files_origem_read']
+            return {
+                "total_files_origem": totals['files_origem_read'],
+                "total_files_destino": totals['files_destino_read'],
+                "files_found_in_both": totals['files_found_in_both'],
+                "move_detection": moves.stats(),
+                "verification": verifier.stats() if verifier is not None else None,
+                "inaccessible_files_origem": inaccessible_origem,
+                "inaccessible_files_destino": inaccessible_destino,
+                "interrupted": stop_requested()
+            }
+
+        write_comparison_report({
+            "json_origem_filename": None,
+            "json_destino_filename": None,
+            "dir_origem": dir_origem,
+            "dir_destino": dir_destino,
+            "comparison_engine": 'live',
+            "hash_algorithm": None,
+            "filters": path_filter.describe() if path_filter else None
+        }, run_comparison)
+
+    except Exception as e:
+        log_and_emit_message('error', f"Erro crítico durante a comparação direta: {e}", force_emit=True)
+        emit_job_event('comparison_complete', {'status': 'error', 'message': f'Erro inesperado: {e}'})
+    finally:
+        for files in (files_origem, files_destino):
+            if files is not None:
+                files.close()
+        if moves is not None:
+            moves.close()
+        update_and_emit_status("Operação de comparação finalizada.", force_emit=True)
+
+# --- Análise de Duplicados ---
+
+class DuplicateReportWriter:
+    """
+    Grava o relatório de duplicados (JSON) e seu CSV grupo a grupo, sem
+    acumular os grupos em memória, como ComparisonResultWriter. Os totais são
+    gravados após a lista de grupos.
+    """
+
+    CSV_HEADER = ["Grupo", "Tamanho (Bytes)", "Hash", "Caminho Relativo"]
+
+    def __init__(self, json_filepath, csv_filepath, header):
+        self.json_filepath = json_filepath
+        self.csv_filepath = csv_filepath
+        self.header = header
+        self.groups_count = 0
+        self.files_count = 0
+        self.reclaimable_bytes = 0
+        self._json_file = open_storage_file(f"{json_filepath}.tmp", 'w')
+        self._csv_file = open_storage_file(f"{csv_filepath}.tmp", 'w', newline='')
+        self._csv_writer = csv.writer(self._csv_file)
+        self._csv_writer.writerow(self.CSV_HEADER)
+        self._json_file.write('{\n')
+        for key, value in header.items():
+            self._json_file.write(f'    {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},\n')
+        self._json_file.write('    "duplicate_groups": [')
+
+    def add(self, size, digest, match, paths):
+        """Acrescenta um grupo de arquivos idênticos; todos menos um são espaço recuperável."""
+        group = {
+            'size': size,
+            'hash': digest,
+            'match': match,
+            'reclaimable_bytes': size * (len(paths) - 1),
+            'files': sorted(paths)
+        }
+        separator = ',\n' if self.groups_count else '\n'
+        self._json_file.write(f"{separator}        {json.dumps(group, ensure_ascii=False)}")
+        self.groups_count += 1
+        self.files_count += len(paths)
+        self.reclaimable_bytes += group['reclaimable_bytes']
+        for path in group['files']:
+            self._csv_writer.writerow([self.groups_count, size, digest, path])
+
+    def close(self, totals):
+        """Finaliza o JSON com os totais e renomeia os arquivos. Retorna o resumo do relatório sem os grupos."""
+        summary = dict(self.header, **totals, **{
+            "duplicate_groups_count": self.groups_count,
+            "duplicate_files_count": self.files_count,
+            "reclaimable_bytes": self.reclaimable_bytes
+        })
+        self._json_file.write('\n    ]' if self.groups_count else ']')
+        for key, value in summary.items():
+            if key not in self.header:
+                self._json_file.write(f',\n    {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}')
+        self._json_file.write('\n}\n')
+        self._json_file.close()
+        self._csv_file.close()
+        os.replace(f"{self.json_filepath}.tmp", self.json_filepath)
+        os.replace(f"{self.csv_filepath}.tmp", self.csv_filepath)
+        return summary
+
+    def abort(self):
+        """Descarta os arquivos temporários após um erro."""
+        for handle, path in ((self._json_file, self.json_filepath), (self._csv_file, self.csv_filepath)):
+            handle.close()
+            if os.path.exists(f"{path}.tmp"):
+                os.remove(f"{path}.tmp")
+
+def spool_dedup_candidates(filepath, min_size, stats):
+    """
+    Lê o snapshot duas vezes: na primeira conta os arquivos por tamanho; na
+    segunda grava em uma tabela SQLite temporária (em disco) apenas os
+    arquivos cujo tamanho se repete, com o hash do snapshot, se houver. Só a
+    contagem por tamanho fica em memória. Retorna a conexão, ou None se a
+    tarefa for parada.
+    """
+    metadata = read_snapshot_metadata(filepath)
+    hash_algorithm = metadata.get('hash_algorithm')
+    state = job_state()
+
+    size_counts = defaultdict(int)
+    files_in_snapshot = 0
+    for path, info in iter_snapshot_files(filepath):
+        files_in_snapshot += 1
+        if files_in_snapshot % DEDUP_INSERT_BATCH_SIZE == 0:
+            if not check_operation_control():
+                return None
+            with state_lock:
+                state['files_processed'] = files_in_snapshot
+            update_and_emit_status()
+        size = info.get('size')
+        if size is not None and size >= min_size:
+            size_counts[size] += 1
+    stats['files_in_snapshot'] = files_in_snapshot
+    repeated_sizes = {size for size, count in size_counts.items() if count > 1}
+    stats['candidate_sizes'] = len(repeated_sizes)
+    del size_counts
+    log_and_emit_message('info', f"{files_in_snapshot} arquivos no snapshot; {len(repeated_sizes)} tamanhos se repetem.", force_emit=True)
+
+    conn = sqlite3.connect('') # Banco temporário privado, removido ao fechar
+    conn.execute('CREATE TABLE candidates (size INTEGER NOT NULL, path TEXT NOT NULL, digest TEXT)')
+    batch = []
+    for path, info in iter_snapshot_files(filepath):
+        if info.get('size') in repeated_sizes:
+            batch.append((info['size'], path, info.get(hash_algorithm) if hash_algorithm else None))
+            if len(batch) >= DEDUP_INSERT_BATCH_SIZE:
+                if not check_operation_control():
+                    conn.close()
+                    return None
+                conn.executemany('INSERT INTO candidates VALUES (?, ?, ?)', batch)
+                stats['candidate_files'] = stats.get('candidate_files', 0) + len(batch)
+                batch = []
+    conn.executemany('INSERT INTO candidates VALUES (?, ?, ?)', batch)
+    stats['candidate_files'] = stats.get('candidate_files', 0) + len(batch)
+    conn.commit()
+    return conn
+
+def iter_size_groups(conn):
+    """Gera (tamanho, [(caminho, hash_do_snapshot)]) dos candidatos, dos maiores para os menores."""
+    cursor = conn.execute('SELECT size, path, digest FROM candidates ORDER BY size DESC')
+    for size, rows in groupby(cursor, key=lambda row: row[0]):
+        yield size, [(path, digest) for _, path, digest in rows]
+
+def iter_duplicate_groups(base_directory, size_groups, algorithm, workers, stats, hash_cache=None):
+    """
+    Recebe os grupos de mesmo tamanho e gera (tamanho, hash, critério, caminhos)
+    de cada conjunto de arquivos idênticos. Grupos em que todos os arquivos já
+    têm hash no snapshot são resolvidos sem ler o disco ('snapshot_hash').
+    Nos demais, a impressão digital (file_fingerprint) separa os candidatos e
+    só os que coincidem têm o hash completo calculado ('hash'); arquivos de até
+    três blocos são lidos inteiros pela impressão ('content'). As leituras são
+    feitas em um pool de threads, em lotes de DEDUP_BATCH_FILES arquivos.
+    """
+    readable = base_directory and os.path.isdir(base_directory)
+    stats_lock = threading.Lock() # As leituras rodam no pool
+
+    def read_or_none(func, *args):
+        try:
+            digest, bytes_read = func(*args)
+        except OSError as e:
+            with stats_lock:
+                stats['errors'] = stats.get('errors', 0) + 1
+            log_and_emit_message('warning', f"Não foi possível ler {args[0]}: {e}", force_emit=True)
+            return None
+        with stats_lock:
+            stats['bytes_read'] = stats.get('bytes_read', 0) + bytes_read
+        return digest
+
+    @job_bound
+    def fingerprint(path, size):
+        return read_or_none(file_fingerprint, os.path.join(base_directory, path), size)
+
+    @job_bound
+    def full_hash(path):
+        file_path = os.path.join(base_directory, path)
+        if hash_cache is None:
+            return read_or_none(hash_file, file_path, algorithm)
+        return read_or_none(hash_file_cached, file_path, algorithm, hash_cache)
+
+    def regroup(files, digests):
+        """Agrupa [(tamanho, caminho)] por (tamanho, digest); retorna {(tamanho, digest): [caminhos]} com mais de um arquivo."""
+        groups = defaultdict(list)
+        for (size, path), digest in zip(files, digests):
+            if digest is not None:
+                groups[(size, digest)].append(path)
+        return {key: paths for key, paths in groups.items() if len(paths) > 1}
+
+    def process(batch, executor):
+        to_fingerprint = [] # (tamanho, caminho)
+        for size, entries in batch:
+            if all(digest for _, digest in entries):
+                by_digest = defaultdict(list)
+                for path, digest in entries:
+                    by_digest[digest].append(path)
+                for digest, paths in by_digest.items():
+                    if len(paths) > 1:
+                        yield size, digest, 'snapshot_hash', paths
+            elif readable:
+                to_fingerprint.extend((size, path) for path, _ in entries)
+            else:
+                stats['files_unverified'] = stats.get('files_unverified', 0) + len(entries)
+        if not to_fingerprint:
+            return
+
+        fingerprints = list(executor.map(lambda item: fingerprint(item[1], item[0]), to_fingerprint))
+        stats['files_fingerprinted'] = stats.get('files_fingerprinted', 0) + len(to_fingerprint)
+        to_hash = []
+        for (size, fp), paths in regroup(to_fingerprint, fingerprints).items():
+            if size <= 3 * FINGERPRINT_BLOCK_SIZE:
+                yield size, fp, 'content', paths
+            else:
+                to_hash.extend((size, path) for path in paths)
+        if not to_hash:
+            return
+
+        digests = list(executor.map(lambda item: full_hash(item[1]), to_hash))
+        stats['files_hashed'] = stats.get('files_hashed', 0) + len(to_hash)
+        for (size, digest), paths in regroup(to_hash, digests).items():
+            yield size, digest, 'hash', paths
+
+    state = job_state()
+    processed = 0
+    batch = []
+    batch_files = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dedup') as executor:
+        for size, entries in size_groups:
+            batch.append((size, entries))
+            batch_files += len(entries)
+            if batch_files < DEDUP_BATCH_FILES:
+                continue
+            if not check_operation_control():
+                return
+            yield from process(batch, executor)
+            processed += batch_files
+            batch, batch_files = [], 0
+            with state_lock:
+                state['files_processed'] = processed
+            update_and_emit_status()
+        if batch and check_operation_control():
+            yield from process(batch, executor)
+
+def perform_dedup_task(snapshot_filename, min_size=DEDUP_MIN_SIZE, workers=DEFAULT_HASH_WORKERS, use_hash_cache=True):
+    """
+    Procura arquivos duplicados dentro de um snapshot de coleta. Os arquivos
+    são agrupados por tamanho (tamanhos únicos são descartados sem leitura) e
+    só os candidatos restantes são lidos, primeiro pela impressão digital e
+    depois pelo hash completo (ver iter_duplicate_groups). Gera um relatório
+    (dedup_report_*.json e CSV) com os grupos de duplicados e o espaço
+    recuperável, mantendo um arquivo de cada grupo.
+    """
+    conn = None
+    hash_cache = None
+    writer = None
+    try:
+        state = job_state()
+        with state_lock:
+            state['current_stage'] = 'dedup'
+
+        filepath = os.path.join(INFO_DIR, secure_filename(snapshot_filename))
+        update_and_emit_status("Agrupando arquivos por tamanho...", force_emit=True)
+        log_and_emit_message('info', f"Iniciando análise de duplicados em '{snapshot_filename}'", force_emit=True)
+
+        metadata = read_snapshot_metadata(filepath)
+        base_directory = metadata.get('base_directory')
+        algorithm = metadata.get('hash_algorithm') or DEDUP_DEFAULT_HASH_ALGORITHM
+        if not os.path.isdir(base_directory or ''):
+            if not metadata.get('hash_algorithm'):
+                log_and_emit_message('error', f"A pasta do snapshot '{base_directory}' não está acessível e o snapshot não tem hashes.", force_emit=True)
+                emit_job_event('dedup_complete', {'status': 'error', 'message': 'Pasta do snapshot inacessível.'})
+                return
+            log_and_emit_message('warning', "A pasta do snapshot não está acessível: apenas os arquivos com hash no snapshot serão comparados.", force_emit=True)
+
+        with state_lock:
+            state['total_files_estimated'] = metadata.get('total_files_scanned') or 0
+            state['files_processed'] = 0
+        stats = {}
+        started = time.perf_counter()
+        conn = spool_dedup_candidates(filepath, min_size, stats)
+        if conn is None:
+            log_and_emit_message('info', "Análise de duplicados interrompida.", force_emit=True)
+            return
+
+        with state_lock:
+            state['total_files_estimated'] = stats.get('candidate_files', 0)
+            state['files_processed'] = 0
+        update_and_emit_status(f"Verificando {stats.get('candidate_files', 0)} arquivos candidatos...", force_emit=True)
+        if use_hash_cache:
+            try:
+                hash_cache = HashCache(os.path.join(INFO_DIR, HASH_CACHE_FILENAME))
+            except sqlite3.Error as e:
+                log_and_emit_message('warning', f"Cache de hashes indisponível, todos os candidatos serão lidos: {e}", force_emit=True)
+
+        session_id = str(uuid.uuid4())
+        compression = get_compression_settings()
+        json_filename = compressed_filename(f"dedup_report_{session_id}.json", compression)
+        csv_filename = compressed_filename(f"dedup_report_{session_id}.csv", compression)
+        writer = DuplicateReportWriter(os.path.join(RESULTS_DIR, json_filename), os.path.join(RESULTS_DIR, csv_filename), {
+            "session_id": session_id,
+            "timestamp": datetime.now().isoformat(),
+            "snapshot_filename": snapshot_filename,
+            "base_directory": base_directory,
+            "min_size": min_size,
+            "hash_algorithm": algorithm
+        })
+        for size, digest, match, paths in iter_duplicate_groups(base_directory, iter_size_groups(conn), algorithm, workers, stats, hash_cache):
+            writer.add(size, digest, match, paths)
+
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        report_data = writer.close({"interrupted": stop_requested(), "stats": stats})
+        writer = None
+        catalog_report(RESULTS_DIR, json_filename, report_data)
+        log_and_emit_message('info', f"Análise de duplicados concluída: {report_data['duplicate_groups_count']} grupos, "
+                                     f"{report_data['duplicate_files_count']} arquivos, {report_data['reclaimable_bytes']} bytes recuperáveis. "
+                                     f"Relatório salvo como: {json_filename}", force_emit=True)
+        emit_job_event('dedup_complete', {
+            'status': 'success',
+            'json_filename': json_filename,
+            'csv_filename': csv_filename,
+            'duplicate_groups_count': report_data['duplicate_groups_count'],
+            'reclaimable_bytes': report_data['reclaimable_bytes']
+        })
+
+    except Exception as e:
+        log_and_emit_message('error', f"Erro crítico durante a análise de duplicados: {e}", force_emit=True)
+        emit_job_event('dedup_complete', {'status': 'error', 'message': f'Erro inesperado: {e}'})
+    finally:
+        if writer is not None:
+            writer.abort()
+        if conn is not None:
+            conn.close()
+        if hash_cache is not None:
+            try:
+                hash_cache.close()
+            except sqlite3.Error as e:
+                log_and_emit_message('warning', f"Erro ao gravar o cache de hashes: {e}", force_emit=True)
+        update_and_emit_status("Análise de duplicados finalizada.", force_emit=True)
+
+class CopyVerificationError(Exception):
+    """O hash do destino não confere com o hash dos dados copiados da origem."""
+
+class CopyInterrupted(Exception):
+    """Cópia de um arquivo interrompida por um pedido de parada."""
+
+    def __init__(self, destination_path, offset=0):
+        super().__init__(destination_path)
+        self.offset = offset
+
+# Erros que indicam que o mecanismo de cópia não é suportado entre estes arquivos
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+def copy_file_chunked(source_path, destination_path, on_progress=None, chunk_size=COPY_CHUNK_SIZE,
+                      start_offset=0, on_checkpoint=None, keep_partial=False, digest=None,
+                      checkpoint_interval=COPY_CHECKPOINT_INTERVAL):
+    """
+    Copia o conteúdo de um arquivo em blocos de chunk_size, usando o mecanismo
+    mais eficiente disponível: os.copy_file_range (cópia dentro do kernel, ou
+    reflink em sistemas de arquivos que suportam), os.sendfile e, por último,
+    readinto em um buffer grande. Se um mecanismo falhar por não ser suportado,
+    o seguinte continua do mesmo ponto; o mesmo vale se um mecanismo do kernel
+    devolver 0 antes do fim do arquivo (procfs, sysfs, alguns FUSE e sistemas de
+    rede), como em shutil. Ao final, o total copiado é conferido com o tamanho
+    da origem. Entre blocos, on_progress(bytes) é chamado
+    e a pausa/parada verificada; ao parar, o arquivo parcial é removido (ou
+    mantido, com keep_partial) e CopyInterrupted é levantada. Ao final os
+    metadados são copiados, como em shutil.copy2. Retorna o nome do último
+    mecanismo usado.
+    Com start_offset, a cópia continua um destino parcial a partir desse ponto.
+    on_checkpoint(offset) é chamado a cada checkpoint_interval bytes copiados,
+    depois de os dados estarem gravados em disco (fsync).
+    Com digest (objeto do hashlib), os dados passam pelo processo (readinto) e
+    o hash do conteúdo lido da origem é calculado durante a cópia.
+    """
+    if os.path.exists(destination_path) and os.path.samefile(source_path, destination_path):
+        raise shutil.SameFileError(f"{source_path!r} e {destination_path!r} são o mesmo arquivo")
+
+    methods = []
+    if digest is None:
+        if hasattr(os, 'copy_file_range'):
+            methods.append('copy_file_range')
+        if hasattr(os, 'sendfile') and sys.platform.startswith('linux'): # Em outras plataformas o destino precisa ser um socket
+            methods.append('sendfile')
+    methods.append('readinto')
+
+    interrupted = False
+    with open(source_path, 'rb', buffering=0) as src, open(destination_path, 'r+b' if start_offset else 'wb', buffering=0) as dst:
+        src_fd, dst_fd = src.fileno(), dst.fileno()
+        offset = start_offset
+        checkpoint_offset = start_offset
+        if start_offset:
+            dst.truncate(start_offset)
+            os.lseek(src_fd, start_offset, os.SEEK_SET)
+            os.lseek(dst_fd, start_offset, os.SEEK_SET)
+            # O hash cobre o arquivo inteiro: o trecho já copiado é lido novamente da origem
+            position = 0
+            while digest is not None and position < start_offset:
+                block = os.pread(src_fd, min(chunk_size, start_offset - position), position)
+                if not block:
+                    break
+                digest.update(block)
+                position += len(block)
+        method_index = 0
+        method_start = offset # Ponto em que o mecanismo atual começou
+        view = None
+        while True:
+            if not check_operation_control():
+                interrupted = True
+                break
+            method = methods[method_index]
+            try:
+                if method == 'copy_file_range':
+                    copied = os.copy_file_range(src_fd, dst_fd, chunk_size)
+                elif method == 'sendfile':
+                    copied = os.sendfile(dst_fd, src_fd, offset, chunk_size)
+                else:
+                    if view is None:
+                        view = memoryview(bytearray(chunk_size))
+                    copied = src.readinto(view)
+                    if digest is not None:
+                        digest.update(view[:copied])
+                    written = 0
+                    while written < copied:
+                        written += dst.write(view[written:copied])
+            except OSError as e:
+                if method == 'readinto' or e.errno not in _COPY_FALLBACK_ERRNOS:
+                    raise
+                # Passa ao próximo mecanismo a partir do mesmo ponto nos dois arquivos
+                method_index += 1
+                method_start = offset
+                os.lseek(src_fd, offset, os.SEEK_SET)
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+                continue
+            if not copied:
+                if method != 'readinto' and (offset == method_start or offset < os.fstat(src_fd).st_size):
+                    # 0 logo na primeira chamada ou antes do fim: o mecanismo não funciona com este arquivo
+                    method_index += 1
+                    method_start = offset
+                    os.lseek(src_fd, offset, os.SEEK_SET)
+                    os.lseek(dst_fd, offset, os.SEEK_SET)
+                    continue
+                break
+            offset += copied
+            if on_progress is not None:
+                on_progress(copied)
+            if on_checkpoint is not None and offset - checkpoint_offset >= checkpoint_interval:
+                os.fsync(dst_fd)
+                on_checkpoint(offset)
+                checkpoint_offset = offset
+        source_size = os.fstat(src_fd).st_size
+
+    if interrupted:
+        if not keep_partial:
+            os.remove(destination_path)
+        raise CopyInterrupted(destination_path, offset)
+    if offset != source_size:
+        if not keep_partial:
+            os.remove(destination_path)
+        raise OSError(errno.EIO, f"cópia incompleta ou origem alterada durante a cópia ({offset} de {source_size} bytes)", source_path)
+    shutil.copystat(source_path, destination_path)
+    return methods[method_index]
+
+_ADLER_MOD = 65521
+
+def delta_block_size(file_size):
+    """Tamanho de bloco da cópia delta: potência de 2 próxima da raiz do tamanho do arquivo, como no rsync."""
+    block_size = 1 << max(0, math.isqrt(file_size).bit_length() - 1)
+    return max(DELTA_MIN_BLOCK_SIZE, min(DELTA_MAX_BLOCK_SIZE, block_size))
+
+def _strong_checksum(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def build_block_signatures(data, block_size):
+    """
+    Assinaturas dos blocos completos de data (o destino): checksum fraco
+    (Adler-32, que pode ser deslizado) -> {checksum forte: índice do bloco}.
+    """
+    signatures = defaultdict(dict)
+    for index in range(len(data) // block_size):
+        block = data[index * block_size:(index + 1) * block_size]
+        signatures[zlib.adler32(block)].setdefault(_strong_checksum(block), index)
+    return signatures
+
+def copy_file_delta(source_path, destination_path, on_progress=None, block_size=None, digest=None):
+    """
+    Atualiza destination_path para o conteúdo de source_path reaproveitando os
+    blocos que o destino já possui (algoritmo do rsync): as assinaturas dos
+    blocos do destino são calculadas e a origem é percorrida com um checksum
+    deslizante; trechos encontrados no destino são copiados dele, e só o
+    restante (literal) vem da origem. Como o deslizamento byte a byte é caro em
+    Python, após um bloco inteiro deslizado sem correspondência o trecho é
+    saltado com passos que dobram a cada falha (até DELTA_MAX_SKIP_BLOCKS); um
+    trecho antigo deslocado continua sendo encontrado, ao custo de alguns
+    blocos a mais copiados da origem. O total deslizado é limitado a
+    DELTA_MAX_ROLLING_BYTES por arquivo. O resultado é gravado em um arquivo
+    temporário que substitui o destino. Retorna (bytes reaproveitados, bytes literais).
+    Com digest (objeto do hashlib), o hash do conteúdo da origem também é calculado.
+    """
+    if os.path.samefile(source_path, destination_path):
+        raise shutil.SameFileError(f"{source_path!r} e {destination_path!r} são o mesmo arquivo")
+    source_size = os.path.getsize(source_path)
+    if not source_size or not os.path.getsize(destination_path):
+        # mmap não aceita arquivos vazios, e não há blocos a reaproveitar
+        copy_file_chunked(source_path, destination_path, on_progress, digest=digest)
+        return 0, source_size
+    block_size = block_size or delta_block_size(source_size)
+    temp_path = os.path.join(os.path.dirname(destination_path), f".{os.path.basename(destination_path)}.delta.tmp")
+    reused = 0
+    literal = 0
+    reported = 0
+
+    with open(source_path, 'rb') as src, open(destination_path, 'rb') as dst, open(temp_path, 'wb') as out:
+        try:
+            src_map = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+            dst_map = mmap.mmap(dst.fileno(), 0, access=mmap.ACCESS_READ)
+            with src_map, dst_map:
+                if digest is not None:
+                    for offset in range(0, source_size, COPY_CHUNK_SIZE):
+                        digest.update(src_map[offset:offset + COPY_CHUNK_SIZE])
+                signatures = build_block_signatures(dst_map, block_size)
+                rolling_budget = DELTA_MAX_ROLLING_BYTES
+                rolled = 0 # Bytes deslizados desde a última correspondência ou salto
+                skip_blocks = 1
+                pos = 0
+                literal_start = 0
+                a = b = None
+                while pos + block_size <= source_size:
+                    if pos - reported >= COPY_CHUNK_SIZE:
+                        if not check_operation_control():
+                            raise CopyInterrupted(destination_path)
+                        if on_progress is not None:
+                            on_progress(pos - reported)
+                        reported = pos
+
+                    if a is None:
+                        weak = zlib.adler32(src_map[pos:pos + block_size])
+                        a, b = weak & 0xffff, weak >> 16
+                    candidates = signatures.get((b << 16) | a)
+                    if candidates:
+                        index = candidates.get(_strong_checksum(src_map[pos:pos + block_size]))
+                        if index is not None:
+                            out.write(src_map[literal_start:pos])
+                            literal += pos - literal_start
+                            out.write(dst_map[index * block_size:(index + 1) * block_size])
+                            reused += block_size
+                            pos += block_size
+                            literal_start = pos
+                            a = None
+                            rolled = 0
+                            skip_blocks = 1
+                            continue
+
+                    if rolled < block_size and rolling_budget > 0 and pos + block_size < source_size:
+                        # Desliza a janela um byte: remove src[pos] e inclui src[pos + block_size]
+                        rolled += 1
+                        rolling_budget -= 1
+                        out_byte = src_map[pos]
+                        a = (a - out_byte + src_map[pos + block_size]) % _ADLER_MOD
+                        b = (b - block_size * out_byte + a - 1) % _ADLER_MOD
+                        pos += 1
+                    else:
+                        pos += skip_blocks * block_size
+                        a = None
+                        rolled = 0
+                        skip_blocks = min(skip_blocks * 2, DELTA_MAX_SKIP_BLOCKS)
+
+                out.write(src_map[literal_start:source_size])
+                literal += source_size - literal_start
+        except BaseException:
+            out.close()
+            os.remove(temp_path)
+            raise
+
+    if on_progress is not None:
+        on_progress(source_size - reported)
+    os.replace(temp_path, destination_path)
+    shutil.copystat(source_path, destination_path)
+    return reused, literal
+
+def verify_partial_copy(source_path, destination_path, offset, block_size=FINGERPRINT_BLOCK_SIZE):
+    """
+    Confere um destino parcial antes de retomar a cópia em offset: o destino
+    precisa ter ao menos offset bytes e o último bloco antes de offset deve
+    coincidir com a origem. Retorna o offset a partir do qual continuar (0 se
+    o destino parcial não for confiável).
+    """
+    try:
+        if os.path.getsize(destination_path) < offset or os.path.getsize(source_path) < offset:
+            return 0
+        start = max(0, offset - block_size)
+        with open(source_path, 'rb') as src, open(destination_path, 'rb') as dst:
+            src.seek(start)
+            dst.seek(start)
+            if src.read(offset - start) != dst.read(offset - start):
+                return 0
+    except OSError:
+        return 0
+    return offset
+
+class CopyJournal:
+    """
+    Diário de um job de cópia, em NDJSON somente de acréscimo: uma linha por
+    arquivo concluído ({"path", "done": true}) e, para arquivos grandes, uma
+    linha a cada COPY_CHECKPOINT_INTERVAL bytes gravados ({"path", "offset"}). Com o diário, uma cópia
+    interrompida (parada ou reinício do servidor) é retomada sem recopiar os
+    arquivos concluídos, e os arquivos parciais continuam do último offset.
+    Pode ser usado por várias threads.
+    """
+
+    def __init__(self, filepath, resume=False):
+        self.filepath = filepath
+        self.completed = set()
+        self.offsets = {}
+        if resume:
+            self._load()
+        self._lock = threading.Lock()
+        self._file = open(filepath, 'a' if resume else 'w', encoding='utf-8')
 
-# --- Funções para Obter JSONs Disponíveis ---
+    def _load(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # Última linha incompleta após uma queda
+                path = entry.get('path')
+                if path is None:
+                    continue
+                if entry.get('done'):
+                    self.completed.add(path)
+                    self.offsets.pop(path, None)
+                elif 'offset' in entry:
+                    self.offsets[path] = entry['offset']
 
-def get_available_info_jsons():
-    """Retorna uma lista de dicionários com informações dos JSONs de coleta disponíveis."""
-    jsons_info = []
-    for filename in os.listdir(INFO_DIR):
-        if filename.startswith('collected_info_') and filename.endswith('.json'):
-            filepath = os.path.join(INFO_DIR, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Verifica se as chaves existem para evitar KeyError
-                    collection_type = data.get('collection_type', 'unknown')
-                    timestamp_raw = data.get('timestamp', 'N/A')
-                    directory_path = data.get('base_directory', 'N/A')
-                    inaccessible_count = data.get('inaccessible_files_count', 0)
-
-                    # Formata o timestamp se for válido
-                    try:
-                        timestamp_formatted = datetime.fromisoformat(timestamp_raw).strftime("%d/%m/%Y %H:%M:%S")
-                    except ValueError:
-                        timestamp_formatted = timestamp_raw
-                    
-                    jsons_info.append({
-                        'filename': filename,
-                        'collection_type': collection_type,
-                        'timestamp': timestamp_formatted,
-                        'directory_path': directory_path,
-                        'inaccessible_count': inaccessible_count
-                    })
-            except (json.JSONDecodeError, IOError) as e:
-                logger.warning(f"Não foi possível ler ou decodificar JSON de coleta: {filename} - {e}")
-                continue
-    # Ordena os JSONs por timestamp, do mais recente para o mais antigo
-    jsons_info.sort(key=lambda x: x['timestamp'], reverse=True)
-    return jsons_info
+    def _append(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
 
-def get_available_comparison_jsons():
-    """Retorna uma lista de dicionários com informações dos JSONs de comparação disponíveis."""
-    jsons_info = []
-    for filename in os.listdir(RESULTS_DIR):
-        if filename.startswith('comparison_result_') and filename.endswith('.json'):
-            filepath = os.path.join(RESULTS_DIR, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    timestamp_raw = data.get('timestamp', 'N/A')
-                    try:
-                        timestamp_formatted = datetime.fromisoformat(timestamp_raw).strftime("%d/%m/%Y %H:%M:%S")
-                    except ValueError:
-                        timestamp_formatted = timestamp_raw
-                    
-                    not_copied_count = len(data.get('not_copied_files_details', []))
-                    
-                    jsons_info.append({
-                        'filename': filename,
-                        'timestamp': timestamp_formatted,
-                        'dir_origem': data.get('dir_origem', 'N/A'),
-                        'dir_destino': data.get('dir_destino', 'N/A'),
-                        'not_copied_count': not_copied_count
-                    })
-            except (json.JSONDecodeError, IOError) as e:
-                logger.warning(f"Não foi possível ler ou decodificar JSON de comparação: {filename} - {e}")
-                continue
-    jsons_info.sort(key=lambda x: x['timestamp'], reverse=True)
-    return jsons_info
+    def record_offset(self, relative_path, offset):
+        self._append({'path': relative_path, 'offset': offset})
 
-def get_available_copy_reports():
-    """Retorna uma lista de dicionários com informações dos JSONs de relatório de cópia disponíveis."""
-    reports = []
-    for filename in os.listdir(RESULTS_DIR):
-        if filename.startswith('copy_report_') and filename.endswith('.json'):
-            filepath = os.path.join(RESULTS_DIR, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    timestamp_raw = data.get('timestamp', 'N/A')
-                    try:
-                        timestamp_formatted = datetime.fromisoformat(timestamp_raw).strftime("%d/%m/%Y %H:%M:%S")
-                    except ValueError:
-                        timestamp_formatted = timestamp_raw
-                    
-                    reports.append({
-                        'filename': filename,
-                        'timestamp': timestamp_formatted,
-                        'source_base_directory': data.get('source_base_directory', 'N/A'),
-                        'destination_base_directory': data.get('destination_base_directory', 'N/A'),
-                        'total_files_attempted': data.get('total_files_attempted', 0),
-                        'files_copied_successfully': data.get('files_copied_successfully', 0),
-                        'files_failed_to_copy': data.get('files_failed_to_copy', 0)
-                    })
-            except (json.JSONDecodeError, IOError) as e:
-                logger.warning(f"Não foi possível ler ou decodificar JSON de relatório de cópia: {filename} - {e}")
-                continue
-    reports.sort(key=lambda x: x['timestamp'], reverse=True)
-    return reports
+    def record_done(self, relative_path):
+        self._append({'path': relative_path, 'done': True, 'timestamp': datetime.now().isoformat()})
 
-# --- Funções de Operação (Coleta, Comparação, Cópia) ---
+    def close(self):
+        with self._lock:
+            self._file.close()
 
-def get_file_info_robust(base_path):
+def get_copy_journal_path(comparison_json_filename):
+    """Caminho do diário de cópia associado a um relatório de comparação."""
+    name = os.path.splitext(split_compression_suffix(secure_filename(comparison_json_filename))[0])[0]
+    return os.path.join(RESULTS_DIR, f"{COPY_JOURNAL_PREFIX}{name}.ndjson")
+
+def hash_file_uncached(file_path, algorithm):
     """
-    Coleta informações de arquivos em um diretório de forma robusta,
-    tratando erros de acesso e coletando metadados.
+    Calcula o hash de um arquivo recém-gravado lendo-o do disco: os dados são
+    sincronizados e descartados do cache de páginas antes da leitura (quando a
+    plataforma permite), para que a verificação não leia apenas a memória.
     """
-    file_info = {}
-    inaccessible_files = []
-    
-    # Pré-contagem de arquivos para a barra de progresso
-    total_files_to_scan = 0
-    for root, _, files in os.walk(base_path, followlinks=False): # followlinks=False para evitar loops em links simbólicos
-        total_files_to_scan += len(files)
-    
-    with state_lock:
-        operation_state['total_files_estimated'] = total_files_to_scan
-        operation_state['files_processed'] = 0
-
-    log_and_emit_message('info', f"Iniciando varredura em '{base_path}' ({total_files_to_scan} arquivos estimados)...", force_emit=True)
+    if hasattr(os, 'posix_fadvise'):
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass # Sem suporte no sistema de arquivos: a leitura pode vir do cache
+        finally:
+            os.close(fd)
+    return hash_file(file_path, algorithm)
 
-    for root, _, files in os.walk(base_path, followlinks=False):
-        if not check_operation_control():
-            log_and_emit_message('info', "Interrupção detectada durante a coleta de arquivos.", force_emit=True)
-            break
-        
-        with state_lock:
-            # Garante que o current_directory seja o path relativo à base_path
-            relative_root = os.path.relpath(root, base_path)
-            operation_state['current_directory'] = relative_root if relative_root != '.' else '/'
-        update_and_emit_status()
+class CopyVerification:
+    """
+    Verificação das cópias por hash: o hash é calculado sobre os dados lidos da
+    origem durante a própria cópia e, no modo 'reread', conferido com uma
+    releitura do destino. Os hashes confirmados são gravados no cache de hashes
+    (HashCache) para a origem e o destino, de modo que uma coleta posterior com
+    o mesmo algoritmo os reaproveite sem ler os arquivos.
+    """
 
-        for file in files:
-            if not check_operation_control():
-                break
+    def __init__(self, mode, algorithm, hash_cache=None):
+        self.mode = mode
+        self.algorithm = algorithm
+        self.hash_cache = hash_cache
 
-            file_path = os.path.join(root, file)
-            relative_path = os.path.relpath(file_path, base_path)
-            
-            try:
-                stat_info = os.stat(file_path)
-                file_info[relative_path] = {
-                    'size': stat_info.st_size,
-                    'mtime': stat_info.st_mtime, # Data da última modificação
-                    'md5': None # MD5 pode ser adicionado aqui se necessário, mas é custoso para performance
-                }
-            except FileNotFoundError:
-                inaccessible_files.append({'path': relative_path, 'reason': 'Arquivo não encontrado durante a varredura.'})
-                log_and_emit_message('warning', f"Arquivo não encontrado durante varredura: {file_path}", force_emit=True)
-            except PermissionError:
-                inaccessible_files.append({'path': relative_path, 'reason': 'Permissão negada.'})
-                log_and_emit_message('error', f"Permissão negada ao acessar: {file_path}", force_emit=True)
-            except Exception as e:
-                inaccessible_files.append({'path': relative_path, 'reason': f'Erro inesperado: {str(e)}'})
-                log_and_emit_message('error', f"Erro ao acessar {file_path}: {e}", force_emit=True)
+    def new_digest(self):
+        return hashlib.new(self.algorithm)
 
-            with state_lock:
-                operation_state['files_processed'] += 1
-            update_and_emit_status()
-    
-    log_and_emit_message('info', f"Varredura em '{base_path}' concluída.", force_emit=True)
-    return file_info, inaccessible_files
+    def cache_key(self, file_path):
+        return HashCache.key_from_stat(os.stat(file_path), self.algorithm)
 
-def perform_collection_task(directory_path, collection_type):
-    """Executa a tarefa de coleta em uma thread separada."""
-    try:
-        with state_lock:
-            global operation_state
-            operation_state = initial_operation_state.copy() # Reseta o estado
-            operation_state['running'] = True
-            operation_state['current_stage'] = 'collecting'
-            operation_state['status_message'] = f"Iniciando coleta de {collection_type} em: {directory_path}"
-        
-        update_and_emit_status(force_emit=True)
-        log_and_emit_message('info', f"Coleta de '{collection_type}' iniciada para: {directory_path}", force_emit=True)
+    def check(self, destination_path, expected_digest):
+        """Confere o destino no modo 'reread'; levanta CopyVerificationError se divergir."""
+        if self.mode != 'reread':
+            return
+        actual_digest, _ = hash_file_uncached(destination_path, self.algorithm)
+        if actual_digest is None: # Parada durante a releitura
+            raise CopyInterrupted(destination_path)
+        if actual_digest != expected_digest:
+            raise CopyVerificationError(f"{self.algorithm} da origem {expected_digest}, do destino {actual_digest}")
 
-        if not os.path.isdir(directory_path):
-            log_and_emit_message('error', f"Diretório '{directory_path}' não é válido ou acessível.", force_emit=True)
-            socketio.emit('collection_complete', {'status': 'error', 'message': 'Diretório inválido.'})
+    def remember(self, source_path, source_key, destination_path, digest):
+        """Grava o hash no cache para o destino e, se não mudou durante a cópia, para a origem."""
+        if self.hash_cache is None:
             return
+        self.hash_cache.put(self.cache_key(destination_path), digest)
+        if source_key is not None and self.cache_key(source_path) == source_key:
+            self.hash_cache.put(source_key, digest)
 
-        file_info, inaccessible_files = get_file_info_robust(directory_path)
+    def close(self):
+        if self.hash_cache is not None:
+            self.hash_cache.close()
 
-        session_id = str(uuid.uuid4())
-        filename = f"collected_info_{collection_type}_{session_id}.json"
-        filepath = os.path.join(INFO_DIR, filename)
+def _report_copy_progress(bytes_count):
+    state = job_state()
+    with state_lock:
+        state['bytes_copied'] += bytes_count
+    update_and_emit_status()
 
-        report_data = {
-            "session_id": session_id,
-            "collection_type": collection_type,
-            "base_directory": directory_path,
-            "timestamp": datetime.now().isoformat(),
-            "total_files_scanned": len(file_info),
-            "inaccessible_files_count": len(inaccessible_files),
-            "inaccessible_files_details": inaccessible_files,
-            "files": file_info
-        }
+def copy_chunk_size():
+    """
+    Tamanho do bloco da cópia: com limite de banda, blocos de ~1/4 s da taxa
+    (mínimo de 64 KiB) para que o limite valha de forma contínua e não em rajadas.
+    """
+    scheduler = current_job().copy_scheduler
+    rate = scheduler.bytes_bucket.rate if scheduler is not None else None
+    if not rate:
+        return COPY_CHUNK_SIZE
+    return int(max(64 * 1024, min(COPY_CHUNK_SIZE, rate / 4)))
+
+def _on_copy_chunk(bytes_count):
+    """Relata um bloco copiado e aplica o limite de bytes/s do agendador ativo."""
+    _report_copy_progress(bytes_count)
+    scheduler = current_job().copy_scheduler
+    if scheduler is not None:
+        scheduler.on_bytes(bytes_count)
+
+def _delta_applicable(source_path, destination_path):
+    """A cópia delta só compensa quando os dois arquivos existem e não são pequenos."""
+    try:
+        return os.path.getsize(destination_path) >= DELTA_MIN_FILE_SIZE and os.path.getsize(source_path) >= DELTA_MIN_FILE_SIZE
+    except OSError:
+        return False
+
+def copy_single_file(source_base_dir, destination_base_dir, relative_path, journal=None, delta=False, verification=None):
+    """
+    Copia um arquivo (dados e metadados) da origem para o destino, criando os
+    diretórios necessários. Retorna (sucesso, registro para o relatório de cópia).
+    Com um diário, o arquivo concluído é registrado nele; arquivos a partir de
+    COPY_CHECKPOINT_MIN_SIZE também registram offsets, são mantidos parciais ao
+    serem interrompidos e retomados do último offset registrado.
+    Com delta, um destino já existente é atualizado por copy_file_delta e o
+    registro informa os bytes economizados. Com verification (CopyVerification),
+    o hash dos dados copiados é calculado, conferido e gravado no registro.
+    """
+    source_file_path = os.path.join(source_base_dir, relative_path)
+    destination_file_path = os.path.join(destination_base_dir, relative_path)
 
+    start_offset = 0
+    on_checkpoint = None
+    if journal is not None:
+        if journal.offsets.get(relative_path):
+            start_offset = verify_partial_copy(source_file_path, destination_file_path, journal.offsets[relative_path])
+            if start_offset:
+                _report_copy_progress(start_offset)
+                log_and_emit_message('info', f"Retomando {relative_path} a partir de {start_offset} bytes.", force_emit=True)
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=4, ensure_ascii=False)
-            log_and_emit_message('success', f"Coleta concluída! Relatório salvo como: {filename}", force_emit=True)
-            socketio.emit('collection_complete', {
-                'status': 'success',
-                'type': collection_type,
-                'path': directory_path,
-                'filename': filename
-            })
-        except IOError as e:
-            log_and_emit_message('error', f"Erro ao salvar o arquivo JSON: {e}", force_emit=True)
-            socketio.emit('collection_complete', {'status': 'error', 'message': f'Erro ao salvar arquivo: {e}'})
+            checkpointed = os.path.getsize(source_file_path) >= COPY_CHECKPOINT_MIN_SIZE
+        except OSError:
+            checkpointed = False # A falha aparece na cópia, abaixo
+        if checkpointed:
+            on_checkpoint = lambda offset: journal.record_offset(relative_path, offset)
+    use_delta = delta and not start_offset and _delta_applicable(source_file_path, destination_file_path)
 
+    copy_status = "Sucesso"
+    error_message = ""
+    try:
+        # Garante que o diretório de destino exista
+        os.makedirs(os.path.dirname(destination_file_path), exist_ok=True)
+        entry = {
+            'relative_path': relative_path,
+            'source_path': source_file_path,
+            'destination_path': destination_file_path,
+            'status': 'Copiado com sucesso'
+        }
+        digest = source_key = None
+        if verification is not None:
+            digest = verification.new_digest()
+            source_key = verification.cache_key(source_file_path)
+        if use_delta:
+            bytes_saved, bytes_literal = copy_file_delta(source_file_path, destination_file_path, _on_copy_chunk, digest=digest)
+            entry.update(copy_method='delta', bytes_saved=bytes_saved, bytes_transferred=bytes_literal)
+        else:
+            entry['copy_method'] = copy_file_chunked(source_file_path, destination_file_path, _on_copy_chunk, # Copia dados e metadados
+                                                     start_offset=start_offset, on_checkpoint=on_checkpoint, keep_partial=on_checkpoint is not None,
+                                                     digest=digest, chunk_size=copy_chunk_size())
+        if verification is not None:
+            try:
+                verification.check(destination_file_path, digest.hexdigest())
+            except CopyVerificationError:
+                # Com os metadados já copiados, o destino corrompido passaria por íntegro numa nova comparação
+                os.remove(destination_file_path)
+                raise
+            verification.remember(source_file_path, source_key, destination_file_path, digest.hexdigest())
+            entry.update(hash_algorithm=verification.algorithm, hash=digest.hexdigest(), verification=verification.mode)
+        if journal is not None:
+            journal.record_done(relative_path)
+        log_and_emit_message('debug', f"Copiado: {source_file_path} para {destination_file_path}")
+        entry['timestamp'] = datetime.now().isoformat()
+        return True, entry
+    except FileNotFoundError:
+        copy_status = "Falha: Arquivo de origem não encontrado"
+        error_message = f"Origem não encontrada: {source_file_path}"
+        log_and_emit_message('warning', f"Falha na cópia: {error_message}", force_emit=True)
+    except PermissionError:
+        copy_status = "Falha: Permissão negada"
+        error_message = f"Permissão negada ao copiar {source_file_path} para {destination_file_path}"
+        log_and_emit_message('error', f"Falha na cópia: {error_message}", force_emit=True)
+    except CopyInterrupted as e:
+        copy_status = "Falha: Cópia interrompida"
+        if use_delta:
+            error_message = f"Cópia delta interrompida; o destino não foi alterado: {destination_file_path}"
+        elif on_checkpoint is not None:
+            error_message = f"Cópia interrompida em {e.offset} bytes; o arquivo parcial foi mantido para retomada: {destination_file_path}"
+        else:
+            error_message = f"Cópia interrompida antes do fim; o arquivo parcial foi removido: {destination_file_path}"
+        log_and_emit_message('info', f"Cópia interrompida: {relative_path}", force_emit=True)
+    except CopyVerificationError as e:
+        copy_status = "Falha: Hash divergente"
+        error_message = f"O destino não confere com a origem ({e}); o arquivo copiado foi removido: {destination_file_path}"
+        log_and_emit_message('error', f"Falha na verificação de {relative_path}: {e}", force_emit=True)
+    except shutil.SameFileError:
+        copy_status = "Falha: Arquivos são o mesmo"
+        error_message = f"Origem e destino são o mesmo arquivo: {source_file_path}"
+        log_and_emit_message('warning', f"Falha na cópia: {error_message}", force_emit=True)
     except Exception as e:
-        log_and_emit_message('error', f"Erro crítico durante a coleta: {e}", force_emit=True)
-        socketio.emit('collection_complete', {'status': 'error', 'message': f'Erro inesperado: {e}'})
-    finally:
-        with state_lock:
-            operation_state = initial_operation_state.copy() # Reseta o estado
-            operation_state['all_collected_jsons'] = get_available_info_jsons() # Atualiza as listas
-            operation_state['all_comparison_jsons'] = get_available_comparison_jsons()
-            operation_state['all_copy_reports'] = get_available_copy_reports()
-        update_and_emit_status("Operação de coleta finalizada.", force_emit=True)
-        socketio.emit('operation_ended')
+        copy_status = "Falha: Erro inesperado"
+        error_message = f"Erro inesperado: {str(e)}"
+        log_and_emit_message('error', f"Falha inesperada na cópia de {source_file_path}: {e}", force_emit=True)
+
+    return False, {
+        'relative_path': relative_path,
+        'source_path': source_file_path,
+        'destination_path': destination_file_path,
+        'status': copy_status,
+        'error_message': error_message,
+        'timestamp': datetime.now().isoformat()
+    }
 
-def perform_comparison_task(json_origem_filename, json_destino_filename):
-    """Executa a tarefa de comparação em uma thread separada."""
+def relocate_moved_file(source_base_dir, destination_base_dir, file_detail, move_mode, journal=None, delta=False, verification=None):
+    """
+    Leva um arquivo 'Movido no destino' ao novo caminho sem copiá-lo da origem:
+    com move_mode 'rename', o arquivo do caminho antigo no destino é movido;
+    com 'link', ganha um hard link no novo caminho (o antigo é mantido). Antes,
+    confere se o arquivo antigo ainda tem o tamanho e o mtime do relatório e se
+    o novo caminho está livre; pares que não foram casados por conteúdo (ver
+    MOVE_CONFIRMED_MATCHES) têm o hash dos dois lados comparado. Se não der
+    (arquivo alterado, conteúdo diferente, volumes diferentes, hard links não
+    suportados), copia da origem com copy_single_file.
+    Retorna (sucesso, registro para o relatório de cópia).
+    """
+    relative_path = file_detail['relative_path']
+    old_path = os.path.join(destination_base_dir, file_detail['moved_from'])
+    destination_file_path = os.path.join(destination_base_dir, relative_path)
+    confirmed_hash = None
     try:
-        with state_lock:
-            global operation_state
-            operation_state = initial_operation_state.copy()
-            operation_state['running'] = True
-            operation_state['current_stage'] = 'comparing'
-        
-        update_and_emit_status(f"Carregando dados para comparação...", force_emit=True)
-        log_and_emit_message('info', f"Iniciando comparação entre '{json_origem_filename}' e '{json_destino_filename}'", force_emit=True)
+        stat_info = os.stat(old_path)
+        if stat_info.st_size != file_detail.get('size_destino') or format_mtime(stat_info.st_mtime) != file_detail.get('mtime_destino'):
+            raise OSError(errno.ESTALE, "o arquivo mudou desde a comparação", old_path)
+        if os.path.lexists(destination_file_path):
+            raise FileExistsError(errno.EEXIST, "o novo caminho já existe", destination_file_path)
+        if file_detail.get('match') not in MOVE_CONFIRMED_MATCHES:
+            # Mesmo tamanho e mtime não garantem o mesmo conteúdo (ex.: arquivos extraídos com datas fixas)
+            algorithm = verification.algorithm if verification is not None else MOVE_CONFIRM_HASH_ALGORITHM
+            hash_origem, _ = hash_file(os.path.join(source_base_dir, relative_path), algorithm)
+            hash_destino, _ = hash_file(old_path, algorithm)
+            if hash_origem is None or hash_origem != hash_destino:
+                raise OSError(errno.ESTALE, "o conteúdo não confere com o da origem", old_path)
+            confirmed_hash = (algorithm, hash_origem)
+        os.makedirs(os.path.dirname(destination_file_path), exist_ok=True)
+        if move_mode == 'rename':
+            os.rename(old_path, destination_file_path)
+        else:
+            os.link(old_path, destination_file_path)
+    except OSError as e:
+        log_and_emit_message('warning', f"Não foi possível {'mover' if move_mode == 'rename' else 'vincular'} {file_detail['moved_from']} "
+                                        f"para {relative_path} no destino ({e}); o arquivo será copiado da origem.", force_emit=True)
+        return copy_single_file(source_base_dir, destination_base_dir, relative_path, journal, delta, verification)
 
-        path_origem = os.path.join(INFO_DIR, secure_filename(json_origem_filename))
-        path_destino = os.path.join(INFO_DIR, secure_filename(json_destino_filename))
+    if journal is not None:
+        journal.record_done(relative_path)
+    log_and_emit_message('debug', f"{'Movido' if move_mode == 'rename' else 'Vinculado'} no destino: {old_path} para {destination_file_path}")
+    entry = {
+        'relative_path': relative_path,
+        'source_path': old_path,
+        'destination_path': destination_file_path,
+        'status': 'Movido no destino' if move_mode == 'rename' else 'Vinculado no destino',
+        'copy_method': move_mode,
+        'match': file_detail.get('match'),
+        'timestamp': datetime.now().isoformat()
+    }
+    if confirmed_hash is not None:
+        entry.update(hash_algorithm=confirmed_hash[0], hash=confirmed_hash[1])
+    return True, entry
 
-        data_origem = {}
-        data_destino = {}
+class TokenBucket:
+    """
+    Balde de fichas que limita uma taxa (bytes/s ou arquivos/s). consume()
+    debita a quantidade e, se o saldo ficar negativo, espera até a taxa repô-lo;
+    assim blocos maiores que o balde também passam, respeitando a média. O
+    saldo acumula no máximo burst_seconds de taxa. rate None desativa o limite;
+    a taxa pode ser alterada durante o uso. Pode ser usado por várias threads.
+    """
 
-        try:
-            with open(path_origem, 'r', encoding='utf-8') as f:
-                data_origem = json.load(f)
-            with open(path_destino, 'r', encoding='utf-8') as f:
-                data_destino = json.load(f)
-            log_and_emit_message('info', "Dados de origem e destino carregados com sucesso.", force_emit=True)
-        except Exception as e:
-            log_and_emit_message('error', f"Erro ao carregar arquivos JSON para comparação: {e}", force_emit=True)
-            return
+    def __init__(self, rate=None, burst_seconds=1.0):
+        self.rate = rate or None
+        self.burst_seconds = burst_seconds
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
 
-        files_origem = data_origem.get('files', {})
-        files_destino = data_destino.get('files', {})
-        dir_origem = data_origem.get('base_directory', 'Desconhecido')
-        dir_destino = data_destino.get('base_directory', 'Desconhecido')
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate:
+            self._tokens = min(self.rate * self.burst_seconds, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
 
-        missing_in_destino = []
-        different_files = []
-        found_in_both = []
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill()
+            self.rate = rate or None
+            self._tokens = min(self._tokens, 0.0)
 
-        total_files_origem = len(files_origem)
-        with state_lock:
-            operation_state['total_files_estimated'] = total_files_origem
-            operation_state['files_processed'] = 0
-        update_and_emit_status("Comparando arquivos...", force_emit=True)
+    def consume(self, amount):
+        with self._lock:
+            if not self.rate:
+                return
+            self._refill()
+            self._tokens -= amount
+        while not stop_requested():
+            with self._lock:
+                if not self.rate:
+                    return
+                self._refill()
+                if self._tokens >= 0:
+                    return
+                wait_seconds = -self._tokens / self.rate
+            time.sleep(min(wait_seconds, COPY_SCHEDULER_POLL_INTERVAL)) # Acorda periodicamente para ver parada e novas taxas
 
-        for i, (path, info_origem) in enumerate(files_origem.items()):
-            if not check_operation_control():
-                log_and_emit_message('info', "Interrupção detectada durante a comparação de arquivos.", force_emit=True)
-                break
-            
-            with state_lock:
-                operation_state['files_processed'] = i + 1
-                operation_state['current_directory'] = os.path.dirname(path) if os.path.dirname(path) else '/'
-            update_and_emit_status()
+class CopyScheduler:
+    """
+    Controla o ritmo da cópia: limites de bytes/s e de arquivos/s (TokenBucket)
+    e o número de cópias simultâneas, fixo ou adaptativo. No modo adaptativo, a
+    cada COPY_ADAPTIVE_INTERVAL segundos a vazão medida é comparada à do
+    intervalo anterior (subida de encosta): enquanto melhora, a concorrência
+    continua mudando na mesma direção; se piora, a direção se inverte; se fica
+    estável mas a latência por arquivo cresce, a concorrência é reduzida. Os
+    limites podem ser alterados durante a cópia (evento 'set_copy_limits').
+    """
 
-            if path not in files_destino:
-                missing_in_destino.append({
-                    'relative_path': path,
-                    'status': 'Não encontrado no destino',
-                    'size_origem': info_origem.get('size'),
-                    'mtime_origem': datetime.fromtimestamp(info_origem.get('mtime', 0)).isoformat() if info_origem.get('mtime') else None
-                })
-            else:
-                info_destino = files_destino[path]
-                if info_origem.get('size') != info_destino.get('size') or \
-                   info_origem.get('mtime') != info_destino.get('mtime'): # Apenas mtime, MD5 é custoso
-                    different_files.append({
-                        'relative_path': path,
-                        'status': 'Tamanho ou data de modificação diferente',
-                        'size_origem': info_origem.get('size'),
-                        'mtime_origem': datetime.fromtimestamp(info_origem.get('mtime', 0)).isoformat() if info_origem.get('mtime') else None,
-                        'size_destino': info_destino.get('size'),
-                        'mtime_destino': datetime.fromtimestamp(info_destino.get('mtime', 0)).isoformat() if info_destino.get('mtime') else None
-                    })
-                else:
-                    found_in_both.append(path)
+    def __init__(self, workers, bytes_per_second=None, files_per_second=None, adaptive=False, max_workers=MAX_COPY_WORKERS):
+        self.max_workers = max_workers
+        self.workers = max(1, min(workers, max_workers))
+        self.adaptive = adaptive
+        self.bytes_bucket = TokenBucket(bytes_per_second)
+        self.files_bucket = TokenBucket(files_per_second)
+        self._lock = threading.Lock()
+        self._direction = 1
+        self._last_throughput = None
+        self._last_latency = None
+        self._reset_interval()
 
-        session_id = str(uuid.uuid4())
-        json_filename = f"comparison_result_{session_id}.json"
-        json_filepath = os.path.join(RESULTS_DIR, json_filename)
-        csv_filename = f"not_copied_comparison_{session_id}.csv"
-        csv_filepath = os.path.join(RESULTS_DIR, csv_filename)
+    def _reset_interval(self):
+        self._interval_start = time.monotonic()
+        self._interval_bytes = 0
+        self._interval_files = 0
+        self._interval_latency = 0.0
 
-        all_not_copied = missing_in_destino + different_files
+    def on_bytes(self, bytes_count):
+        with self._lock:
+            self._interval_bytes += bytes_count
+        self.bytes_bucket.consume(bytes_count)
 
-        comparison_result = {
-            "session_id": session_id,
-            "timestamp": datetime.now().isoformat(),
-            "json_origem_filename": json_origem_filename,
-            "json_destino_filename": json_destino_filename,
-            "dir_origem": dir_origem,
-            "dir_destino": dir_destino,
-            "total_files_origem": total_files_origem,
-            "total_files_destino": len(files_destino),
-            "files_found_in_both": len(found_in_both),
-            "files_missing_in_destino": len(missing_in_destino),
-            "files_different": len(different_files),
-            "not_copied_files_count": len(all_not_copied),
-            "not_copied_files_details": all_not_copied,
-            "summary_by_type": {
-                "origem_missing_in_destino": len(missing_in_destino),
-                "origem_different_in_destino": len(different_files)
-            }
-        }
+    def before_file(self):
+        self.files_bucket.consume(1)
 
-        try:
-            with open(json_filepath, 'w', encoding='utf-8') as f:
-                json.dump(comparison_result, f, indent=4, ensure_ascii=False)
-            log_and_emit_message('success', f"Comparação concluída! Relatório JSON salvo como: {json_filename}", force_emit=True)
+    def on_file_done(self, latency):
+        with self._lock:
+            self._interval_files += 1
+            self._interval_latency += latency
 
-            # Salva também um CSV dos arquivos não copiados
-            if all_not_copied:
-                with open(csv_filepath, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["Caminho Relativo", "Status", "Tamanho Origem", "Data Mod. Origem", "Tamanho Destino", "Data Mod. Destino"])
-                    for item in all_not_copied:
-                        writer.writerow([
-                            item.get('relative_path', 'N/A'),
-                            item.get('status', 'N/A'),
-                            item.get('size_origem', 'N/A'),
-                            item.get('mtime_origem', 'N/A'),
-                            item.get('size_destino', 'N/A'),
-                            item.get('mtime_destino', 'N/A')
-                        ])
-                log_and_emit_message('info', f"CSV de arquivos não copiados salvo como: {csv_filename}", force_emit=True)
+    def concurrency(self):
+        """Número de cópias simultâneas permitido agora (reavaliado no modo adaptativo)."""
+        if self.adaptive:
+            self._adapt()
+        return self.workers
+
+    def _adapt(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._interval_start
+            if elapsed < COPY_ADAPTIVE_INTERVAL or self._interval_files == 0:
+                return
+            throughput = self._interval_bytes / elapsed
+            latency = self._interval_latency / self._interval_files
+            previous_workers = self.workers
+            if self._last_throughput is None or throughput > self._last_throughput * 1.05:
+                step = self._direction
+            elif throughput < self._last_throughput * 0.95:
+                self._direction = -self._direction
+                step = self._direction
+            elif latency > self._last_latency * 1.2:
+                self._direction = -1
+                step = -1
             else:
-                log_and_emit_message('info', "Todos os arquivos foram encontrados ou são idênticos. Nenhum CSV de não copiados gerado.", force_emit=True)
+                step = 0
+            self.workers = max(1, min(self.max_workers, self.workers + step))
+            self._last_throughput = throughput
+            self._last_latency = latency
+            self._reset_interval()
+        if self.workers != previous_workers:
+            log_and_emit_message('info', f"Concorrência adaptativa: {previous_workers} -> {self.workers} cópias simultâneas "
+                                         f"({format_throughput(throughput, 1)}, {latency:.2f}s por arquivo).")
+            with state_lock:
+                job_state()['copy_limits'] = self.describe()
 
+    def update(self, limits):
+        """Aplica os limites presentes em limits (bytes_per_second, files_per_second, workers, adaptive)."""
+        if 'bytes_per_second' in limits:
+            self.bytes_bucket.set_rate(limits['bytes_per_second'])
+        if 'files_per_second' in limits:
+            self.files_bucket.set_rate(limits['files_per_second'])
+        with self._lock:
+            if 'workers' in limits:
+                self.workers = max(1, min(limits['workers'], self.max_workers))
+            if 'adaptive' in limits:
+                self.adaptive = limits['adaptive']
+                self._last_throughput = None
+                self._reset_interval()
 
-            socketio.emit('comparison_complete', {
-                'status': 'success',
-                'json_filename': json_filename,
-                'csv_filename': csv_filename if all_not_copied else None
-            })
+    def describe(self):
+        return {
+            'workers': self.workers,
+            'adaptive': self.adaptive,
+            'bytes_per_second': self.bytes_bucket.rate,
+            'files_per_second': self.files_bucket.rate
+        }
 
-        except IOError as e:
-            log_and_emit_message('error', f"Erro ao salvar arquivo de comparação JSON ou CSV: {e}", force_emit=True)
-            socketio.emit('comparison_complete', {'status': 'error', 'message': f'Erro ao salvar arquivo: {e}'})
+def parse_copy_limits(data):
+    """
+    Lê os limites do agendador de cópia de um dicionário (requisição ou evento).
+    Apenas as chaves presentes são retornadas; 0 ou vazio desativa um limite.
+    Levanta ValueError se algum valor for inválido (negativo, NaN ou infinito).
+    """
+    limits = {}
+    for key in ('bytes_per_second', 'files_per_second'):
+        if key in data:
+            value = float(data[key] or 0)
+            if not math.isfinite(value) or value < 0: # float() aceita 'nan' e 'inf'
+                raise ValueError(key)
+            limits[key] = value or None
+    if data.get('workers') not in (None, ''):
+        workers = data['workers']
+        if isinstance(workers, float) and not math.isfinite(workers): # int() levantaria OverflowError (ex.: 1e999 no JSON)
+            raise ValueError('workers')
+        limits['workers'] = int(workers)
+    if 'adaptive' in data:
+        limits['adaptive'] = bool(data['adaptive'])
+    return limits
 
-    except Exception as e:
-        log_and_emit_message('error', f"Erro crítico durante a comparação: {e}", force_emit=True)
-        socketio.emit('comparison_complete', {'status': 'error', 'message': f'Erro inesperado: {e}'})
-    finally:
-        with state_lock:
-            operation_state = initial_operation_state.copy()
-            operation_state['all_collected_jsons'] = get_available_info_jsons()
-            operation_state['all_comparison_jsons'] = get_available_comparison_jsons()
-            operation_state['all_copy_reports'] = get_available_copy_reports()
-        update_and_emit_status("Operação de comparação finalizada.", force_emit=True)
-        socketio.emit('operation_ended')
+def iter_copy_results(source_base_dir, destination_base_dir, files_to_copy, scheduler, journal=None, delta=False, verification=None,
+                      move_mode='copy'):
+    """
+    Copia os arquivos de files_to_copy e gera (sucesso, registro) de cada um.
+    Arquivos 'Movido no destino' são copiados da origem ou, conforme move_mode,
+    movidos/vinculados dentro do destino (ver relocate_moved_file).
+    As cópias rodam em um pool de threads; o número de cópias simultâneas e o
+    ritmo de início de arquivos vêm do scheduler (CopyScheduler) e podem mudar
+    durante a cópia. Os resultados saem na ordem de conclusão. Pausa e parada
+    são verificadas antes de iniciar cada cópia; ao parar, as cópias já
+    iniciadas terminam e são relatadas.
+    """
+    pending_files = iter(files_to_copy)
+    copy_in_job = job_bound(copy_single_file)
+    relocate_in_job = job_bound(relocate_moved_file)
+    in_flight = {} # future -> instante de início, para medir a latência por arquivo
+    stopped = False
+    with ThreadPoolExecutor(max_workers=scheduler.max_workers, thread_name_prefix='copy') as executor:
+        while True:
+            while not stopped and len(in_flight) < scheduler.concurrency():
+                file_detail = next(pending_files, None)
+                if file_detail is None:
+                    break
+                scheduler.before_file()
+                if not check_operation_control():
+                    log_and_emit_message('info', "Interrupção detectada durante a cópia de arquivos.", force_emit=True)
+                    stopped = True
+                    break
+                relative_path = file_detail['relative_path']
+                with state_lock:
+                    job_state()['current_directory'] = os.path.dirname(relative_path) if os.path.dirname(relative_path) else '/'
+                update_and_emit_status(f"Copiando: {relative_path}")
+                if move_mode != 'copy' and file_detail['status'] == 'Movido no destino':
+                    future = executor.submit(relocate_in_job, source_base_dir, destination_base_dir, file_detail, move_mode,
+                                             journal, delta, verification)
+                else:
+                    future = executor.submit(copy_in_job, source_base_dir, destination_base_dir, relative_path, journal, delta, verification)
+                in_flight[future] = time.monotonic()
+            if not in_flight:
+                break
+            # Com timeout, mudanças de concorrência feitas durante a cópia valem sem esperar um arquivo terminar
+            done, _ = wait(in_flight, timeout=COPY_SCHEDULER_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                scheduler.on_file_done(time.monotonic() - in_flight.pop(future))
+                yield future.result()
 
-def perform_copy_task(comparison_json_filename):
+def perform_copy_task(comparison_json_filename, workers=DEFAULT_COPY_WORKERS, resume=False, delta=False,
+                      verify_mode='none', verify_algorithm='md5', bytes_per_second=None, files_per_second=None,
+                      adaptive=False, move_mode='copy', skip_fingerprint_matches=False):
     """
     Executa a tarefa de cópia de arquivos ausentes em uma thread separada.
-    Gera um relatório de sucesso/falha da cópia.
+    Gera um relatório de sucesso/falha da cópia. Com workers > 1, vários
+    arquivos são copiados ao mesmo tempo. O progresso é registrado em um
+    diário (CopyJournal); com resume, os arquivos já concluídos segundo o
+    diário são ignorados e os parciais continuam de onde pararam. Com delta,
+    arquivos que já existem no destino recebem apenas os blocos alterados.
+    Com verify_mode 'reread' ou 'trust', cada cópia é verificada por hash
+    (ver CopyVerification). bytes_per_second e files_per_second limitam o
+    ritmo da cópia e, com adaptive, o número de cópias simultâneas se ajusta
+    à vazão medida (ver CopyScheduler); os limites podem mudar durante a
+    cópia pelo evento 'set_copy_limits'. Arquivos movidos no destino são
+    tratados conforme move_mode (ver COPY_MOVE_MODES). Com
+    skip_fingerprint_matches, arquivos diferentes cuja impressão digital
+    coincidiu na comparação (verificação 'quick') não são copiados.
     """
+    journal = None
+    verification = None
     try:
+        state = job_state()
         with state_lock:
-            global operation_state
-            operation_state = initial_operation_state.copy()
-            operation_state['running'] = True
-            operation_state['current_stage'] = 'copy_files'
+            state['current_stage'] = 'copy_files'
             
         update_and_emit_status(f"Carregando relatório de comparação: {comparison_json_filename}", force_emit=True)
         log_and_emit_message('info', f"Iniciando cópia com base em: {comparison_json_filename}", force_emit=True)
@@ -474,11 +4332,12 @@ def perform_copy_task(comparison_json_filename):
         
         comparison_data = {}
         try:
-            with open(comparison_filepath, 'r', encoding='utf-8') as f:
+            with open_storage_file(comparison_filepath) as f:
                 comparison_data = json.load(f)
             log_and_emit_message('info', f"Relatório de comparação '{comparison_json_filename}' carregado.", force_emit=True)
         except Exception as e:
             log_and_emit_message('error', f"Erro ao carregar relatório de comparação '{comparison_json_filename}': {e}", force_emit=True)
+            mark_job_failed()
             return
 
         not_copied_files = comparison_data.get('not_copied_files_details', [])
@@ -487,94 +4346,107 @@ def perform_copy_task(comparison_json_filename):
 
         if not source_base_dir or not destination_base_dir:
             log_and_emit_message('error', "Caminhos de origem ou destino não encontrados no relatório de comparação.", force_emit=True)
+            mark_job_failed()
             return
         
         if not os.path.isdir(source_base_dir):
             log_and_emit_message('error', f"Diretório de origem '{source_base_dir}' do relatório não é válido ou acessível.", force_emit=True)
+            mark_job_failed()
             return
 
         if not os.path.isdir(destination_base_dir):
             log_and_emit_message('error', f"Diretório de destino '{destination_base_dir}' do relatório não é válido ou acessível.", force_emit=True)
+            mark_job_failed()
             return
 
         # Filtra apenas os arquivos que 'Não encontrado no destino' para cópia.
         # Ajustado para considerar também "Tamanho ou data de modificação diferente" para cópia
+        # e "Movido no destino" (copiado da origem ou movido dentro do destino, conforme move_mode)
         files_to_copy = [
             f for f in not_copied_files 
-            if f['status'] == 'Não encontrado no destino' or f['status'] == 'Tamanho ou data de modificação diferente'
+            if f['status'] in ('Não encontrado no destino', 'Tamanho ou data de modificação diferente', 'Movido no destino')
         ]
+        files_skipped_by_fingerprint = 0
+        if skip_fingerprint_matches:
+            total_before = len(files_to_copy)
+            files_to_copy = [f for f in files_to_copy
+                             if not (f['status'] == 'Tamanho ou data de modificação diferente' and f.get('match') == 'fingerprint')]
+            files_skipped_by_fingerprint = total_before - len(files_to_copy)
+            log_and_emit_message('info', f"{files_skipped_by_fingerprint} arquivo(s) com impressão digital igual à do destino não serão copiados.", force_emit=True)
+        relocating = move_mode != 'copy'
+        files_moved = sum(1 for f in files_to_copy if f['status'] == 'Movido no destino')
+
+        journal_path = get_copy_journal_path(comparison_json_filename)
+        try:
+            journal = CopyJournal(journal_path, resume=resume)
+        except OSError as e:
+            log_and_emit_message('error', f"Erro ao abrir o diário de cópia '{os.path.basename(journal_path)}': {e}", force_emit=True)
+            mark_job_failed()
+            return
+        files_skipped = 0
+        if resume:
+            total_before = len(files_to_copy)
+            files_to_copy = [f for f in files_to_copy if f['relative_path'] not in journal.completed]
+            files_skipped = total_before - len(files_to_copy)
+            log_and_emit_message('info', f"Retomando cópia: {files_skipped} arquivos já concluídos segundo o diário serão ignorados.", force_emit=True)
 
         with state_lock:
-            operation_state['total_files_estimated'] = len(files_to_copy)
-            operation_state['files_processed'] = 0
-        log_and_emit_message('info', f"Total de arquivos a tentar copiar: {operation_state['total_files_estimated']}", force_emit=True)
+            state['total_files_estimated'] = len(files_to_copy)
+            state['files_processed'] = 0
+            state['total_bytes'] = sum(f.get('size_origem') or 0 for f in files_to_copy
+                                       if not (relocating and f['status'] == 'Movido no destino'))
+            state['bytes_copied'] = 0
+        log_and_emit_message('info', f"Total de arquivos a tentar copiar: {state['total_files_estimated']}", force_emit=True)
         update_and_emit_status("Iniciando cópia dos arquivos...", force_emit=True)
 
         copied_success = []
         copied_failed = []
 
-        for file_detail in files_to_copy:
-            if not check_operation_control(): 
-                log_and_emit_message('info', "Interrupção detectada durante a cópia de arquivos.", force_emit=True)
-                break
-
-            relative_path = file_detail['relative_path']
-            source_file_path = os.path.join(source_base_dir, relative_path)
-            destination_file_path = os.path.join(destination_base_dir, relative_path)
-            
-            # Garante que o diretório de destino exista
-            os.makedirs(os.path.dirname(destination_file_path), exist_ok=True)
-
-            with state_lock:
-                operation_state['current_directory'] = os.path.dirname(relative_path) if os.path.dirname(relative_path) else '/'
-            update_and_emit_status(f"Copiando: {relative_path}", force_emit=True)
-
-            copy_status = "Sucesso"
-            error_message = ""
+        scheduler = CopyScheduler(workers, bytes_per_second, files_per_second, adaptive)
+        with state_lock:
+            current_job().copy_scheduler = scheduler
+            state['copy_limits'] = scheduler.describe()
+        if workers > 1 or adaptive:
+            log_and_emit_message('info', f"Cópia paralela com {workers} threads{' (concorrência adaptativa)' if adaptive else ''}.", force_emit=True)
+        if bytes_per_second or files_per_second:
+            log_and_emit_message('info', f"Cópia limitada a {format_throughput(bytes_per_second, 1) if bytes_per_second else 'sem limite de bytes'}"
+                                         f" e {f'{files_per_second:g} arquivos/s' if files_per_second else 'sem limite de arquivos'}.", force_emit=True)
+        if delta:
+            log_and_emit_message('info', "Cópia delta ativada para arquivos que já existem no destino.", force_emit=True)
+        if files_moved and relocating:
+            log_and_emit_message('info', f"{files_moved} arquivo(s) movido(s) no destino serão "
+                                         f"{'movidos' if move_mode == 'rename' else 'vinculados'} localmente, sem cópia da origem.", force_emit=True)
+        if verify_mode != 'none':
+            hash_cache = None
             try:
-                shutil.copy2(source_file_path, destination_file_path) # Copia dados e metadados
-                copied_success.append({
-                    'relative_path': relative_path,
-                    'source_path': source_file_path,
-                    'destination_path': destination_file_path,
-                    'status': 'Copiado com sucesso',
-                    'timestamp': datetime.now().isoformat()
-                })
-                log_and_emit_message('debug', f"Copiado: {source_file_path} para {destination_file_path}")
-            except FileNotFoundError:
-                copy_status = "Falha: Arquivo de origem não encontrado"
-                error_message = f"Origem não encontrada: {source_file_path}"
-                log_and_emit_message('warning', f"Falha na cópia: {error_message}", force_emit=True)
-            except PermissionError:
-                copy_status = "Falha: Permissão negada"
-                error_message = f"Permissão negada ao copiar {source_file_path} para {destination_file_path}"
-                log_and_emit_message('error', f"Falha na cópia: {error_message}", force_emit=True)
-            except shutil.SameFileError:
-                copy_status = "Falha: Arquivos são o mesmo"
-                error_message = f"Origem e destino são o mesmo arquivo: {source_file_path}"
-                log_and_emit_message('warning', f"Falha na cópia: {error_message}", force_emit=True)
-            except Exception as e:
-                copy_status = "Falha: Erro inesperado"
-                error_message = f"Erro inesperado: {str(e)}"
-                log_and_emit_message('error', f"Falha inesperada na cópia de {source_file_path}: {e}", force_emit=True)
-            
-            if copy_status.startswith("Falha"):
-                copied_failed.append({
-                    'relative_path': relative_path,
-                    'source_path': source_file_path,
-                    'destination_path': destination_file_path,
-                    'status': copy_status,
-                    'error_message': error_message,
-                    'timestamp': datetime.now().isoformat()
-                })
+                hash_cache = HashCache(os.path.join(INFO_DIR, HASH_CACHE_FILENAME))
+            except sqlite3.Error as e:
+                log_and_emit_message('warning', f"Cache de hashes indisponível; os hashes das cópias não serão reaproveitados: {e}", force_emit=True)
+            verification = CopyVerification(verify_mode, verify_algorithm, hash_cache)
+            log_and_emit_message('info', f"Cópias verificadas por hash {verify_algorithm} (modo '{verify_mode}').", force_emit=True)
+        for success, entry in iter_copy_results(source_base_dir, destination_base_dir, files_to_copy, scheduler, journal, delta, verification,
+                                                move_mode):
+            (copied_success if success else copied_failed).append(entry)
 
+            relative_path = entry['relative_path']
             with state_lock:
-                operation_state['files_processed'] += 1
+                state['files_processed'] += 1
+                state['current_directory'] = os.path.dirname(relative_path) if os.path.dirname(relative_path) else '/'
             update_and_emit_status()
 
+        if not copied_failed and not stop_requested():
+            # Cópia completa: não há o que retomar
+            journal.close()
+            journal = None
+            try:
+                os.remove(journal_path)
+            except OSError as e:
+                log_and_emit_message('warning', f"Não foi possível remover o diário de cópia '{os.path.basename(journal_path)}': {e}", force_emit=True)
+
         # --- Geração do Relatório de Cópia ---
         copy_report_session_id = str(uuid.uuid4())
-        copy_report_json_filename = f"copy_report_{copy_report_session_id}.json"
+        compression = get_compression_settings()
+        copy_report_json_filename = compressed_filename(f"copy_report_{copy_report_session_id}.json", compression)
         copy_report_filepath = os.path.join(RESULTS_DIR, copy_report_json_filename)
 
         report_data = {
@@ -583,6 +4455,22 @@ def perform_copy_task(comparison_json_filename):
             "source_base_directory": source_base_dir,
             "destination_base_directory": destination_base_dir,
             "total_files_attempted": len(files_to_copy),
+            "copy_workers": workers,
+            "copy_limits": {
+                "bytes_per_second": bytes_per_second,
+                "files_per_second": files_per_second,
+                "adaptive": adaptive,
+                "final": scheduler.describe()
+            },
+            "resumed": resume,
+            "files_skipped_from_journal": files_skipped,
+            "files_skipped_by_fingerprint": files_skipped_by_fingerprint,
+            "delta": delta,
+            "bytes_saved_by_delta": sum(entry.get('bytes_saved', 0) for entry in copied_success),
+            "move_mode": move_mode,
+            "files_relocated": sum(1 for entry in copied_success if entry.get('copy_method') in ('rename', 'link')),
+            "verify_mode": verify_mode,
+            "verify_algorithm": verify_algorithm if verify_mode != 'none' else None,
             "files_copied_successfully": len(copied_success),
             "files_failed_to_copy": len(copied_failed),
             "successful_copies": copied_success,
@@ -590,29 +4478,25 @@ def perform_copy_task(comparison_json_filename):
         }
 
         try:
-            with open(copy_report_filepath, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=4, ensure_ascii=False)
+            with open_storage_file(f"{copy_report_filepath}.tmp", 'w') as f:
+                write_report_json(f, report_data, REPORT_ROW_LISTS['copy_report_'])
+            os.replace(f"{copy_report_filepath}.tmp", copy_report_filepath)
+            catalog_report(RESULTS_DIR, copy_report_json_filename, report_data)
             log_and_emit_message('info', f"Relatório de cópia salvo como: {copy_report_json_filename}", force_emit=True)
         except IOError as e:
             log_and_emit_message('error', f"Erro ao salvar relatório de cópia {copy_report_json_filename}: {e}", force_emit=True)
+            mark_job_failed()
 
         # Opcional: Gerar um CSV para os arquivos que falharam
-        copy_failed_csv_filename = f"copy_failed_{copy_report_session_id}.csv"
+        copy_failed_csv_filename = compressed_filename(f"copy_failed_{copy_report_session_id}.csv", compression)
         copy_failed_csv_filepath = os.path.join(RESULTS_DIR, copy_failed_csv_filename)
         if copied_failed:
             try:
-                with open(copy_failed_csv_filepath, 'w', newline='', encoding='utf-8') as f:
+                with open_storage_file(f"{copy_failed_csv_filepath}.tmp", 'w', newline='') as f:
                     writer = csv.writer(f)
-                    writer.writerow(["Caminho Relativo", "Caminho Origem", "Caminho Destino", "Status", "Mensagem de Erro", "Timestamp"])
-                    for entry in copied_failed:
-                        writer.writerow([
-                            entry.get('relative_path', 'N/A'),
-                            entry.get('source_path', 'N/A'),
-                            entry.get('destination_path', 'N/A'),
-                            entry.get('status', 'N/A'),
-                            entry.get('error_message', 'N/A'),
-                            entry.get('timestamp', 'N/A')
-                        ])
+                    writer.writerow(COPY_REPORT_CSV_HEADER)
+                    writer.writerows(copy_csv_row(entry) for entry in copied_failed)
+                os.replace(f"{copy_failed_csv_filepath}.tmp", copy_failed_csv_filepath)
                 log_and_emit_message('info', f"CSV de cópias falhas salvo como: {copy_failed_csv_filename}", force_emit=True)
             except IOError as e:
                 log_and_emit_message('error', f"Erro ao salvar CSV de cópias falhas {copy_failed_csv_filename}: {e}", force_emit=True)
@@ -621,40 +4505,116 @@ def perform_copy_task(comparison_json_filename):
 
         log_and_emit_message('info', f"Cópia de arquivos concluída. {len(copied_success)} arquivos copiados, {len(copied_failed)} falhas.", force_emit=True)
         
-        socketio.emit('copy_complete', { 
+        emit_job_event('copy_complete', { 
             'copied_count': len(copied_success),
             'failed_count': len(copied_failed),
             'total_attempted': len(files_to_copy),
             'report_json_filename': copy_report_json_filename,
-            'report_csv_filename': copy_failed_csv_filename if copied_failed else None
+            'report_csv_filename': copy_failed_csv_filename if copied_failed else None,
+            'bytes_saved_by_delta': report_data['bytes_saved_by_delta']
         })
 
     except Exception as e:
         log_and_emit_message('error', f"Erro crítico durante a operação de cópia: {e}", force_emit=True)
+        mark_job_failed()
     finally:
-        with state_lock:
-            operation_state = initial_operation_state.copy() 
-            operation_state['all_collected_jsons'] = get_available_info_jsons() 
-            operation_state['all_comparison_jsons'] = get_available_comparison_jsons()
-            operation_state['all_copy_reports'] = get_available_copy_reports()
+        if journal is not None:
+            journal.close()
+        if verification is not None:
+            try:
+                verification.close()
+            except sqlite3.Error as e:
+                log_and_emit_message('warning', f"Erro ao gravar o cache de hashes: {e}", force_emit=True)
         update_and_emit_status("Operação de cópia finalizada.", force_emit=True)
-        socketio.emit('operation_ended') 
+
+def perform_snapshot_conversion_task(snapshot_filename):
+    """Converte um snapshot de coleta JSON/NDJSON para o formato binário em uma thread separada."""
+    try:
+        state = job_state()
+        with state_lock:
+            state['current_stage'] = 'converting'
+
+        update_and_emit_status(f"Convertendo snapshot: {snapshot_filename}", force_emit=True)
+        source_path = os.path.join(INFO_DIR, secure_filename(snapshot_filename))
+        binary_filename = f"{os.path.splitext(split_compression_suffix(secure_filename(snapshot_filename))[0])[0]}.snap"
+        binary_path = os.path.join(INFO_DIR, binary_filename)
+
+        metadata = convert_snapshot_to_binary(source_path, binary_path)
+        catalog_report(INFO_DIR, binary_filename, metadata)
+        log_and_emit_message('success', f"Snapshot convertido para binário: {binary_filename} ({metadata['total_files_scanned']} arquivos)", force_emit=True)
+        emit_job_event('conversion_complete', {'status': 'success', 'filename': binary_filename})
+
+    except Exception as e:
+        log_and_emit_message('error', f"Erro ao converter snapshot '{snapshot_filename}': {e}", force_emit=True)
+        emit_job_event('conversion_complete', {'status': 'error', 'message': f'Erro inesperado: {e}'})
+    finally:
+        update_and_emit_status("Conversão de snapshot finalizada.", force_emit=True)
 
 # --- Rotas Flask ---
 
+def job_submitted_response(job, message):
+    """Resposta das rotas que submetem tarefas, com o ID da tarefa criada."""
+    if job.status == 'queued':
+        message = f"Tarefa na fila: limite de {job_manager.max_concurrent} tarefas simultâneas atingido."
+    return jsonify({'status': 'success', 'message': message, 'job_id': job.id})
+
 @app.route('/', methods=['GET'])
 def index():
+    report_lists = get_report_lists()
+    job = job_manager.latest_job()
     with state_lock:
-        operation_state['all_collected_jsons'] = get_available_info_jsons()
-        operation_state['all_comparison_jsons'] = get_available_comparison_jsons() 
-        operation_state['all_copy_reports'] = get_available_copy_reports()
-        current_operation_state = operation_state.copy() 
-    
+        current_operation_state = job.describe(with_state=True) if job is not None else dict(initial_operation_state, job_id=None)
+        jobs = [job.describe() for job in job_manager.jobs.values()]
+
     return render_template('index.html', 
-                           collected_jsons=current_operation_state['all_collected_jsons'],
-                           comparison_jsons=current_operation_state['all_comparison_jsons'],
-                           copy_reports=current_operation_state['all_copy_reports'],
-                           operation_state=current_operation_state) 
+                           collected_jsons=report_lists['all_collected_jsons'],
+                           comparison_jsons=report_lists['all_comparison_jsons'],
+                           copy_reports=report_lists['all_copy_reports'],
+                           dedup_reports=report_lists['all_dedup_reports'],
+                           operation_state=current_operation_state,
+                           jobs=jobs,
+                           max_concurrent_jobs=job_manager.max_concurrent,
+                           compression=get_compression_settings(),
+                           compression_codecs=COMPRESSION_CODECS) 
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Lista as tarefas na fila, em execução e encerradas recentemente."""
+    return jsonify({'jobs': job_manager.list_jobs(), 'max_concurrent_jobs': job_manager.max_concurrent})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Tarefa não encontrada.'}), 404
+    with state_lock:
+        return jsonify(job.describe(with_state=True))
+
+@app.route('/jobs/settings', methods=['POST'])
+def update_job_settings():
+    data = request.json
+    try:
+        max_concurrent = int(data.get('max_concurrent_jobs'))
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Limite de tarefas simultâneas inválido.'}), 400
+    job_manager.set_max_concurrent(max_concurrent)
+    return jsonify({'status': 'success', 'message': f'Até {job_manager.max_concurrent} tarefas simultâneas.',
+                    'max_concurrent_jobs': job_manager.max_concurrent})
+
+@app.route('/storage/settings', methods=['GET', 'POST'])
+def storage_settings():
+    """Consulta ou altera a compressão (codec e nível) dos próximos snapshots e relatórios gravados."""
+    if request.method == 'GET':
+        return jsonify(dict(get_compression_settings(), status='success'))
+    data = request.json
+    codec = data.get('codec') or DEFAULT_COMPRESSION
+    try:
+        settings = set_compression_settings(codec, data.get('level') or DEFAULT_COMPRESSION_LEVEL)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Codec ou nível de compressão inválido.'}), 400
+    message = 'Novos snapshots e relatórios serão gravados sem compressão.' if settings['codec'] == 'none' else \
+        f"Novos snapshots e relatórios serão gravados com {settings['codec']} (nível {settings['level']})."
+    return jsonify(dict(settings, status='success', message=message))
 
 @app.route('/collect', methods=['POST'])
 def collect():
@@ -665,12 +4625,44 @@ def collect():
     if not directory_path or not collection_type:
         return jsonify({'status': 'error', 'message': 'Caminho do diretório ou tipo de coleta não fornecidos.'}), 400
 
-    if operation_state['running']:
-        return jsonify({'status': 'error', 'message': 'Outra operação já está em andamento.'}), 409
+    try:
+        workers = int(data.get('workers') or DEFAULT_COLLECTION_WORKERS)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Número de threads inválido.'}), 400
+    workers = max(1, min(workers, MAX_COLLECTION_WORKERS))
+
+    snapshot_format = data.get('snapshot_format') or DEFAULT_SNAPSHOT_FORMAT
+    if snapshot_format not in SNAPSHOT_FORMATS:
+        return jsonify({'status': 'error', 'message': f'Formato de snapshot inválido: {snapshot_format}.'}), 400
+
+    baseline_filename = data.get('baseline_snapshot') or None
+    incremental_mode = data.get('incremental_mode') or 'revalidate'
+    if incremental_mode not in INCREMENTAL_MODES:
+        return jsonify({'status': 'error', 'message': f'Modo incremental inválido: {incremental_mode}.'}), 400
+    if baseline_filename and not os.path.exists(os.path.join(INFO_DIR, secure_filename(baseline_filename))):
+        return jsonify({'status': 'error', 'message': 'Snapshot base não encontrado.'}), 404
 
-    # Inicia a tarefa de coleta em uma nova thread
-    threading.Thread(target=perform_collection_task, args=(directory_path, collection_type)).start()
-    return jsonify({'status': 'success', 'message': 'Coleta iniciada.'})
+    hash_algorithm = data.get('hash_algorithm') or None
+    if hash_algorithm and hash_algorithm not in HASH_ALGORITHMS:
+        return jsonify({'status': 'error', 'message': f'Algoritmo de hash inválido: {hash_algorithm}.'}), 400
+    try:
+        hash_workers = int(data.get('hash_workers') or DEFAULT_HASH_WORKERS)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Número de threads de hash inválido.'}), 400
+    hash_workers = max(1, min(hash_workers, MAX_HASH_WORKERS))
+    use_hash_cache = data.get('use_hash_cache', True) is not False
+    try:
+        path_filter = parse_path_filter(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    # Enfileira a tarefa de coleta; ela roda em uma thread própria quando houver vaga
+    job = job_manager.submit('collect', f"Coleta de {collection_type}: {directory_path}", perform_collection_task,
+                             args=(directory_path, collection_type, workers, snapshot_format),
+                             kwargs={'baseline_filename': baseline_filename, 'incremental_mode': incremental_mode,
+                                     'hash_algorithm': hash_algorithm, 'hash_workers': hash_workers,
+                                     'use_hash_cache': use_hash_cache, 'path_filter': path_filter})
+    return job_submitted_response(job, 'Coleta iniciada.')
 
 @app.route('/compare', methods=['POST'])
 def compare():
@@ -681,12 +4673,42 @@ def compare():
     if not json_origem_filename or not json_destino_filename:
         return jsonify({'status': 'error', 'message': 'Nomes dos arquivos JSON não fornecidos.'}), 400
 
-    if operation_state['running']:
-        return jsonify({'status': 'error', 'message': 'Outra operação já está em andamento.'}), 409
+    verify_mode = data.get('verify_mode') or 'none'
+    if verify_mode not in VERIFY_MODES:
+        return jsonify({'status': 'error', 'message': f'Modo de verificação inválido: {verify_mode}.'}), 400
+
+    try:
+        path_filter = parse_path_filter(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    # Enfileira a tarefa de comparação; ela roda em uma thread própria quando houver vaga
+    job = job_manager.submit('compare', f"Comparação: {json_origem_filename} x {json_destino_filename}", perform_comparison_task,
+                             args=(json_origem_filename, json_destino_filename, verify_mode),
+                             kwargs={'path_filter': path_filter})
+    return job_submitted_response(job, 'Comparação iniciada.')
+
+@app.route('/compare_live', methods=['POST'])
+def compare_live():
+    data = request.json
+    dir_origem = data.get('dir_origem')
+    dir_destino = data.get('dir_destino')
+
+    if not dir_origem or not dir_destino:
+        return jsonify({'status': 'error', 'message': 'Pastas de origem e destino não fornecidas.'}), 400
+
+    verify_mode = data.get('verify_mode') or 'none'
+    if verify_mode not in VERIFY_MODES:
+        return jsonify({'status': 'error', 'message': f'Modo de verificação inválido: {verify_mode}.'}), 400
+
+    try:
+        path_filter = parse_path_filter(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
 
-    # Inicia a tarefa de comparação em uma nova thread
-    threading.Thread(target=perform_comparison_task, args=(json_origem_filename, json_destino_filename)).start()
-    return jsonify({'status': 'success', 'message': 'Comparação iniciada.'})
+    job = job_manager.submit('compare', f"Comparação direta: {dir_origem} x {dir_destino}", perform_live_comparison_task,
+                             args=(dir_origem, dir_destino, verify_mode), kwargs={'path_filter': path_filter})
+    return job_submitted_response(job, 'Comparação direta iniciada.')
 
 @app.route('/copy_missing', methods=['POST'])
 def copy_missing_files():
@@ -695,34 +4717,174 @@ def copy_missing_files():
 
     if not comparison_json_filename:
         return jsonify({'status': 'error', 'message': 'Nome do arquivo JSON de comparação não fornecido.'}), 400
-    
-    if operation_state['running']:
-        return jsonify({'status': 'error', 'message': 'Outra operação já está em andamento.'}), 409
-    
-    threading.Thread(target=perform_copy_task, args=(comparison_json_filename,)).start()
-    return jsonify({'status': 'success', 'message': 'Operação de cópia iniciada.'})
 
+    try:
+        workers = int(data.get('workers') or DEFAULT_COPY_WORKERS)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Número de threads de cópia inválido.'}), 400
+    workers = max(1, min(workers, MAX_COPY_WORKERS))
+    delta = bool(data.get('delta'))
+    verify_mode = data.get('verify_mode') or 'none'
+    if verify_mode not in COPY_VERIFY_MODES:
+        return jsonify({'status': 'error', 'message': f'Modo de verificação inválido: {verify_mode}.'}), 400
+    verify_algorithm = data.get('verify_algorithm') or 'md5'
+    if verify_algorithm not in HASH_ALGORITHMS:
+        return jsonify({'status': 'error', 'message': f'Algoritmo de hash inválido: {verify_algorithm}.'}), 400
+    try:
+        limits = parse_copy_limits({key: data.get(key) for key in ('bytes_per_second', 'files_per_second')})
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Limite de cópia inválido.'}), 400
+    adaptive = bool(data.get('adaptive'))
+    move_mode = data.get('move_mode') or 'copy'
+    if move_mode not in COPY_MOVE_MODES:
+        return jsonify({'status': 'error', 'message': f'Modo para arquivos movidos inválido: {move_mode}.'}), 400
+    skip_fingerprint_matches = bool(data.get('skip_fingerprint_matches'))
+
+    try:
+        job = job_manager.submit('copy', f"Cópia: {comparison_json_filename}", perform_copy_task,
+                                 args=(comparison_json_filename, workers),
+                                 kwargs={'delta': delta, 'verify_mode': verify_mode, 'verify_algorithm': verify_algorithm,
+                                         'adaptive': adaptive, 'move_mode': move_mode,
+                                         'skip_fingerprint_matches': skip_fingerprint_matches, **limits},
+                                 key=('copy', secure_filename(comparison_json_filename)))
+    except JobConflictError:
+        return jsonify({'status': 'error', 'message': 'Já há uma cópia em andamento para este relatório.'}), 409
+    return job_submitted_response(job, 'Operação de cópia iniciada.')
+
+@app.route('/resume_copy', methods=['POST'])
+def resume_copy():
+    data = request.json
+    comparison_json_filename = data.get('comparison_json')
+
+    if not comparison_json_filename:
+        return jsonify({'status': 'error', 'message': 'Nome do arquivo JSON de comparação não fornecido.'}), 400
+
+    try:
+        workers = int(data.get('workers') or DEFAULT_COPY_WORKERS)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Número de threads de cópia inválido.'}), 400
+    workers = max(1, min(workers, MAX_COPY_WORKERS))
+    delta = bool(data.get('delta'))
+    verify_mode = data.get('verify_mode') or 'none'
+    if verify_mode not in COPY_VERIFY_MODES:
+        return jsonify({'status': 'error', 'message': f'Modo de verificação inválido: {verify_mode}.'}), 400
+    verify_algorithm = data.get('verify_algorithm') or 'md5'
+    if verify_algorithm not in HASH_ALGORITHMS:
+        return jsonify({'status': 'error', 'message': f'Algoritmo de hash inválido: {verify_algorithm}.'}), 400
+    try:
+        limits = parse_copy_limits({key: data.get(key) for key in ('bytes_per_second', 'files_per_second')})
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Limite de cópia inválido.'}), 400
+    adaptive = bool(data.get('adaptive'))
+    move_mode = data.get('move_mode') or 'copy'
+    if move_mode not in COPY_MOVE_MODES:
+        return jsonify({'status': 'error', 'message': f'Modo para arquivos movidos inválido: {move_mode}.'}), 400
+    skip_fingerprint_matches = bool(data.get('skip_fingerprint_matches'))
+
+    if not os.path.exists(get_copy_journal_path(comparison_json_filename)):
+        return jsonify({'status': 'error', 'message': 'Não há cópia anterior deste relatório para retomar.'}), 404
+
+    try:
+        job = job_manager.submit('copy', f"Retomada da cópia: {comparison_json_filename}", perform_copy_task,
+                                 args=(comparison_json_filename, workers),
+                                 kwargs={'resume': True, 'delta': delta, 'verify_mode': verify_mode, 'verify_algorithm': verify_algorithm,
+                                         'adaptive': adaptive, 'move_mode': move_mode,
+                                         'skip_fingerprint_matches': skip_fingerprint_matches, **limits},
+                                 key=('copy', secure_filename(comparison_json_filename)))
+    except JobConflictError:
+        return jsonify({'status': 'error', 'message': 'Já há uma cópia em andamento para este relatório.'}), 409
+    return job_submitted_response(job, 'Retomada da cópia iniciada.')
+
+
+@app.route('/dedup', methods=['POST'])
+def dedup():
+    data = request.json
+    snapshot_filename = data.get('snapshot')
+
+    if not snapshot_filename:
+        return jsonify({'status': 'error', 'message': 'Snapshot de coleta não fornecido.'}), 400
+    if not os.path.exists(os.path.join(INFO_DIR, secure_filename(snapshot_filename))):
+        return jsonify({'status': 'error', 'message': 'Snapshot de coleta não encontrado.'}), 404
+    try:
+        min_size = int(data.get('min_size') or DEDUP_MIN_SIZE)
+        workers = int(data.get('workers') or DEFAULT_HASH_WORKERS)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Tamanho mínimo ou número de threads inválido.'}), 400
+    min_size = max(1, min_size)
+    workers = max(1, min(workers, MAX_HASH_WORKERS))
+
+    job = job_manager.submit('dedup', f"Duplicados: {snapshot_filename}", perform_dedup_task,
+                             args=(snapshot_filename, min_size, workers),
+                             kwargs={'use_hash_cache': data.get('use_hash_cache', True) is not False})
+    return job_submitted_response(job, 'Análise de duplicados iniciada.')
+
+@app.route('/convert_snapshot', methods=['POST'])
+def convert_snapshot():
+    data = request.json
+    snapshot_filename = data.get('filename')
+
+    if not snapshot_filename:
+        return jsonify({'status': 'error', 'message': 'Nome do arquivo de coleta não fornecido.'}), 400
+
+    if get_snapshot_format(snapshot_filename) == 'snap':
+        return jsonify({'status': 'error', 'message': 'O snapshot já está no formato binário.'}), 400
+
+    if not os.path.exists(os.path.join(INFO_DIR, secure_filename(snapshot_filename))):
+        return jsonify({'status': 'error', 'message': 'Arquivo de coleta não encontrado.'}), 404
+
+    try:
+        job = job_manager.submit('convert', f"Conversão: {snapshot_filename}", perform_snapshot_conversion_task,
+                                 args=(snapshot_filename,), key=('convert', secure_filename(snapshot_filename)))
+    except JobConflictError:
+        return jsonify({'status': 'error', 'message': 'Este snapshot já está sendo convertido.'}), 409
+    return job_submitted_response(job, 'Conversão para snapshot binário iniciada.')
+
+def send_storage_file(directory, filename):
+    """
+    Envia um snapshot ou relatório para download. Arquivos comprimidos são
+    descomprimidos em streaming (com o nome sem o sufixo), a menos que a
+    requisição peça raw=1.
+    """
+    filename = secure_filename(filename)
+    download_name, codec = split_compression_suffix(filename)
+    if codec is None or request.args.get('raw') == '1':
+        return send_from_directory(directory, filename, as_attachment=True)
+    filepath = os.path.join(directory, filename)
+    if not os.path.isfile(filepath):
+        return "Arquivo não encontrado.", 404
+
+    def generate():
+        with open_storage_file(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(REPORT_EXPORT_CHUNK_SIZE), b''):
+                yield chunk
+
+    return Response(stream_with_context(generate()),
+                    mimetype=mimetypes.guess_type(download_name)[0] or 'application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
 
 @app.route('/results/<filename>')
 def download_file(filename):
     """Permite o download dos arquivos de resultado."""
-    return send_from_directory(RESULTS_DIR, secure_filename(filename), as_attachment=True)
+    return send_storage_file(RESULTS_DIR, filename)
 
 @app.route('/info_data/<filename>')
 def download_info_file(filename):
     """Permite o download dos arquivos de coleta (info_data)."""
-    return send_from_directory(INFO_DIR, secure_filename(filename), as_attachment=True)
+    return send_storage_file(INFO_DIR, filename)
 
 @app.route('/report/<json_filename>')
 def comparison_report(json_filename):
-    """Renderiza a página de relatório de comparação."""
+    """Renderiza a página de relatório de comparação; as linhas são carregadas sob demanda pela API."""
     json_filepath = os.path.join(RESULTS_DIR, secure_filename(json_filename))
     if not os.path.exists(json_filepath):
         return "Relatório de comparação não encontrado.", 404
 
     try:
-        with open(json_filepath, 'r', encoding='utf-8') as f:
-            report_data = json.load(f)
+        conn = open_report_index(json_filename)
+        try:
+            report_data, row_lists = describe_report_index(conn, REPORT_ROW_LISTS['comparison_result_'])
+        finally:
+            conn.close()
         
         timestamp_raw = report_data.get("timestamp", "N/A")
         try:
@@ -735,9 +4897,11 @@ def comparison_report(json_filename):
 
         return render_template('comparison_report.html', 
                                report_data=report_data,
+                               row_lists=row_lists,
                                timestamp=timestamp_formatted,
-                               csv_filename=csv_filename_for_report if csv_available else None) # Passa o nome do CSV
-    except json.JSONDecodeError:
+                               csv_filename=csv_filename_for_report if csv_available else None, # Passa o nome do CSV
+                               report_json_filename=secure_filename(json_filename))
+    except (json.JSONDecodeError, ValueError):
         return "Erro ao carregar o arquivo JSON do relatório. Formato inválido.", 500
     except Exception as e:
         logger.error(f"Erro ao gerar relatório de comparação de {json_filename}: {e}")
@@ -750,8 +4914,11 @@ def copy_report(json_filename):
         return "Relatório de cópia não encontrado ou arquivo JSON excluído.", 404
 
     try:
-        with open(json_filepath, 'r', encoding='utf-8') as f:
-            report_data = json.load(f)
+        conn = open_report_index(json_filename)
+        try:
+            report_data, row_lists = describe_report_index(conn, REPORT_ROW_LISTS['copy_report_'])
+        finally:
+            conn.close()
         
         timestamp_raw = report_data.get("timestamp", "N/A")
         try:
@@ -764,56 +4931,177 @@ def copy_report(json_filename):
 
         return render_template('copy_report.html', 
                                report_data=report_data,
+                               row_lists=row_lists,
                                timestamp=timestamp_formatted,
                                csv_filename=csv_filename_for_report if csv_available else None,
-                               report_json_filename=json_filename) 
-    except json.JSONDecodeError:
+                               report_json_filename=secure_filename(json_filename)) 
+    except (json.JSONDecodeError, ValueError):
         return "Erro ao carregar o arquivo JSON do relatório de cópia. Formato inválido.", 500
     except Exception as e:
         logger.error(f"Erro ao gerar relatório de cópia de {json_filename}: {e}")
         return "Ocorreu um erro ao gerar o relatório de cópia.", 500
 
+@app.route('/api/reports/<json_filename>', methods=['GET'])
+def report_summary_api(json_filename):
+    """Resumo do relatório e, para cada lista de linhas, o total e a contagem por status."""
+    list_keys = get_report_row_lists(secure_filename(json_filename))
+    if list_keys is None:
+        return jsonify({'status': 'error', 'message': 'Tipo de relatório sem linhas paginadas.'}), 400
+    try:
+        conn = open_report_index(json_filename)
+    except FileNotFoundError:
+        return jsonify({'status': 'error', 'message': 'Relatório não encontrado.'}), 404
+    try:
+        summary, lists = describe_report_index(conn, list_keys)
+    finally:
+        conn.close()
+    return jsonify({'status': 'success', 'summary': summary, 'lists': lists})
+
+def parse_report_filters(args):
+    """Filtros de linhas (status, path_prefix, min_size, max_size) da query string; ValueError se um tamanho for inválido."""
+    return {
+        'status': args.get('status') or None,
+        'path_prefix': args.get('path_prefix') or None,
+        'min_size': int(args['min_size']) if args.get('min_size') else None,
+        'max_size': int(args['max_size']) if args.get('max_size') else None
+    }
+
+@app.route('/api/reports/<json_filename>/rows', methods=['GET'])
+def report_rows_api(json_filename):
+    """
+    Uma página de linhas do relatório. Parâmetros: list, status, path_prefix,
+    min_size, max_size, sort (path, size ou status), order (asc/desc), page e page_size.
+    """
+    list_keys = get_report_row_lists(secure_filename(json_filename))
+    if list_keys is None:
+        return jsonify({'status': 'error', 'message': 'Tipo de relatório sem linhas paginadas.'}), 400
+    args = request.args
+    list_key = args.get('list') or list_keys[0]
+    if list_key not in list_keys:
+        return jsonify({'status': 'error', 'message': f'Lista inválida: {list_key}.'}), 400
+    sort = args.get('sort') or None
+    if sort is not None and sort not in REPORT_SORT_COLUMNS:
+        return jsonify({'status': 'error', 'message': f'Ordenação inválida: {sort}.'}), 400
+    try:
+        filters = parse_report_filters(args)
+        page = max(1, int(args.get('page') or 1))
+        page_size = max(1, min(int(args.get('page_size') or REPORT_PAGE_SIZE), REPORT_MAX_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Parâmetro numérico inválido.'}), 400
+
+    try:
+        conn = open_report_index(json_filename)
+    except FileNotFoundError:
+        return jsonify({'status': 'error', 'message': 'Relatório não encontrado.'}), 404
+    try:
+        result = query_report_rows(conn, list_key, **filters, sort=sort, descending=args.get('order') == 'desc',
+                                   page=page, page_size=page_size)
+    finally:
+        conn.close()
+    return jsonify(dict(result, status='success'))
+
+@app.route('/api/reports/<json_filename>/export', methods=['GET'])
+def report_export_api(json_filename):
+    """
+    Exporta as linhas de uma lista do relatório como CSV ou NDJSON, geradas
+    em streaming. Parâmetros: list, format (csv ou ndjson), status,
+    path_prefix, min_size e max_size.
+    """
+    json_filename = secure_filename(json_filename)
+    list_keys = get_report_row_lists(json_filename)
+    if list_keys is None:
+        return jsonify({'status': 'error', 'message': 'Tipo de relatório sem linhas exportáveis.'}), 400
+    args = request.args
+    list_key = args.get('list') or list_keys[0]
+    if list_key not in list_keys:
+        return jsonify({'status': 'error', 'message': f'Lista inválida: {list_key}.'}), 400
+    export_format = args.get('format') or 'csv'
+    if export_format not in REPORT_EXPORT_FORMATS:
+        return jsonify({'status': 'error', 'message': f'Formato de exportação inválido: {export_format}.'}), 400
+    try:
+        filters = parse_report_filters(args)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Parâmetro numérico inválido.'}), 400
+    json_filepath = os.path.join(RESULTS_DIR, json_filename)
+    if not os.path.exists(json_filepath):
+        return jsonify({'status': 'error', 'message': 'Relatório não encontrado.'}), 404
+
+    def generate():
+        try:
+            yield from iter_report_export(json_filepath, list_keys, list_key, export_format, **filters)
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao exportar {list_key} de {json_filename}: {e}")
+
+    download_name = f"{split_compression_suffix(json_filename)[0][:-len('.json')]}_{list_key}.{export_format}"
+    return Response(stream_with_context(generate()),
+                    mimetype='text/csv' if export_format == 'csv' else 'application/x-ndjson',
+                    headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
 
 # --- SocketIO Event Handlers ---
 
 @socketio.on('connect')
 def handle_connect():
     log_and_emit_message('info', 'Cliente conectado ao SocketIO.', force_emit=True)
+    # Envia o estado COMPLETO de cada tarefa conhecida para o frontend
     with state_lock:
-        # Garante que as listas sejam atualizadas no estado antes de emitir
-        operation_state['all_collected_jsons'] = get_available_info_jsons() 
-        operation_state['all_comparison_jsons'] = get_available_comparison_jsons() 
-        operation_state['all_copy_reports'] = get_available_copy_reports()
-    update_and_emit_status(force_emit=True) # Isso enviará o estado COMPLETO para o frontend
+        jobs = list(job_manager.jobs.values())
+    for job in jobs:
+        update_and_emit_status(job=job)
+    if not jobs:
+        update_and_emit_status(force_emit=True)
+    emit_jobs_update()
+
+def get_requested_job(data):
+    """Tarefa indicada em data['job_id'] pelos eventos de controle; sem ID, a mais recente em execução."""
+    job_id = (data or {}).get('job_id')
+    job = job_manager.get(job_id) if job_id else job_manager.latest_job()
+    if job is None:
+        log_and_emit_message('warning', 'Tarefa não encontrada.', force_emit=True)
+    return job
 
 @socketio.on('pause_operation')
-def handle_pause():
-    with state_lock:
-        if operation_state['running'] and not operation_state['paused']:
-            pause_event.set()
-            operation_state['paused'] = True
+def handle_pause(data=None):
+    job = get_requested_job(data)
+    if job is not None and job_manager.pause(job):
+        with job_context(job):
             log_and_emit_message('info', 'Operação pausada.', force_emit=True)
             update_and_emit_status("Operação pausada.")
 
 @socketio.on('resume_operation')
-def handle_resume():
-    with state_lock:
-        if operation_state['running'] and operation_state['paused']:
-            pause_event.clear()
-            operation_state['paused'] = False
+def handle_resume(data=None):
+    job = get_requested_job(data)
+    if job is not None and job_manager.resume(job):
+        with job_context(job):
             log_and_emit_message('info', 'Operação retomada.', force_emit=True)
             update_and_emit_status("Operação retomada.")
 
 @socketio.on('stop_operation')
-def handle_stop():
-    with state_lock:
-        if operation_state['running']:
-            stop_event.set()
-            pause_event.clear() # Limpa a pausa se estiver pausado
-            operation_state['running'] = False
-            operation_state['paused'] = False
+def handle_stop(data=None):
+    job = get_requested_job(data)
+    if job is not None and job_manager.stop(job):
+        with job_context(job):
             log_and_emit_message('warning', 'Operação interrompida. Finalizando...', force_emit=True)
             update_and_emit_status("Operação sendo interrompida...")
+        emit_jobs_update()
+
+@socketio.on('set_copy_limits')
+def handle_set_copy_limits(data):
+    job = get_requested_job(data)
+    scheduler = job.copy_scheduler if job is not None else None
+    if scheduler is None:
+        log_and_emit_message('warning', 'Nenhuma cópia em andamento para ajustar os limites.', force_emit=True)
+        return
+    try:
+        limits = parse_copy_limits(data or {})
+    except (TypeError, ValueError):
+        log_and_emit_message('error', 'Limites de cópia inválidos.', force_emit=True)
+        return
+    scheduler.update(limits)
+    with job_context(job):
+        with state_lock:
+            job.state['copy_limits'] = scheduler.describe()
+        log_and_emit_message('info', f"Limites de cópia ajustados: {scheduler.describe()}", force_emit=True)
+        update_and_emit_status("Limites de cópia ajustados.")
 
 if __name__ == '__main__':
     socketio.run(app, debug=True, allow_unsafe_werkzeug=True) # allow_unsafe_werkzeug=True para execução em desenvolvimento
\ No newline at end of file
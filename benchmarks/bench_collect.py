@@ -0,0 +1,162 @@
+"""
+Benchmark da coleta: compara a varredura antiga (pré-contagem com os.walk +
+segunda passada com os.stat) com a varredura em passada única via os.scandir.
+
+Uso:
+    python benchmarks/bench_collect.py [--dirs 200] [--files-per-dir 50] [--path /pasta/existente]
+
+Sem --path, uma árvore sintética é criada em um diretório temporário.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import scan_directory_tree  # noqa: E402
+
+
+def legacy_collect(base_path):
+    """Reproduz o algoritmo anterior de get_file_info_robust (duas passadas)."""
+    total_files_to_scan = 0
+    for root, _, files in os.walk(base_path, followlinks=False):
+        total_files_to_scan += len(files)
+
+    file_info = {}
+    for root, _, files in os.walk(base_path, followlinks=False):
+        for file in files:
+            file_path = os.path.join(root, file)
+            relative_path = os.path.relpath(file_path, base_path)
+            try:
+                stat_info = os.stat(file_path)
+                file_info[relative_path] = (stat_info.st_size, stat_info.st_mtime)
+            except OSError:
+                pass
+    return file_info
+
+
+def scandir_collect(base_path):
+    """Executa a varredura nova, sem emissão de status."""
+    inaccessible_files = []
+    return {
+        relative_path: (info['size'], info['mtime'])
+        for relative_path, info in scan_directory_tree(base_path, inaccessible_files)
+    }
+
+
+class _CountingEntry:
+    """Envolve um DirEntry para contar chamadas a stat()."""
+
+    def __init__(self, entry, counters):
+        self._entry = entry
+        self._counters = counters
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def stat(self, *args, **kwargs):
+        self._counters['stat'] += 1
+        return self._entry.stat(*args, **kwargs)
+
+
+class _CountingScandir:
+    def __init__(self, iterator, counters):
+        self._iterator = iterator
+        self._counters = counters
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._iterator.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _CountingEntry(next(self._iterator), self._counters)
+
+    def close(self):
+        self._iterator.close()
+
+
+def count_metadata_calls(collector, base_path):
+    """Conta listagens de diretório e chamadas stat feitas por um coletor."""
+    counters = {'scandir': 0, 'stat': 0}
+    original_scandir, original_stat = os.scandir, os.stat
+
+    def counting_scandir(path='.'):
+        counters['scandir'] += 1
+        return _CountingScandir(original_scandir(path), counters)
+
+    def counting_stat(path, *args, **kwargs):
+        counters['stat'] += 1
+        return original_stat(path, *args, **kwargs)
+
+    os.scandir, os.stat = counting_scandir, counting_stat
+    try:
+        collector(base_path)
+    finally:
+        os.scandir, os.stat = original_scandir, original_stat
+    return counters
+
+
+def build_tree(base_path, dirs, files_per_dir):
+    for d in range(dirs):
+        dir_path = os.path.join(base_path, f"dir_{d // 20:03d}", f"sub_{d:05d}")
+        os.makedirs(dir_path, exist_ok=True)
+        for f in range(files_per_dir):
+            with open(os.path.join(dir_path, f"file_{f:05d}.dat"), 'wb') as fh:
+                fh.write(b'x' * (f % 7))
+
+
+def best_of(func, base_path, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(base_path)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', help='Diretório existente a ser varrido (em vez da árvore sintética).')
+    parser.add_argument('--dirs', type=int, default=200)
+    parser.add_argument('--files-per-dir', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    temp_dir = None
+    base_path = args.path
+    if not base_path:
+        temp_dir = tempfile.mkdtemp(prefix='bench_collect_')
+        base_path = temp_dir
+        build_tree(base_path, args.dirs, args.files_per_dir)
+
+    try:
+        legacy_time, legacy_files = best_of(legacy_collect, base_path, args.repeat)
+        scandir_time, scandir_files = best_of(scandir_collect, base_path, args.repeat)
+        if legacy_files != scandir_files:
+            print("AVISO: os dois coletores produziram resultados diferentes!")
+
+        legacy_calls = count_metadata_calls(legacy_collect, base_path)
+        scandir_calls = count_metadata_calls(scandir_collect, base_path)
+
+        print(f"Arquivos: {len(scandir_files)}")
+        print(f"{'coletor':<12}{'tempo (s)':>12}{'listagens':>12}{'stat':>12}")
+        print(f"{'os.walk x2':<12}{legacy_time:>12.3f}{legacy_calls['scandir']:>12}{legacy_calls['stat']:>12}")
+        print(f"{'scandir':<12}{scandir_time:>12.3f}{scandir_calls['scandir']:>12}{scandir_calls['stat']:>12}")
+        if scandir_time > 0:
+            print(f"Ganho de tempo: {legacy_time / scandir_time:.2f}x")
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
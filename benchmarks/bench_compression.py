@@ -0,0 +1,99 @@
+"""
+Benchmark da compressão de snapshots: grava o mesmo snapshot NDJSON sem
+compressão e com gzip, lzma e bz2 em vários níveis e mede tamanho em disco,
+tempo de gravação, tempo de leitura completa e tempo de leitura dos metadados
+(cabeçalho + trailer).
+
+A coluna "total estimado" soma ao tempo medido (CPU + cache de páginas) o tempo
+de transferir o arquivo em um disco com a vazão de --disk-mbps, para mostrar em
+que ponto a economia de E/S compensa o custo de CPU da compressão.
+
+Uso:
+    python benchmarks/bench_compression.py [--files 200000] [--disk-mbps 150] [--codecs gzip:1,gzip:6,lzma:1,bz2:9]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import (  # noqa: E402
+    COMPRESSION_SUFFIXES, iter_snapshot_files, read_snapshot_metadata, set_compression_settings, write_ndjson_snapshot
+)
+
+DEFAULT_CODECS = 'none,gzip:1,gzip:6,gzip:9,lzma:0,lzma:6,bz2:1,bz2:9'
+
+
+def synthetic_records(count):
+    """Registros de snapshot com caminhos longos e repetitivos, como os de uma árvore real."""
+    for i in range(count):
+        path = os.path.join(f"projetos_{i // 50000:02d}", f"cliente_{i // 2000:04d}", f"relatorios_{i // 100:05d}",
+                            f"documento_digitalizado_{i:07d}.pdf")
+        yield path, {'size': (i * 7919) % 5000000, 'mtime': 1700000000.0 + i * 1.5, 'md5': None}
+
+
+def parse_codecs(spec):
+    codecs = []
+    for item in spec.split(','):
+        codec, _, level = item.partition(':')
+        codecs.append((codec, int(level) if level else 6))
+    return codecs
+
+
+def measure(base_dir, codec, level, files):
+    filepath = os.path.join(base_dir, f"snapshot_{codec}_{level}.ndjson{COMPRESSION_SUFFIXES.get(codec, '')}")
+    set_compression_settings(codec, level)
+
+    start = time.perf_counter()
+    write_ndjson_snapshot(filepath, {'base_directory': '/bench'}, synthetic_records(files), [])
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    read_count = sum(1 for _ in iter_snapshot_files(filepath))
+    read_time = time.perf_counter() - start
+    if read_count != files:
+        print(f"AVISO: {codec}:{level} leu {read_count} de {files} arquivos!")
+
+    start = time.perf_counter()
+    read_snapshot_metadata(filepath)
+    metadata_time = time.perf_counter() - start
+
+    size = os.path.getsize(filepath)
+    os.remove(filepath)
+    return size, write_time, read_time, metadata_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=200000)
+    parser.add_argument('--disk-mbps', type=float, default=150.0, help='Vazão de disco usada na estimativa (MB/s).')
+    parser.add_argument('--codecs', default=DEFAULT_CODECS, help='Lista codec:nível separada por vírgulas.')
+    args = parser.parse_args()
+
+    base_dir = tempfile.mkdtemp(prefix='bench_compression_')
+    disk_bytes_per_second = args.disk_mbps * 1024 * 1024
+    try:
+        results = [(codec, level, *measure(base_dir, codec, level, args.files)) for codec, level in parse_codecs(args.codecs)]
+        plain_size = next((size for codec, _, size, *_ in results if codec == 'none'), None)
+
+        print(f"Arquivos: {args.files}  Disco simulado: {args.disk_mbps:.0f} MB/s")
+        print(f"{'codec':<10}{'MB':>10}{'razão':>8}{'gravação (s)':>14}{'leitura (s)':>13}{'trailer (s)':>13}"
+              f"{'total estimado (s)':>20}")
+        set_compression_settings('none', 6)
+        for codec, level, size, write_time, read_time, metadata_time in results:
+            ratio = f"{plain_size / size:.1f}x" if plain_size else '-'
+            io_time = size / disk_bytes_per_second
+            # Gravação + leitura completa, cada uma pagando a transferência do arquivo
+            estimated = write_time + read_time + 2 * io_time
+            label = codec if codec == 'none' else f"{codec}:{level}"
+            print(f"{label:<10}{size / 1048576:>10.1f}{ratio:>8}{write_time:>14.2f}{read_time:>13.2f}{metadata_time:>13.4f}"
+                  f"{estimated:>20.2f}")
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
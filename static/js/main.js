@@ -7,23 +7,45 @@ document.addEventListener('DOMContentLoaded', function() {
     const filesProcessed = document.getElementById('filesProcessed');
     const totalFilesEstimated = document.getElementById('totalFilesEstimated');
     const currentDirectory = document.getElementById('currentDirectory');
+    const bytesProgressLine = document.getElementById('bytesProgressLine');
+    const bytesCopied = document.getElementById('bytesCopied');
+    const totalBytes = document.getElementById('totalBytes');
     const logMessages = document.getElementById('logMessages');
     const dynamicAlerts = document.getElementById('dynamicAlerts'); 
 
     const startCollectionBtn = document.getElementById('startCollectionBtn');
     const startComparisonBtn = document.getElementById('startComparisonBtn');
     const startCopyBtn = document.getElementById('startCopyBtn'); 
+    const resumeCopyBtn = document.getElementById('resumeCopyBtn');
 
     const pauseBtn = document.getElementById('pauseBtn');
     const resumeBtn = document.getElementById('resumeBtn');
     const stopBtn = document.getElementById('stopBtn');
+    const copyLimitsPanel = document.getElementById('copyLimitsPanel');
+    const copyLimitsText = document.getElementById('copyLimitsText');
+    const applyCopyLimitsBtn = document.getElementById('applyCopyLimitsBtn');
+    const selectedJobDescription = document.getElementById('selectedJobDescription');
+    const jobsTableBody = document.getElementById('jobsTableBody');
+    const maxConcurrentJobsInput = document.getElementById('maxConcurrentJobs');
+    const applyMaxJobsBtn = document.getElementById('applyMaxJobsBtn');
+    const compressionCodecSelect = document.getElementById('compressionCodec');
+    const compressionLevelInput = document.getElementById('compressionLevel');
+    const applyCompressionBtn = document.getElementById('applyCompressionBtn');
+
+    // Tarefa acompanhada no painel de monitoramento e último status de cada tarefa
+    let selectedJobId = null;
+    const jobStates = {};
 
     const jsonOrigemSelect = document.getElementById('jsonOrigem');
     const jsonDestinoSelect = document.getElementById('jsonDestino');
+    const baselineSnapshotSelect = document.getElementById('baselineSnapshot');
     const comparisonJsonForCopySelect = document.getElementById('comparisonJsonForCopy');
     const collectedJsonsList = document.getElementById('collectedJsonsList');
     const comparisonJsonsList = document.getElementById('comparisonJsonsList');
     const copyReportsList = document.getElementById('copyReportsList'); // Nova referência
+    const dedupSnapshotSelect = document.getElementById('dedupSnapshot');
+    const dedupReportsList = document.getElementById('dedupReportsList');
+    const startDedupBtn = document.getElementById('startDedupBtn');
 
     // --- Funções Auxiliares de UI ---
 
@@ -64,11 +86,51 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     socket.on('status_update', function(data) {
+        // Atualiza as listas de JSONs a cada status_update
+        if (data.all_collected_jsons) {
+            updateCollectedJsonsLists(data.all_collected_jsons);
+        }
+        if (data.all_comparison_jsons) {
+            updateComparisonJsonsLists(data.all_comparison_jsons);
+        }
+        if (data.all_copy_reports) { 
+            updateCopyReportsList(data.all_copy_reports);
+        }
+        if (data.all_dedup_reports) {
+            updateDedupReportsList(data.all_dedup_reports);
+        }
+
+        if (data.job_id) {
+            jobStates[data.job_id] = data;
+        }
+        // O painel acompanha a tarefa selecionada; sem seleção, ou se ela já terminou,
+        // passa a acompanhar a tarefa em execução que enviou o status
+        const selected = jobStates[selectedJobId];
+        if (!selectedJobId || data.job_id === selectedJobId || (data.running && !(selected && selected.running))) {
+            selectJob(data.job_id);
+        }
+    });
+
+    function selectJob(jobId) {
+        selectedJobId = jobId;
+        jobsTableBody.querySelectorAll('tr[data-job-id]').forEach(row => {
+            row.classList.toggle('table-active', row.dataset.jobId === jobId);
+        });
+        if (jobStates[jobId]) {
+            renderOperationStatus(jobStates[jobId]);
+        }
+    }
+
+    function renderOperationStatus(data) {
+        selectedJobDescription.textContent = data.description ? `#${data.job_id.slice(0, 6)} ${data.description} (${data.job_status_label})` : 'Nenhuma';
         operationStatus.textContent = data.status_message;
         
         let progress = 0;
         // Lógica para a barra de progresso e números
-        if (data.total_files_estimated > 0) {
+        if (data.total_bytes > 0) {
+            // Na cópia, o progresso acompanha os bytes (arquivos grandes avançam bloco a bloco)
+            progress = (data.bytes_copied / data.total_bytes) * 100;
+        } else if (data.total_files_estimated > 0) {
             progress = (data.files_processed / data.total_files_estimated) * 100;
         } else if (data.running) { 
             // Se a operação está rodando, mas a estimativa ainda é 0 (e.g., início da coleta/varredura)
@@ -86,36 +148,65 @@ document.addEventListener('DOMContentLoaded', function() {
         filesProcessed.textContent = data.files_processed;
         totalFilesEstimated.textContent = data.total_files_estimated;
         currentDirectory.textContent = data.current_directory || 'N/A'; 
+        bytesProgressLine.classList.toggle('d-none', !(data.total_bytes > 0));
+        bytesCopied.textContent = (data.bytes_copied / 1048576).toFixed(1) + ' MB';
+        totalBytes.textContent = (data.total_bytes / 1048576).toFixed(1) + ' MB';
 
         // Gerencia o estado dos botões de controle
         pauseBtn.disabled = !data.running || data.paused;
         resumeBtn.disabled = !data.running || !data.paused;
         stopBtn.disabled = !data.running;
-
-        // Desabilita botões de iniciar operações se já houver uma rodando
-        startCollectionBtn.disabled = data.running;
-        startComparisonBtn.disabled = data.running;
-        startCopyBtn.disabled = data.running; 
-
-        // Atualiza as listas de JSONs a cada status_update
-        if (data.all_collected_jsons) {
-            updateCollectedJsonsLists(data.all_collected_jsons);
+        copyLimitsPanel.classList.toggle('d-none', !data.copy_limits);
+        if (data.copy_limits) {
+            copyLimitsText.textContent = describeCopyLimits(data.copy_limits);
         }
-        if (data.all_comparison_jsons) {
-            updateComparisonJsonsLists(data.all_comparison_jsons);
+    }
+
+    socket.on('jobs_update', function(data) {
+        maxConcurrentJobsInput.value = data.max_concurrent_jobs;
+        jobsTableBody.innerHTML = '';
+        if (data.jobs.length === 0) {
+            jobsTableBody.innerHTML = '<tr><td colspan="3" class="text-muted">Nenhuma tarefa.</td></tr>';
+            return;
         }
-        if (data.all_copy_reports) { 
-            updateCopyReportsList(data.all_copy_reports);
+        data.jobs.slice().reverse().forEach(job => {
+            const row = document.createElement('tr');
+            row.dataset.jobId = job.job_id;
+            row.style.cursor = 'pointer';
+            row.classList.toggle('table-active', job.job_id === selectedJobId);
+            [`#${job.job_id.slice(0, 6)} ${job.description}`, job.job_status_label, `${job.files_processed} / ${job.total_files_estimated}`].forEach(text => {
+                const cell = document.createElement('td');
+                cell.textContent = text;
+                row.appendChild(cell);
+            });
+            jobsTableBody.appendChild(row);
+        });
+    });
+
+    jobsTableBody.addEventListener('click', function(event) {
+        const row = event.target.closest('tr[data-job-id]');
+        if (row) {
+            selectJob(row.dataset.jobId);
         }
     });
 
     socket.on('log_message', function(data) {
-        addLogMessage(data.data, data.level);
+        addLogMessage(data.job_id ? `[#${data.job_id.slice(0, 6)}] ${data.data}` : data.data, data.level);
     });
 
     socket.on('collection_complete', function(data) {
         showAlert(`Coleta de ${data.type} concluída para ${data.path}! Arquivo: ${data.filename}`, 'success');
         addLogMessage(`Coleta de ${data.type} concluída! Arquivo JSON: ${data.filename}`, 'success');
+        if (data.incremental) {
+            addLogMessage(`Coleta incremental: ${data.incremental.directories_reused} diretórios reaproveitados, ${data.incremental.directories_rescanned} revarridos.`, 'info');
+        }
+        if (data.hashing) {
+            const mbPerSecond = (data.hashing.bytes_per_second / (1024 * 1024)).toFixed(1);
+            addLogMessage(`Hashes ${data.hashing.algorithm}: ${data.hashing.files_hashed} calculados, ${data.hashing.files_reused} reaproveitados (${mbPerSecond} MB/s).`, 'info');
+            if (data.hashing.cache_hits !== undefined) {
+                addLogMessage(`Cache de hashes: ${data.hashing.cache_hits} acertos, ${data.hashing.cache_misses} falhas.`, 'info');
+            }
+        }
     });
 
     socket.on('comparison_complete', function(data) {
@@ -138,18 +229,58 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         showAlert(msg, 'success');
         addLogMessage(`Operação de cópia finalizada! Copiados: ${data.copied_count}, Falhas: ${data.failed_count}.`, 'success');
+        if (data.bytes_saved_by_delta) {
+            addLogMessage(`Cópia delta economizou ${(data.bytes_saved_by_delta / 1048576).toFixed(1)} MB.`, 'info');
+        }
+    });
+
+    socket.on('dedup_complete', function(data) {
+        if (data.status === 'success') {
+            let msg = `Análise de duplicados concluída! ${data.duplicate_groups_count} grupos, ${(data.reclaimable_bytes / 1048576).toFixed(1)} MB recuperáveis.`;
+            msg += `<br>Relatório JSON: <a href="/results/${data.json_filename}" target="_blank" download>${data.json_filename}</a>`;
+            msg += `<br>Relatório CSV: <a href="/results/${data.csv_filename}" target="_blank" download>${data.csv_filename}</a>`;
+            showAlert(msg, 'success');
+            addLogMessage('Análise de duplicados concluída com sucesso!', 'success');
+        } else {
+            showAlert(`Erro na análise de duplicados: ${data.message}`, 'danger');
+        }
+    });
+
+    socket.on('conversion_complete', function(data) {
+        if (data.status === 'success') {
+            showAlert(`Snapshot convertido para binário: ${data.filename}`, 'success');
+            addLogMessage(`Snapshot binário gerado: ${data.filename}`, 'success');
+        } else {
+            showAlert(`Erro na conversão do snapshot: ${data.message}`, 'danger');
+        }
     });
 
-    socket.on('operation_ended', function() {
-        addLogMessage('Operação finalizada ou interrompida. Estado resetado.', 'info');
+    socket.on('operation_ended', function(data) {
+        addLogMessage(`Tarefa #${data.job_id.slice(0, 6)} finalizada ou interrompida.`, 'info');
     });
 
     // --- Funções para Atualizar Listas de JSONs ---
     function updateCollectedJsonsLists(collectedJsons) {
         jsonOrigemSelect.innerHTML = '<option value="">Selecione um JSON de Origem</option>';
         jsonDestinoSelect.innerHTML = '<option value="">Selecione um JSON de Destino</option>';
+        const selectedBaseline = baselineSnapshotSelect.value;
+        baselineSnapshotSelect.innerHTML = '<option value="">-- Nenhum (coleta completa) --</option>';
+        const selectedDedupSnapshot = dedupSnapshotSelect.value;
+        dedupSnapshotSelect.innerHTML = '<option value="">-- Selecione um JSON de Coleta --</option>';
 
         collectedJsons.forEach(jsonFile => {
+            const optionBaseline = document.createElement('option');
+            optionBaseline.value = jsonFile.filename;
+            optionBaseline.textContent = `${jsonFile.filename} (${jsonFile.timestamp} - ${jsonFile.directory_path})`;
+            optionBaseline.selected = jsonFile.filename === selectedBaseline;
+            baselineSnapshotSelect.appendChild(optionBaseline);
+
+            const optionDedup = document.createElement('option');
+            optionDedup.value = jsonFile.filename;
+            optionDedup.textContent = `${jsonFile.filename} (${jsonFile.timestamp} - ${jsonFile.directory_path})`;
+            optionDedup.selected = jsonFile.filename === selectedDedupSnapshot;
+            dedupSnapshotSelect.appendChild(optionDedup);
+
             if (jsonFile.collection_type === 'origem') {
                 const optionOrigem = document.createElement('option');
                 optionOrigem.value = jsonFile.filename;
@@ -175,10 +306,13 @@ document.addEventListener('DOMContentLoaded', function() {
                 li.classList.add('list-group-item');
                 let inaccessibleBadge = jsonFile.inaccessible_count > 0 ? 
                     `<span class="badge bg-warning text-dark ms-2">Inacessíveis: ${jsonFile.inaccessible_count}</span>` : '';
+                let convertButton = jsonFile.filename.endsWith('.snap') ? '' :
+                    `<button type="button" class="btn btn-sm btn-outline-dark ms-2 convert-snapshot-btn" data-filename="${jsonFile.filename}"><i class="fas fa-file-archive me-1"></i>Converter p/ Binário</button>`;
                 li.innerHTML = `
                     <a href="/info_data/${jsonFile.filename}" download><i class="fas fa-download me-2"></i>${jsonFile.filename}</a> 
                     (<strong class="text-primary">${jsonFile.collection_type.charAt(0).toUpperCase() + jsonFile.collection_type.slice(1)}</strong>) - ${jsonFile.timestamp} (${jsonFile.directory_path})
                     ${inaccessibleBadge}
+                    ${convertButton}
                 `;
                 collectedJsonsList.appendChild(li);
             });
@@ -241,6 +375,25 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    function updateDedupReportsList(dedupReports) {
+        dedupReportsList.innerHTML = '';
+        if (dedupReports.length === 0) {
+            dedupReportsList.innerHTML = '<li class="list-group-item text-muted">Nenhum relatório de duplicados disponível ainda.</li>';
+        } else {
+            dedupReports.forEach(report => {
+                const li = document.createElement('li');
+                li.classList.add('list-group-item');
+                const csvFilename = report.filename.replace('.json', '.csv');
+                li.innerHTML = `
+                    <a href="/results/${report.filename}" download class="btn btn-sm btn-outline-secondary me-2"><i class="fas fa-download me-1"></i>JSON</a>
+                    <a href="/results/${csvFilename}" download class="btn btn-sm btn-outline-success"><i class="fas fa-file-csv me-1"></i>CSV</a>
+                    <span class="ms-3">(${report.timestamp} | ${report.base_directory} | Grupos: <strong>${report.duplicate_groups_count}</strong> | Recuperável: <strong>${(report.reclaimable_bytes / 1048576).toFixed(1)} MB</strong>)</span>
+                `;
+                dedupReportsList.appendChild(li);
+            });
+        }
+    }
+
     // --- Event Listeners para Formulários e Botões de Controle ---
 
     document.getElementById('collectionForm').addEventListener('submit', function(event) {
@@ -250,6 +403,13 @@ document.addEventListener('DOMContentLoaded', function() {
 
         const directoryPath = document.getElementById('directoryPath').value;
         const collectionType = document.getElementById('collectionType').value;
+        const collectionWorkers = parseInt(document.getElementById('collectionWorkers').value, 10) || 1;
+        const snapshotFormat = document.getElementById('snapshotFormat').value;
+        const baselineSnapshot = baselineSnapshotSelect.value;
+        const incrementalMode = document.getElementById('incrementalMode').value;
+        const hashAlgorithm = document.getElementById('hashAlgorithm').value;
+        const hashWorkers = parseInt(document.getElementById('hashWorkers').value, 10) || 4;
+        const useHashCache = document.getElementById('useHashCache').checked;
 
         fetch('/collect', {
             method: 'POST',
@@ -258,13 +418,24 @@ document.addEventListener('DOMContentLoaded', function() {
             },
             body: JSON.stringify({
                 directory_path: directoryPath,
-                collection_type: collectionType
+                collection_type: collectionType,
+                workers: collectionWorkers,
+                snapshot_format: snapshotFormat,
+                baseline_snapshot: baselineSnapshot,
+                incremental_mode: incrementalMode,
+                hash_algorithm: hashAlgorithm,
+                hash_workers: hashWorkers,
+                use_hash_cache: useHashCache,
+                exclude: document.getElementById('collectExclude').value,
+                include: document.getElementById('collectInclude').value
             })
         })
         .then(response => response.json())
         .then(data => {
+            startCollectionBtn.disabled = false;
             if (data.status === 'success') {
                 showAlert(data.message, 'info');
+                selectJob(data.job_id);
             } else {
                 showAlert(`Erro ao iniciar coleta: ${data.message}`, 'danger');
                 addLogMessage(`Erro do servidor ao iniciar coleta: ${data.message}`, 'error');
@@ -279,6 +450,79 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    document.getElementById('liveCompareForm').addEventListener('submit', function(event) {
+        event.preventDefault();
+        addLogMessage('Enviando solicitação de comparação direta...', 'info');
+        const startLiveComparisonBtn = document.getElementById('startLiveComparisonBtn');
+        startLiveComparisonBtn.disabled = true;
+
+        fetch('/compare_live', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                dir_origem: document.getElementById('liveDirOrigem').value,
+                dir_destino: document.getElementById('liveDirDestino').value,
+                verify_mode: document.getElementById('liveVerifyMode').value,
+                exclude: document.getElementById('liveExclude').value,
+                include: document.getElementById('liveInclude').value
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            startLiveComparisonBtn.disabled = false;
+            if (data.status === 'success') {
+                showAlert(data.message, 'info');
+                selectJob(data.job_id);
+            } else {
+                showAlert(`Erro ao iniciar comparação direta: ${data.message}`, 'danger');
+                addLogMessage(`Erro do servidor ao iniciar comparação direta: ${data.message}`, 'error');
+            }
+        })
+        .catch(error => {
+            console.error('Erro de rede ou na solicitação de comparação direta:', error);
+            showAlert(`Erro de comunicação: ${error.message}`, 'danger');
+            addLogMessage(`Erro de rede: ${error.message}`, 'error');
+            startLiveComparisonBtn.disabled = false;
+        });
+    });
+
+    document.getElementById('dedupForm').addEventListener('submit', function(event) {
+        event.preventDefault();
+        addLogMessage('Enviando solicitação de análise de duplicados...', 'info');
+        startDedupBtn.disabled = true;
+
+        fetch('/dedup', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                snapshot: dedupSnapshotSelect.value,
+                min_size: parseInt(document.getElementById('dedupMinSize').value, 10) || 1,
+                workers: parseInt(document.getElementById('dedupWorkers').value, 10) || 4
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            startDedupBtn.disabled = false;
+            if (data.status === 'success') {
+                showAlert(data.message, 'info');
+                selectJob(data.job_id);
+            } else {
+                showAlert(`Erro ao iniciar análise de duplicados: ${data.message}`, 'danger');
+                addLogMessage(`Erro do servidor ao iniciar análise de duplicados: ${data.message}`, 'error');
+            }
+        })
+        .catch(error => {
+            console.error('Erro de rede ou na solicitação de análise de duplicados:', error);
+            showAlert(`Erro de comunicação: ${error.message}`, 'danger');
+            addLogMessage(`Erro de rede: ${error.message}`, 'error');
+            startDedupBtn.disabled = false;
+        });
+    });
+
     document.getElementById('compareForm').addEventListener('submit', function(event) {
         event.preventDefault();
         addLogMessage('Enviando solicitação de comparação...', 'info');
@@ -286,6 +530,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
         const jsonOrigem = document.getElementById('jsonOrigem').value;
         const jsonDestino = document.getElementById('jsonDestino').value;
+        const verifyMode = document.getElementById('verifyMode').value;
 
         fetch('/compare', {
             method: 'POST',
@@ -294,17 +539,21 @@ document.addEventListener('DOMContentLoaded', function() {
             },
             body: JSON.stringify({
                 json_origem: jsonOrigem,
-                json_destino: jsonDestino
+                json_destino: jsonDestino,
+                verify_mode: verifyMode,
+                exclude: document.getElementById('compareExclude').value,
+                include: document.getElementById('compareInclude').value
             })
         })
         .then(response => response.json())
         .then(data => {
+            startComparisonBtn.disabled = false;
             if (data.status === 'success') {
                 showAlert(data.message, 'info');
+                selectJob(data.job_id);
             } else {
                 showAlert(`Erro ao iniciar comparação: ${data.message}`, 'danger');
                 addLogMessage(`Erro do servidor ao iniciar comparação: ${data.message}`, 'error');
-                startComparisonBtn.disabled = false;
             }
         })
         .catch(error => {
@@ -321,6 +570,7 @@ document.addEventListener('DOMContentLoaded', function() {
         startCopyBtn.disabled = true;
         
         const comparisonJson = document.getElementById('comparisonJsonForCopy').value;
+        const copyWorkers = parseInt(document.getElementById('copyWorkers').value, 10) || 1;
 
         fetch('/copy_missing', { 
             method: 'POST',
@@ -328,17 +578,27 @@ document.addEventListener('DOMContentLoaded', function() {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
-                comparison_json: comparisonJson
+                comparison_json: comparisonJson,
+                workers: copyWorkers,
+                delta: document.getElementById('deltaCopy').checked,
+                verify_mode: document.getElementById('copyVerifyMode').value,
+                verify_algorithm: document.getElementById('copyVerifyAlgorithm').value,
+                bytes_per_second: mbpsToBytes(document.getElementById('copyMaxMBps').value),
+                files_per_second: parseFloat(document.getElementById('copyMaxFilesPerSecond').value) || 0,
+                adaptive: document.getElementById('adaptiveCopy').checked,
+                move_mode: document.getElementById('copyMoveMode').value,
+                skip_fingerprint_matches: document.getElementById('skipFingerprintMatches').checked
             })
         })
         .then(response => response.json())
         .then(data => {
+            startCopyBtn.disabled = false;
             if (data.status === 'success') {
                 showAlert(data.message, 'info');
+                selectJob(data.job_id);
             } else {
                 showAlert(`Erro ao iniciar cópia: ${data.message}`, 'danger');
                 addLogMessage(`Erro do servidor ao iniciar cópia: ${data.message}`, 'error');
-                startCopyBtn.disabled = false; 
             }
         })
         .catch(error => {
@@ -349,19 +609,168 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    resumeCopyBtn.addEventListener('click', function() {
+        const comparisonJson = document.getElementById('comparisonJsonForCopy').value;
+        if (!comparisonJson) {
+            showAlert('Selecione o relatório de comparação da cópia a retomar.', 'warning');
+            return;
+        }
+        addLogMessage('Enviando solicitação de retomada da cópia...', 'info');
+        resumeCopyBtn.disabled = true;
+        startCopyBtn.disabled = true;
+
+        const copyWorkers = parseInt(document.getElementById('copyWorkers').value, 10) || 1;
+
+        fetch('/resume_copy', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                comparison_json: comparisonJson,
+                workers: copyWorkers,
+                delta: document.getElementById('deltaCopy').checked,
+                verify_mode: document.getElementById('copyVerifyMode').value,
+                verify_algorithm: document.getElementById('copyVerifyAlgorithm').value,
+                bytes_per_second: mbpsToBytes(document.getElementById('copyMaxMBps').value),
+                files_per_second: parseFloat(document.getElementById('copyMaxFilesPerSecond').value) || 0,
+                adaptive: document.getElementById('adaptiveCopy').checked,
+                move_mode: document.getElementById('copyMoveMode').value,
+                skip_fingerprint_matches: document.getElementById('skipFingerprintMatches').checked
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            resumeCopyBtn.disabled = false;
+            startCopyBtn.disabled = false;
+            if (data.status === 'success') {
+                showAlert(data.message, 'info');
+                selectJob(data.job_id);
+            } else {
+                showAlert(`Erro ao retomar cópia: ${data.message}`, 'danger');
+                addLogMessage(`Erro do servidor ao retomar cópia: ${data.message}`, 'error');
+            }
+        })
+        .catch(error => {
+            console.error('Erro de rede ou na solicitação de retomada:', error);
+            showAlert(`Erro de comunicação: ${error.message}`, 'danger');
+            addLogMessage(`Erro de rede: ${error.message}`, 'error');
+            resumeCopyBtn.disabled = false;
+            startCopyBtn.disabled = false;
+        });
+    });
+
+    // Conversão de snapshots para o formato binário (botões gerados dinamicamente)
+    collectedJsonsList.addEventListener('click', function(event) {
+        const button = event.target.closest('.convert-snapshot-btn');
+        if (!button) {
+            return;
+        }
+        addLogMessage(`Solicitando conversão de ${button.dataset.filename} para binário...`, 'info');
+        fetch('/convert_snapshot', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                filename: button.dataset.filename
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            showAlert(data.message, data.status === 'success' ? 'info' : 'danger');
+            if (data.status === 'success') {
+                selectJob(data.job_id);
+            }
+        })
+        .catch(error => {
+            showAlert(`Erro de comunicação: ${error.message}`, 'danger');
+            addLogMessage(`Erro de rede: ${error.message}`, 'error');
+        });
+    });
+
     // Botões de Controle
     pauseBtn.addEventListener('click', function() {
-        socket.emit('pause_operation');
+        socket.emit('pause_operation', { job_id: selectedJobId });
         addLogMessage('Solicitando pausa da operação...', 'info');
     });
 
     resumeBtn.addEventListener('click', function() {
-        socket.emit('resume_operation');
+        socket.emit('resume_operation', { job_id: selectedJobId });
         addLogMessage('Solicitando retomada da operação...', 'info');
     });
 
     stopBtn.addEventListener('click', function() {
-        socket.emit('stop_operation');
+        socket.emit('stop_operation', { job_id: selectedJobId });
         addLogMessage('Solicitando interrupção da operação...', 'warning');
     });
+
+    applyCopyLimitsBtn.addEventListener('click', function() {
+        const limits = {
+            job_id: selectedJobId,
+            bytes_per_second: mbpsToBytes(document.getElementById('liveMaxMBps').value),
+            files_per_second: parseFloat(document.getElementById('liveMaxFilesPerSecond').value) || 0,
+            adaptive: document.getElementById('liveAdaptiveCopy').checked
+        };
+        const liveWorkers = parseInt(document.getElementById('liveCopyWorkers').value, 10);
+        if (liveWorkers > 0) {
+            limits.workers = liveWorkers;
+        }
+        socket.emit('set_copy_limits', limits);
+        addLogMessage('Solicitando ajuste dos limites da cópia...', 'info');
+    });
+
+    applyMaxJobsBtn.addEventListener('click', function() {
+        fetch('/jobs/settings', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                max_concurrent_jobs: parseInt(maxConcurrentJobsInput.value, 10)
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            showAlert(data.message, data.status === 'success' ? 'info' : 'danger');
+        })
+        .catch(error => {
+            showAlert(`Erro de comunicação: ${error.message}`, 'danger');
+            addLogMessage(`Erro de rede: ${error.message}`, 'error');
+        });
+    });
+
+    applyCompressionBtn.addEventListener('click', function() {
+        fetch('/storage/settings', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                codec: compressionCodecSelect.value,
+                level: parseInt(compressionLevelInput.value, 10)
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'success') {
+                compressionLevelInput.value = data.level;
+            }
+            showAlert(data.message, data.status === 'success' ? 'info' : 'danger');
+        })
+        .catch(error => {
+            showAlert(`Erro de comunicação: ${error.message}`, 'danger');
+            addLogMessage(`Erro de rede: ${error.message}`, 'error');
+        });
+    });
+
+    function mbpsToBytes(value) {
+        return Math.round((parseFloat(value) || 0) * 1048576);
+    }
+
+    function describeCopyLimits(limits) {
+        const bandwidth = limits.bytes_per_second ? (limits.bytes_per_second / 1048576).toFixed(1) + ' MB/s' : 'sem limite de banda';
+        const fileRate = limits.files_per_second ? limits.files_per_second + ' arquivos/s' : 'sem limite de arquivos/s';
+        return `${limits.workers} cópias simultâneas${limits.adaptive ? ' (adaptativa)' : ''}, ${bandwidth}, ${fileRate}`;
+    }
 });
\ No newline at end of file
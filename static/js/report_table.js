@@ -0,0 +1,139 @@
+// Tabelas paginadas das páginas de relatório: as linhas são carregadas sob
+// demanda de /api/reports/<relatório>/rows, com filtros e ordenação no servidor.
+document.addEventListener('DOMContentLoaded', function() {
+
+    function escapeHtml(value) {
+        if (value === undefined || value === null) {
+            return '';
+        }
+        return String(value).replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+    }
+
+    function orDefault(value, fallback) {
+        return value === undefined || value === null ? fallback : escapeHtml(value);
+    }
+
+    const STATUS_BADGES = {
+        'Não encontrado no destino': 'bg-warning',
+        'Tamanho ou data de modificação diferente': 'bg-info',
+        'Movido no destino': 'bg-primary'
+    };
+
+    // Lista do relatório -> células de cada linha
+    const ROW_RENDERERS = {
+        not_copied_files_details: row => {
+            const badge = STATUS_BADGES[row.status];
+            let status = badge ? `<span class="badge ${badge}">${escapeHtml(row.status)}</span>` : escapeHtml(row.status);
+            if (row.moved_from) {
+                status += `<div><small>de <code>${escapeHtml(row.moved_from)}</code></small></div>`;
+            } else if (row.match === 'fingerprint') {
+                status += '<div><small>impressão digital igual (conteúdo não confirmado)</small></div>';
+            }
+            return [
+                `<code>${escapeHtml(row.relative_path)}</code>`,
+                status,
+                orDefault(row.size_origem, 'N/A'),
+                orDefault(row.mtime_origem, 'N/A'),
+                orDefault(row.size_destino, 'N/A'),
+                orDefault(row.mtime_destino, 'N/A')
+            ];
+        },
+        successful_copies: row => [
+            `<code>${escapeHtml(row.relative_path)}</code>`,
+            `<code>${escapeHtml(row.source_path)}</code>`,
+            `<code>${escapeHtml(row.destination_path)}</code>`,
+            orDefault(row.bytes_saved, '-'),
+            row.hash ? `<code title="${escapeHtml(row.hash_algorithm)} (${escapeHtml(row.verification)})">${escapeHtml(row.hash)}</code>` : '-',
+            escapeHtml(row.timestamp)
+        ],
+        failed_copies: row => [
+            `<code>${escapeHtml(row.relative_path)}</code>`,
+            `<span class="text-danger">${escapeHtml(row.status)}</span>`,
+            escapeHtml(row.error_message),
+            `<code>${escapeHtml(row.source_path)}</code>`,
+            `<code>${escapeHtml(row.destination_path)}</code>`,
+            escapeHtml(row.timestamp)
+        ]
+    };
+
+    document.querySelectorAll('.report-rows').forEach(function(container) {
+        const report = container.dataset.report;
+        const list = container.dataset.list;
+        const renderRow = ROW_RENDERERS[list];
+        const filtersForm = container.querySelector('.report-filters');
+        const tbody = container.querySelector('tbody');
+        const pageInfo = container.querySelector('.report-page-info');
+        const prevBtn = container.querySelector('[data-page="prev"]');
+        const nextBtn = container.querySelector('[data-page="next"]');
+        const columns = container.querySelectorAll('th').length;
+        const query = {page: 1, sort: '', order: 'asc'};
+        let pages = 1;
+
+        function filterParams(params) {
+            new FormData(filtersForm).forEach((value, key) => {
+                if (value !== '') {
+                    params.set(key, value);
+                }
+            });
+            return params;
+        }
+
+        function load() {
+            const params = filterParams(new URLSearchParams({list: list, page: query.page, sort: query.sort, order: query.order}));
+            tbody.innerHTML = `<tr><td colspan="${columns}" class="text-center text-muted">Carregando...</td></tr>`;
+            fetch(`/api/reports/${encodeURIComponent(report)}/rows?${params}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.status !== 'success') {
+                        tbody.innerHTML = `<tr><td colspan="${columns}" class="text-center text-danger">${escapeHtml(data.message)}</td></tr>`;
+                        return;
+                    }
+                    pages = data.pages;
+                    tbody.innerHTML = data.rows.length ? data.rows.map(row => `<tr>${renderRow(row).map(cell => `<td>${cell}</td>`).join('')}</tr>`).join('')
+                        : `<tr><td colspan="${columns}" class="text-center text-muted">Nenhuma linha com estes filtros.</td></tr>`;
+                    pageInfo.textContent = `Página ${data.page} de ${data.pages} (${data.total} linhas)`;
+                    prevBtn.disabled = data.page <= 1;
+                    nextBtn.disabled = data.page >= data.pages;
+                })
+                .catch(error => {
+                    tbody.innerHTML = `<tr><td colspan="${columns}" class="text-center text-danger">Erro ao carregar as linhas: ${escapeHtml(error.message)}</td></tr>`;
+                });
+        }
+
+        // Exportação gerada em streaming pelo servidor com os filtros atuais do formulário
+        container.querySelectorAll('[data-export]').forEach(function(link) {
+            link.addEventListener('click', function() {
+                const params = filterParams(new URLSearchParams({list: list, format: link.dataset.export}));
+                link.href = `/api/reports/${encodeURIComponent(report)}/export?${params}`;
+            });
+        });
+
+        filtersForm.addEventListener('submit', function(event) {
+            event.preventDefault();
+            query.page = 1;
+            load();
+        });
+        prevBtn.addEventListener('click', function() {
+            query.page = Math.max(1, query.page - 1);
+            load();
+        });
+        nextBtn.addEventListener('click', function() {
+            query.page = Math.min(pages, query.page + 1);
+            load();
+        });
+        container.querySelectorAll('th[data-sort]').forEach(function(th) {
+            th.style.cursor = 'pointer';
+            th.addEventListener('click', function() {
+                // Primeiro clique ordena de forma crescente; o segundo inverte
+                query.order = query.sort === th.dataset.sort && query.order === 'asc' ? 'desc' : 'asc';
+                query.sort = th.dataset.sort;
+                query.page = 1;
+                container.querySelectorAll('th[data-sort] .sort-indicator').forEach(span => span.textContent = '');
+                th.querySelector('.sort-indicator').textContent = query.order === 'asc' ? ' ▲' : ' ▼';
+                load();
+            });
+        });
+
+        load();
+    });
+});
@@ -0,0 +1,14 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def random_bytes():
+    """Gera bytes pseudoaleatórios reprodutíveis (sem blocos repetidos por acaso)."""
+    rng = random.Random(1234)
+    return rng.randbytes
@@ -0,0 +1,117 @@
+import hashlib
+import os
+
+import pytest
+
+from app import (BinarySnapshot, build_snapshot_index, close_snapshot_index, convert_snapshot_to_binary,
+                 iter_snapshot_files, open_snapshot, read_snapshot_metadata, snapshot_path_key,
+                 write_binary_snapshot, write_ndjson_snapshot)
+
+
+def md5(text):
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def sample_records():
+    paths = [
+        'b.txt', 'a-b.txt', os.path.join('a', 'b.txt'), os.path.join('a', 'c', 'd.bin'),
+        'ação.txt', os.path.join('z', 'vazio'), 'A.TXT',
+    ]
+    records = {}
+    for index, path in enumerate(paths):
+        records[path] = {'size': 1000 * index, 'mtime': 1700000000.25 + index, 'md5': md5(path)}
+    records[os.path.join('z', 'vazio')].update(size=0, md5=None) # Arquivo sem hash
+    return records
+
+
+def test_write_and_lookup(tmp_path):
+    records = sample_records()
+    filepath = str(tmp_path / 'coleta.snap')
+    metadata = write_binary_snapshot(filepath, {'source_path': '/origem', 'hash_algorithm': 'md5'}, records.items())
+    assert metadata['total_files_scanned'] == len(records)
+    assert metadata['hash_field'] == 'md5'
+
+    with BinarySnapshot(filepath) as snapshot:
+        assert len(snapshot) == len(records)
+        assert snapshot.metadata['source_path'] == '/origem'
+        for path, info in records.items():
+            assert path in snapshot
+            assert snapshot[path] == info
+            assert snapshot.get(path) == info
+        for missing in ('', 'a', 'a-b', os.path.join('a', 'c'), 'zzz', 'B.txt'):
+            assert missing not in snapshot
+            assert snapshot.get(missing, 'x') == 'x'
+            with pytest.raises(KeyError):
+                snapshot[missing]
+
+
+def test_items_follow_canonical_order(tmp_path):
+    records = sample_records()
+    filepath = str(tmp_path / 'coleta.snap')
+    write_binary_snapshot(filepath, {}, records.items())
+
+    expected = sorted(records, key=lambda path: snapshot_path_key(path).encode('utf-8'))
+    assert [path for path, _ in iter_snapshot_files(filepath)] == expected
+    # Os arquivos de um diretório vêm juntos, antes de nomes que só compartilham o prefixo
+    assert expected.index(os.path.join('a', 'c', 'd.bin')) < expected.index('a-b.txt')
+
+    items = iter_snapshot_files(filepath)
+    assert next(items)[0] == expected[0]
+    assert items.send(2)[0] == expected[3]
+    assert dict(items) == {path: records[path] for path in expected[4:]}
+
+
+def test_empty_snapshot(tmp_path):
+    filepath = str(tmp_path / 'vazio.snap')
+    write_binary_snapshot(filepath, {'hash_algorithm': None}, [])
+    with BinarySnapshot(filepath) as snapshot:
+        assert len(snapshot) == 0
+        assert 'a' not in snapshot
+    assert list(iter_snapshot_files(filepath)) == []
+
+
+def test_snapshot_without_hashes(tmp_path):
+    records = {path: dict(info, md5=None) for path, info in sample_records().items()}
+    filepath = str(tmp_path / 'coleta.snap')
+    write_binary_snapshot(filepath, {}, records.items())
+    with BinarySnapshot(filepath) as snapshot:
+        assert snapshot.hash_width == 0
+        assert dict(snapshot.items()) == records
+
+
+def test_invalid_file_is_rejected(tmp_path):
+    filepath = tmp_path / 'invalido.snap'
+    filepath.write_bytes(b'nada')
+    with pytest.raises(ValueError):
+        BinarySnapshot(str(filepath))
+    filepath.write_bytes(b'\0' * 4096)
+    with pytest.raises(ValueError):
+        BinarySnapshot(str(filepath))
+
+
+@pytest.mark.parametrize('name', ['coleta.ndjson', 'coleta.ndjson.gz'])
+def test_convert_from_ndjson(tmp_path, name):
+    records = sample_records()
+    source = str(tmp_path / name)
+    directories = {'': 1.0, 'a': 2.0}
+    write_ndjson_snapshot(source, {'source_path': '/origem', 'hash_algorithm': 'md5'}, records.items(), [],
+                          directories=directories, directory_digests={'a': 'f' * 32})
+    destination = str(tmp_path / 'coleta.snap')
+    convert_snapshot_to_binary(source, destination)
+
+    metadata = read_snapshot_metadata(destination)
+    assert metadata['source_path'] == '/origem'
+    assert metadata['converted_from'] == name
+    assert metadata['directory_digests'] == {'a': 'f' * 32}
+    assert 'directories_offset' not in metadata
+
+    _, files = open_snapshot(destination)
+    assert dict(files) == records
+    index = build_snapshot_index(destination, ())
+    try:
+        assert isinstance(index, BinarySnapshot)
+        for path, info in records.items():
+            assert index[path] == info
+    finally:
+        close_snapshot_index(index)
+
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+import app
+from app import CopyInterrupted, CopyJournal, Job, copy_file_chunked, copy_single_file, job_context, verify_partial_copy
+
+CHUNK = 64 * 1024
+INTERVAL = 256 * 1024
+FILE_SIZE = 2 * 1024 * 1024 + 1234
+
+
+@pytest.fixture
+def source(tmp_path, random_bytes):
+    path = tmp_path / 'origem' / 'dados' / 'grande.bin'
+    path.parent.mkdir(parents=True)
+    path.write_bytes(random_bytes(FILE_SIZE))
+    return path
+
+
+def stop_after(monkeypatch, calls):
+    """Faz check_operation_control pedir a parada a partir da chamada de número calls."""
+    counter = {'calls': 0}
+
+    def check_operation_control():
+        counter['calls'] += 1
+        return counter['calls'] < calls
+    monkeypatch.setattr(app, 'check_operation_control', check_operation_control)
+
+
+def allow(monkeypatch):
+    monkeypatch.setattr(app, 'check_operation_control', lambda: True)
+
+
+def test_resume_from_mid_file_checkpoint(tmp_path, monkeypatch, source):
+    destination = tmp_path / 'destino.bin'
+    journal_path = str(tmp_path / 'diario.ndjson')
+
+    journal = CopyJournal(journal_path)
+    stop_after(monkeypatch, 12) # 11 blocos copiados: dois checkpoints e um trecho depois do último
+    with pytest.raises(CopyInterrupted) as excinfo:
+        copy_file_chunked(str(source), str(destination), chunk_size=CHUNK, keep_partial=True,
+                          on_checkpoint=lambda offset: journal.record_offset('grande.bin', offset),
+                          checkpoint_interval=INTERVAL)
+    journal.close()
+    assert excinfo.value.offset == 11 * CHUNK
+    assert os.path.getsize(destination) == 11 * CHUNK
+
+    journal = CopyJournal(journal_path, resume=True)
+    try:
+        assert journal.completed == set()
+        assert journal.offsets == {'grande.bin': 2 * INTERVAL}
+        start_offset = verify_partial_copy(str(source), str(destination), journal.offsets['grande.bin'])
+        assert start_offset == 2 * INTERVAL
+
+        allow(monkeypatch)
+        digest = hashlib.sha256()
+        checkpoints = []
+        copy_file_chunked(str(source), str(destination), chunk_size=CHUNK, start_offset=start_offset,
+                          on_checkpoint=checkpoints.append, digest=digest, checkpoint_interval=INTERVAL)
+        journal.record_done('grande.bin')
+    finally:
+        journal.close()
+
+    data = source.read_bytes()
+    assert destination.read_bytes() == data
+    assert digest.hexdigest() == hashlib.sha256(data).hexdigest()
+    assert checkpoints and all(offset > start_offset for offset in checkpoints)
+    assert os.stat(destination).st_mtime == os.stat(source).st_mtime
+
+    journal = CopyJournal(journal_path, resume=True)
+    journal.close()
+    assert journal.completed == {'grande.bin'}
+    assert journal.offsets == {}
+
+
+def test_journal_ignores_truncated_last_line(tmp_path):
+    journal_path = tmp_path / 'diario.ndjson'
+    journal = CopyJournal(str(journal_path))
+    journal.record_done('a.txt')
+    journal.record_offset('b.bin', INTERVAL)
+    journal.record_offset('b.bin', 2 * INTERVAL)
+    journal.close()
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'path': 'b.bin', 'offset': 3 * INTERVAL})[:-7]) # Queda no meio da gravação
+
+    journal = CopyJournal(str(journal_path), resume=True)
+    journal.close()
+    assert journal.completed == {'a.txt'}
+    assert journal.offsets == {'b.bin': 2 * INTERVAL}
+
+
+def test_untrusted_partial_copy_restarts(tmp_path, source):
+    destination = tmp_path / 'destino.bin'
+    data = source.read_bytes()
+    destination.write_bytes(data[:INTERVAL - 1])
+    assert verify_partial_copy(str(source), str(destination), INTERVAL) == 0 # Destino menor que o offset
+
+    corrupted = bytearray(data[:2 * INTERVAL])
+    corrupted[2 * INTERVAL - 10] ^= 0xff
+    destination.write_bytes(bytes(corrupted))
+    assert verify_partial_copy(str(source), str(destination), 2 * INTERVAL) == 0
+
+    assert verify_partial_copy(str(source), str(tmp_path / 'inexistente'), INTERVAL) == 0
+    destination.write_bytes(data[:2 * INTERVAL])
+    assert verify_partial_copy(str(source), str(destination), 2 * INTERVAL) == 2 * INTERVAL
+
+
+def test_copy_single_file_resumes_with_journal(tmp_path, monkeypatch, source):
+    monkeypatch.setattr(app, 'COPY_CHUNK_SIZE', CHUNK)
+    monkeypatch.setattr(app, 'COPY_CHECKPOINT_MIN_SIZE', INTERVAL)
+    # checkpoint_interval tem o padrão fixado na definição da função
+    defaults = list(copy_file_chunked.__defaults__)
+    defaults[-1] = INTERVAL
+    monkeypatch.setattr(copy_file_chunked, '__defaults__', tuple(defaults))
+    source_base = str(tmp_path / 'origem')
+    destination_base = str(tmp_path / 'destino')
+    relative_path = os.path.join('dados', 'grande.bin')
+    destination = os.path.join(destination_base, relative_path)
+    journal_path = str(tmp_path / 'diario.ndjson')
+
+    with job_context(Job('copy', 'teste', None)):
+        journal = CopyJournal(journal_path)
+        stop_after(monkeypatch, 20)
+        success, entry = copy_single_file(source_base, destination_base, relative_path, journal=journal)
+        journal.close()
+        assert not success
+        assert os.path.getsize(destination) == 19 * CHUNK # Parcial mantido para a retomada
+
+        journal = CopyJournal(journal_path, resume=True)
+        assert journal.offsets == {relative_path: 4 * INTERVAL}
+        allow(monkeypatch)
+        success, entry = copy_single_file(source_base, destination_base, relative_path, journal=journal)
+        journal.close()
+
+    assert success
+    with open(destination, 'rb') as f:
+        assert f.read() == source.read_bytes()
+    journal = CopyJournal(journal_path, resume=True)
+    journal.close()
+    assert journal.completed == {relative_path}
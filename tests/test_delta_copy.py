@@ -0,0 +1,120 @@
+import hashlib
+import os
+
+import pytest
+
+from app import copy_file_delta
+
+BLOCK = 4096
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def delta(tmp_path, old, new, **kwargs):
+    """Aplica copy_file_delta de new sobre um destino com old; retorna (reaproveitado, literal)."""
+    source = tmp_path / 'origem.bin'
+    destination = tmp_path / 'destino.bin'
+    write(source, new)
+    write(destination, old)
+    result = copy_file_delta(str(source), str(destination), **kwargs)
+    assert read(destination) == new
+    assert not os.path.exists(tmp_path / '.destino.bin.delta.tmp')
+    return result
+
+
+def test_identical_files_reuse_every_block(tmp_path, random_bytes):
+    data = random_bytes(64 * BLOCK)
+    assert delta(tmp_path, data, data, block_size=BLOCK) == (len(data), 0)
+
+
+def test_insertion_in_the_middle(tmp_path, random_bytes):
+    old = random_bytes(64 * BLOCK)
+    new = old[:20 * BLOCK + 100] + random_bytes(777) + old[20 * BLOCK + 100:]
+    reused, literal = delta(tmp_path, old, new, block_size=BLOCK)
+    assert reused + literal == len(new)
+    assert reused >= 60 * BLOCK
+
+
+def test_deletion_in_the_middle(tmp_path, random_bytes):
+    old = random_bytes(64 * BLOCK)
+    new = old[:10 * BLOCK + 5] + old[12 * BLOCK + 900:]
+    reused, literal = delta(tmp_path, old, new, block_size=BLOCK)
+    assert reused + literal == len(new)
+    assert reused >= 58 * BLOCK
+
+
+def test_modified_bytes(tmp_path, random_bytes):
+    old = random_bytes(64 * BLOCK)
+    new = bytearray(old)
+    for position in (0, 17 * BLOCK + 3, 40 * BLOCK + BLOCK - 1, len(new) - 1):
+        new[position] ^= 0xff
+    new = bytes(new)
+    reused, literal = delta(tmp_path, old, new, block_size=BLOCK)
+    assert reused + literal == len(new)
+    assert literal <= 4 * BLOCK
+
+
+def test_appended_and_truncated(tmp_path, random_bytes):
+    old = random_bytes(32 * BLOCK + 123)
+    appended = old + random_bytes(5000)
+    assert sum(delta(tmp_path, old, appended, block_size=BLOCK)) == len(appended)
+    truncated = old[:10 * BLOCK + 1]
+    assert sum(delta(tmp_path, old, truncated, block_size=BLOCK)) == len(truncated)
+
+
+def test_reordered_blocks(tmp_path, random_bytes):
+    blocks = [random_bytes(BLOCK) for _ in range(16)]
+    old = b''.join(blocks)
+    new = b''.join(reversed(blocks))
+    assert delta(tmp_path, old, new, block_size=BLOCK) == (len(new), 0)
+
+
+def test_unrelated_and_empty_contents(tmp_path, random_bytes):
+    new = random_bytes(16 * BLOCK)
+    assert delta(tmp_path, random_bytes(16 * BLOCK), new, block_size=BLOCK)[0] == 0
+    assert delta(tmp_path, b'', new, block_size=BLOCK) == (0, len(new))
+    assert delta(tmp_path, new, b'', block_size=BLOCK) == (0, 0)
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 512, 4096, 65536])
+def test_block_sizes(tmp_path, random_bytes, block_size):
+    old = random_bytes(200000)
+    new = old[:1000] + b'xyz' + old[1000:150000] + old[151234:] + random_bytes(99)
+    reused, literal = delta(tmp_path, old, new, block_size=block_size)
+    assert reused + literal == len(new)
+
+
+def test_default_block_size(tmp_path, random_bytes):
+    old = random_bytes(2 * 1024 * 1024)
+    new = old[:300000] + random_bytes(10) + old[300000:]
+    reused, literal = delta(tmp_path, old, new)
+    assert reused + literal == len(new)
+    assert literal < 512 * 1024
+
+
+def test_digest_and_progress(tmp_path, random_bytes):
+    old = random_bytes(64 * BLOCK)
+    new = old[:5000] + random_bytes(3000) + old[5000:]
+    digest = hashlib.sha256()
+    progress = []
+    delta(tmp_path, old, new, block_size=BLOCK, digest=digest, on_progress=progress.append)
+    assert digest.hexdigest() == hashlib.sha256(new).hexdigest()
+    assert sum(progress) == len(new)
+
+
+def test_copies_metadata(tmp_path, random_bytes):
+    source = tmp_path / 'origem.bin'
+    destination = tmp_path / 'destino.bin'
+    write(source, random_bytes(8 * BLOCK))
+    write(destination, random_bytes(8 * BLOCK))
+    os.utime(source, (1000000000, 1000000000))
+    copy_file_delta(str(source), str(destination), block_size=BLOCK)
+    assert os.stat(destination).st_mtime == os.stat(source).st_mtime